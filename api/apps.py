@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MezzanineAPIAppConfig(AppConfig):
     name = 'api'
     verbose_name = "Mezzanine API"
+
+    def ready(self):
+        from . import cache, search
+        cache.connect_signals()
+        search.connect_signals()
@@ -0,0 +1,125 @@
+"""
+Helpers for writing Mezzanine content in bulk, with a fixed number of queries
+however many objects there are.
+
+Mezzanine fills in some fields of its models when they're saved one at a time,
+which bulk_create() and bulk_update() skip, so they're filled in here instead.
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+from django.template.defaultfilters import strip_tags
+from django.utils.timezone import now
+
+from mezzanine.blog.models import BlogCategory
+from mezzanine.conf import settings
+from mezzanine.core.models import Displayable, MetaData, Slugged, TimeStamped
+from mezzanine.utils.models import base_concrete_model
+from mezzanine.utils.sites import current_site_id
+
+
+def set_unique_slugs(instances):
+    """
+    Give instances of the same model a slug that's unique like the one `Slugged.save`
+    generates. The slugs in use are looked up with a query for all the instances, and
+    another for each slug that is already taken.
+    """
+    if not instances:
+        return
+    model = base_concrete_model(Slugged, instances[0])
+    slugs = [instance.get_slug() for instance in instances]
+    taken = set(model.objects.filter(slug__in=set(slugs)).values_list('slug', flat=True))
+    numbered = set()
+    for instance, slug in zip(instances, slugs):
+        if slug in taken:
+            if slug not in numbered:
+                taken.update(model.objects.filter(
+                    slug__startswith=slug + '-').values_list('slug', flat=True))
+                numbered.add(slug)
+            i = 1
+            while '%s-%s' % (slug, i) in taken:
+                i += 1
+            slug = '%s-%s' % (slug, i)
+        instance.slug = slug
+        taken.add(slug)
+
+
+def prepare_for_insert(instances):
+    """
+    Set the fields of new instances of the same model that their `save` would.
+    """
+    timestamp = now()
+    site_id = current_site_id()
+    for instance in instances:
+        if isinstance(instance, Slugged) and instance.site_id is None:
+            instance.site_id = site_id
+        if isinstance(instance, TimeStamped):
+            instance.created = timestamp
+    prepare_for_update(instances, timestamp)
+    if instances and isinstance(instances[0], Slugged):
+        set_unique_slugs([instance for instance in instances if not instance.slug])
+
+
+def prepare_for_update(instances, timestamp=None):
+    """
+    Set the fields of changed instances that their `save` would.
+    """
+    timestamp = timestamp or now()
+    for instance in instances:
+        if isinstance(instance, TimeStamped):
+            instance.updated = timestamp
+        if isinstance(instance, Displayable) and instance.publish_date is None:
+            instance.publish_date = timestamp
+        if isinstance(instance, MetaData) and instance.gen_description:
+            instance.description = strip_tags(instance.description_from_content())
+
+
+def insert_slugged(instances):
+    """
+    Insert new instances of the same model with one query, after `prepare_for_insert`.
+    Databases that don't return the inserted IDs (MySQL) get them read back by slug, as
+    the slugs are unique while other requests may add rows for the same user or site.
+    """
+    model = base_concrete_model(Slugged, instances[0])
+    model.objects.bulk_create(instances)
+    if instances[0].pk is None:
+        ids = dict(model.objects.filter(
+            site_id__in={instance.site_id for instance in instances},
+            slug__in=[instance.slug for instance in instances]).order_by('pk').values_list('slug', 'pk'))
+        for instance in instances:
+            instance.pk = ids[instance.slug]
+    return instances
+
+
+def get_update_fields(model, names):
+    """
+    Names of the fields to write with bulk_update() for the given ones, including the
+    translations of translated fields.
+    """
+    names = set(names)
+    if settings.USE_MODELTRANSLATION:
+        from modeltranslation.manager import append_translated
+        names = append_translated(model, names)
+    return sorted(names)
+
+
+def get_category_names(value):
+    """
+    Category titles in a comma delimited list, without blanks or duplicates.
+    """
+    return list(OrderedDict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+
+
+def get_categories(names):
+    """
+    Blog categories by title, looked up with one query, and with the missing ones created
+    with one insert.
+    """
+    categories = {category.title: category for category in BlogCategory.objects.filter(title__in=names)}
+    missing = [BlogCategory(title=name) for name in OrderedDict.fromkeys(names) if name not in categories]
+    if missing:
+        prepare_for_insert(missing)
+        insert_slugged(missing)
+        categories.update((category.title, category) for category in missing)
+    return categories
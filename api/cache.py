@@ -0,0 +1,191 @@
+"""
+Cached API data is keyed on the versions of tags, which are dropped whenever what
+they stand for is written to. That invalidates every cached value depending on a
+tag at once, without keeping track of the individual keys.
+
+Each watched model has a tag, whose version is the model's generation, and so does
+each of its instances. Cached responses record the versions of their tags and are
+discarded once any of them changes. Versions start with the time they were created,
+which is when their tag last changed as far as the cache knows.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import time
+import uuid
+
+from datetime import datetime, timedelta, timezone
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_aware, make_naive, now
+
+from mezzanine.conf import settings
+
+GENERATION_KEY = 'mezzanine_api:generation:%s'
+RESPONSE_KEY = 'mezzanine_api:response:%s'
+
+
+def get_watched_models():
+    """
+    Models whose writes invalidate the cached data of the API.
+    """
+    from django_comments.models import Comment
+    from mezzanine.blog.models import BlogPost, BlogCategory
+    from mezzanine.pages.models import Page
+    return [get_user_model(), BlogPost, BlogCategory, Page, Comment]
+
+
+def get_tag(model, pk=None):
+    """
+    Tag of a model, or of one of its instances.
+    """
+    tag = model._meta.label_lower
+    return tag if pk is None else '%s:%s' % (tag, pk)
+
+
+def new_version():
+    return '%d:%s' % (time.time(), uuid.uuid4().hex)
+
+
+def get_version_time(version):
+    """
+    Time a version was created at, to the second.
+    """
+    created = datetime.fromtimestamp(int(version.split(':', 1)[0]), timezone.utc)
+    return created if settings.USE_TZ else make_naive(created)
+
+
+def get_versions(tags):
+    """
+    Current versions of the tags, starting a version for those without one.
+    """
+    keys = {GENERATION_KEY % tag: tag for tag in tags}
+    versions = cache.get_many(list(keys))
+    for key in set(keys) - set(versions):
+        cache.add(key, new_version(), None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def get_generation(model):
+    tag = get_tag(model)
+    return get_versions([tag])[tag]
+
+
+def purge(*tags):
+    cache.delete_many([GENERATION_KEY % tag for tag in set(tags)])
+
+
+def get_model_tags(model, pks=()):
+    """
+    Tags of a model and its instances, along with those of the parent models they're
+    also instances of.
+    """
+    tags = []
+    for cls in [model] + model._meta.get_parent_list():
+        tags.append(get_tag(cls))
+        tags.extend(get_tag(cls, pk) for pk in pks)
+    return tags
+
+
+def invalidate(*models):
+    purge(*[tag for model in models for tag in get_model_tags(model)])
+
+
+def invalidate_objects(model, pks):
+    purge(*get_model_tags(model, pks))
+
+
+def get_key_param(param, current_time):
+    """
+    Published content is filtered against now(), which would give each query its
+    own key. Times within a minute of now are taken to be it and truncated to the
+    minute, so the key only changes once a minute. Databases without time zone
+    support get times as naive strings in UTC.
+    """
+    try:
+        value = parse_datetime(param) if isinstance(param, str) else param
+    except ValueError:
+        return param
+    if not isinstance(value, datetime):
+        return param
+    if is_aware(value):
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    if abs(value - current_time) < timedelta(minutes=1):
+        return value.replace(second=0, microsecond=0)
+    return param
+
+
+def get_queryset_key(prefix, queryset):
+    """
+    Cache key for data about the results of a queryset, or None if the queryset
+    can't match anything.
+    """
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return None
+    current_time = now()
+    if is_aware(current_time):
+        current_time = current_time.astimezone(timezone.utc).replace(tzinfo=None)
+    params = [get_key_param(param, current_time) for param in params]
+    digest = hashlib.md5(('%s %r' % (sql, params)).encode('utf-8')).hexdigest()
+    return 'mezzanine_api:%s:%s:%s' % (prefix, get_generation(queryset.model), digest)
+
+
+def get_response_data(key):
+    """
+    Cached response data, if none of its tags changed since it was cached.
+    """
+    entry = cache.get(RESPONSE_KEY % key)
+    if entry is None or get_versions(entry['tags']) != entry['tags']:
+        return None
+    return entry['data']
+
+
+def set_response_data(key, data, versions, timeout):
+    """
+    Cache response data with the versions its tags had before it was put together, so
+    writes made meanwhile discard it.
+    """
+    cache.set(RESPONSE_KEY % key, {'data': data, 'tags': versions}, timeout)
+
+
+def model_changed(sender, instance, update_fields=None, **kwargs):
+    # Logging in only changes the last login of users, which the API doesn't output
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    tags = get_model_tags(sender, [instance.pk])
+    # Comments are part of the object they're on
+    if getattr(instance, 'content_type_id', None) and getattr(instance, 'object_pk', None):
+        model = ContentType.objects.get_for_id(instance.content_type_id).model_class()
+        if model is not None:
+            tags.extend(get_model_tags(model, [instance.object_pk]))
+    purge(*tags)
+
+
+def relation_changed(sender, instance, model, pk_set=None, **kwargs):
+    if kwargs['action'].startswith('post_'):
+        purge(*(get_model_tags(type(instance), [instance.pk]) + get_model_tags(model, pk_set or ())))
+
+
+def connect_signals():
+    """
+    Invalidate the cached data of the watched models, including their subclasses,
+    whenever they or their many-to-many relations are written to.
+    """
+    watched = tuple(get_watched_models())
+    for model in apps.get_models():
+        if issubclass(model, watched):
+            post_save.connect(model_changed, sender=model, dispatch_uid='mezzanine_api_cache')
+            post_delete.connect(model_changed, sender=model, dispatch_uid='mezzanine_api_cache')
+            for field in model._meta.local_many_to_many:
+                m2m_changed.connect(
+                    relation_changed, sender=field.remote_field.through,
+                    dispatch_uid='mezzanine_api_cache')
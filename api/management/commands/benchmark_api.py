@@ -0,0 +1,125 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+import django_filters
+from mezzanine.blog.models import BlogPost as Post
+from mezzanine.core.models import CONTENT_STATUS_PUBLISHED
+from mezzanine.core.request import CurrentRequestMiddleware
+from mezzanine.generic.models import AssignedKeyword, Keyword
+from rest_framework.test import APIRequestFactory
+
+from ...views import PostFilter, PostViewSet
+
+
+class BaselinePostFilter(PostFilter):
+    """
+    The post filters with tags matched as substrings of `keywords_string`, for comparison.
+    """
+    tag = django_filters.CharFilter(field_name='keywords_string', lookup_expr='contains')
+
+
+class BaselinePostViewSet(PostViewSet):
+    filterset_class = BaselinePostFilter
+
+
+class Command(BaseCommand):
+    """
+    Measure the post list API on seeded data. Everything is seeded in a transaction
+    that's rolled back afterwards.
+    """
+    help = "Benchmark post filters of the API against the configured database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=1000000, help="Posts to seed (default: 1000000)")
+        parser.add_argument(
+            '--tags', type=int, default=1000, help="Distinct tags to seed (default: 1000)")
+        parser.add_argument(
+            '--tags-per-post', type=int, default=3, help="Tags assigned per post (default: 3)")
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help="Requests per scenario, the fastest is reported (default: 3)")
+
+    def handle(self, *args, **options):
+        if min(options['posts'], options['tags'], options['tags_per_post'], options['repeat']) < 1:
+            raise CommandError("All options must be positive integers")
+        if options['tags_per_post'] > options['tags']:
+            raise CommandError("Posts can't have more tags than there are")
+
+        with transaction.atomic():
+            suffix = uuid.uuid4().hex[:8]
+            tags = self.seed(suffix, options)
+            factory = APIRequestFactory()
+            # Cached counts would hide the cost of the filters
+            scenarios = [
+                ('one tag', {'tag': tags[1], 'count': 'exact'}),
+                ('any of two tags', {'tag': '%s,%s' % (tags[1], tags[2]), 'count': 'exact'}),
+                ('all of two tags', {
+                    'tag': '%s,%s' % (tags[1], tags[2]), 'tag_match': 'all', 'count': 'exact'}),
+            ]
+            self.stdout.write('%-18s %34s %34s' % ('', 'baseline', 'optimised'))
+            for label, params in scenarios:
+                request = factory.get('/api/posts', params)
+                # Mezzanine looks for the current site on the request
+                request.site_id = Site.objects.get_current().pk
+                results = [
+                    self.measure(viewset, request, options['repeat'])
+                    for viewset in [BaselinePostViewSet, PostViewSet]]
+                self.stdout.write('%-18s %34s %34s' % (label, results[0], results[1]))
+            transaction.set_rollback(True)
+
+    def seed(self, suffix, options):
+        start = time.time()
+        user = get_user_model().objects.create(username='benchmark-%s' % suffix)
+        site = Site.objects.get_current()
+        content_type = ContentType.objects.get_for_model(Post)
+        keywords = Keyword.objects.bulk_create([
+            Keyword(site=site, title='tag-%s-%d' % (suffix, i), slug='tag-%s-%d' % (suffix, i))
+            for i in range(options['tags'])], batch_size=5000)
+        keywords = list(Keyword.objects.filter(title__startswith='tag-%s-' % suffix))
+
+        published = now()
+        for offset in range(0, options['posts'], 10000):
+            assigned = {}
+            posts = []
+            for i in range(offset, min(offset + 10000, options['posts'])):
+                assigned[i] = random.sample(keywords, options['tags_per_post'])
+                posts.append(Post(
+                    site=site, user=user, title='Post %d' % i, slug='post-%s-%d' % (suffix, i),
+                    content='<p>Post %d</p>' % i, status=CONTENT_STATUS_PUBLISHED,
+                    publish_date=published,
+                    keywords_string=' '.join(keyword.title for keyword in assigned[i])))
+            posts = Post.objects.bulk_create(posts)
+            AssignedKeyword.objects.bulk_create([
+                AssignedKeyword(keyword=keyword, content_type=content_type, object_pk=post.pk)
+                for post, i in zip(posts, sorted(assigned)) for keyword in assigned[i]
+            ], batch_size=10000)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write('Seeded %d posts with %d tags in %.1fs' % (
+            options['posts'], options['tags'], time.time() - start))
+        return [keyword.title for keyword in keywords]
+
+    def measure(self, viewset, request, repeat):
+        # The serializer builds absolute URLs from Mezzanine's current request
+        view = CurrentRequestMiddleware(viewset.as_view({'get': 'list'}))
+        best = None
+        for i in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.time()
+                response = view(request)
+                response.render()
+                elapsed = time.time() - start
+            if best is None or elapsed < best[0]:
+                best = (elapsed, len(queries), response.data['count'])
+        return '%8.1fms %3d queries %7d posts' % (best[0] * 1000, best[1], best[2])
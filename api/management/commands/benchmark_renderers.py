@@ -0,0 +1,95 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from mezzanine.blog.models import BlogCategory, BlogPost as Post
+from mezzanine.core.models import CONTENT_STATUS_PUBLISHED
+from mezzanine.core.request import CurrentRequestMiddleware
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ...renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+from ...serializers import PostOutputSerializer
+
+
+class Command(BaseCommand):
+    """
+    Measure serializing a list of posts and encoding it with each renderer. Everything
+    is seeded in a transaction that's rolled back afterwards.
+    """
+    help = "Benchmark serializing and rendering post lists of the API"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=1000, help="Posts to serialize (default: 1000)")
+        parser.add_argument(
+            '--comments', type=int, default=5, help="Comments per post (default: 5)")
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help="Runs per measurement, the fastest is reported (default: 5)")
+
+    def handle(self, *args, **options):
+        if min(options['posts'], options['repeat']) < 1 or options['comments'] < 0:
+            raise CommandError("Posts and repeat must be positive, and comments not negative")
+
+        renderers = [('DRF JSON', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('orjson', FastJSONRenderer()))
+        else:
+            self.stdout.write('orjson is not installed, skipping it')
+        if msgpack is not None:
+            renderers.append(('MessagePack', MessagePackRenderer()))
+        else:
+            self.stdout.write('msgpack is not installed, skipping it')
+
+        with transaction.atomic():
+            user = self.seed(uuid.uuid4().hex[:8], options)
+            request = APIRequestFactory().get('/api/posts', {'expand': 'user,categories,comments'})
+            # Mezzanine looks for the current site on the request
+            request.site_id = Site.objects.get_current().pk
+            # The serializer builds absolute URLs from Mezzanine's current request
+            CurrentRequestMiddleware(lambda request: self.run(request, user, renderers, options))(request)
+            transaction.set_rollback(True)
+
+    def seed(self, suffix, options):
+        user = get_user_model().objects.create(username='benchmark-%s' % suffix)
+        categories = [
+            BlogCategory.objects.create(title='Category %s %d' % (suffix, i)) for i in range(3)]
+        for i in range(options['posts']):
+            post = Post.objects.create(
+                user=user, title='Post %d' % i, content='<p>Post %d, caf\xe9 ☃</p>' % i,
+                status=CONTENT_STATUS_PUBLISHED)
+            post.categories.set(categories)
+            for j in range(options['comments']):
+                post.comments.create(comment='Comment %d' % j, user=user, user_name=user.username)
+        return user
+
+    def run(self, request, user, renderers, options):
+        request = Request(request)
+        queryset = PostOutputSerializer.setup_eager_loading(
+            Post.objects.published().filter(user=user).order_by('-publish_date'), request)
+        # A fresh context for each run, the serializer caches post summaries in it
+        elapsed, data = self.measure(
+            lambda: PostOutputSerializer(
+                list(queryset), many=True, context={'request': request}).data,
+            options['repeat'])
+        self.stdout.write('%-12s %10.1fms' % ('serializing', elapsed * 1000))
+        for label, renderer in renderers:
+            elapsed, content = self.measure(lambda: renderer.render(data), options['repeat'])
+            self.stdout.write('%-12s %10.1fms %10d bytes %8.1f MB/s' % (
+                label, elapsed * 1000, len(content), len(content) / elapsed / 1e6))
+
+    def measure(self, func, repeat):
+        best = None
+        for i in range(repeat):
+            start = time.time()
+            result = func()
+            elapsed = time.time() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        return best, result
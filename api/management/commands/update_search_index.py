@@ -0,0 +1,54 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...search import get_search_models, update_index
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the search entries of all posts and pages, for existing content or
+    after changing the languages or text search configurations.
+    """
+    help = "Rebuild the full-text search index of posts and pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Posts or pages indexed per batch (default: 500)")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("The batch size must be a positive integer")
+        for model in get_search_models():
+            count = 0
+            last_pk = 0
+            queryset = model._base_manager.order_by('pk')
+            while True:
+                instances = list(queryset.filter(pk__gt=last_pk)[:options['batch_size']])
+                if not instances:
+                    break
+                last_pk = instances[-1].pk
+                for batch in self.get_content_batches(model, instances):
+                    update_index(batch)
+                count += len(instances)
+            self.stdout.write("Indexed %d %s" % (count, model._meta.verbose_name_plural))
+
+    def get_content_batches(self, model, instances):
+        """
+        Group content typed instances such as pages by subclass, loading each group with
+        one query, since their content is stored on the subclass.
+        """
+        if not hasattr(model, 'get_content_models'):
+            return [instances]
+        content_models = {cls._meta.model_name: cls for cls in model.get_content_models()}
+        groups = defaultdict(list)
+        for instance in instances:
+            groups[instance.content_model].append(instance)
+        batches = []
+        for content_model, group in groups.items():
+            if content_model in content_models:
+                group = list(content_models[content_model]._base_manager.filter(
+                    pk__in=[instance.pk for instance in group]))
+            batches.append(group)
+        return batches
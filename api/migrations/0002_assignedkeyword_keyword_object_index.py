@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# Tag filters look up the objects a keyword is assigned to, which this index covers
+INDEX_NAME = 'api_assignedkeyword_keyword_object_idx'
+
+
+def create_index(apps, schema_editor):
+    model = apps.get_model('generic', 'AssignedKeyword')
+    quote = schema_editor.quote_name
+    columns = [model._meta.get_field(name).column for name in ['keyword', 'content_type', 'object_pk']]
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)' % (
+        quote(INDEX_NAME), quote(model._meta.db_table), ', '.join(map(quote, columns))))
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS %s' % schema_editor.quote_name(INDEX_NAME))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generic', '0003_auto_20170411_0504'),
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Post lists filter on the site and status, and on a publish date range ordered by
+# the latest first, which this index covers in a single (backward) scan
+INDEX_NAME = 'api_blogpost_site_status_publish_idx'
+
+
+def create_index(apps, schema_editor):
+    model = apps.get_model('blog', 'BlogPost')
+    quote = schema_editor.quote_name
+    columns = [model._meta.get_field(name).column for name in ['site', 'status', 'publish_date']]
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)' % (
+        quote(INDEX_NAME), quote(model._meta.db_table), ', '.join(map(quote, columns))))
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS %s' % schema_editor.quote_name(INDEX_NAME))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_auto_20170411_0504'),
+        ('api', '0002_assignedkeyword_keyword_object_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
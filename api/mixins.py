@@ -1,13 +1,28 @@
 """
-Only enable full updates (PUT). Disable partial updates (PATCH).
+Mixins for the API viewsets.
 """
 from __future__ import unicode_literals
+
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, urlencode
+from django.utils.translation import get_language
+from mezzanine.conf import settings
+from mezzanine.utils.sites import current_site_id
 from rest_framework.response import Response
 
+from .cache import (
+    get_generation, get_queryset_key, get_response_data, get_tag, get_version_time,
+    get_versions, get_watched_models, set_response_data)
+
 
 class PutUpdateModelMixin(object):
     """
     Update a model instance via PUT.
+    Only enable full updates (PUT). Disable partial updates (PATCH).
     """
     def update(self, request, *args, **kwargs):
         partial = False
@@ -19,3 +34,144 @@ class PutUpdateModelMixin(object):
 
     def perform_update(self, serializer):
         serializer.save()
+
+
+class EagerLoadingMixin(object):
+    """
+    Let the serializer class load what it outputs for the request along with the queryset,
+    if it has a `setup_eager_loading` class method.
+    """
+    def get_queryset(self):
+        queryset = super(EagerLoadingMixin, self).get_queryset()
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset, self.request)
+        return queryset
+
+
+class ConditionalGetMixin(object):
+    """
+    Answer conditional requests for lists and single objects with 304 responses, before they're
+    serialized. Validators are the latest `updated` time and the number of the objects, read with
+    one query, along with the generations of the cached data (see `cache`), so edits to related
+    objects count too. Deletes and edits of related objects don't change `updated`, so the last
+    modification time is also the time of the latest generation.
+
+    Responses to anonymous requests can be cached publicly for `cache_max_age` seconds, by CDNs
+    as well, and the others privately, after checking they're still valid.
+    """
+    cache_max_age = getattr(settings, 'MZN_API_CACHE_MAX_AGE', 60)
+    last_modified_field = 'updated'
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_conditional_response(
+            queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+            cache_count=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.get_conditional_response(
+            queryset, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+
+    def get_validators(self, queryset, cache_count=False):
+        """
+        The ETag and last modification time of the response for the objects of the queryset.
+        With `cache_count`, the count is shared with the pagination's count cache.
+        """
+        timeout = getattr(self.pagination_class, 'count_cache_timeout', None) if cache_count else None
+        key = get_queryset_key('count', queryset) if timeout else None
+        count = cache.get(key) if key else None
+        queryset = queryset.prefetch_related(None).order_by()
+        if count is None:
+            values = queryset.aggregate(last_modified=Max(self.last_modified_field), count=Count('pk'))
+            if key:
+                cache.set(key, values['count'], timeout)
+        else:
+            values = queryset.aggregate(last_modified=Max(self.last_modified_field))
+            values['count'] = count
+        user = self.request.user
+        parts = [values['count'], values['last_modified'], self.request.get_full_path(), get_language(),
+                 self.request.accepted_media_type, user.pk if user.is_authenticated else None]
+        generations = [get_generation(model) for model in get_watched_models()]
+        parts.extend(generations)
+        etag = '"%s"' % hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+        last_modified = max(get_version_time(generation) for generation in generations)
+        if values['last_modified'] is not None:
+            last_modified = max(last_modified, values['last_modified'])
+        return etag, last_modified
+
+    def get_conditional_response(self, queryset, get_response, cache_count=False):
+        etag, last_modified = self.get_validators(queryset, cache_count)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(self.request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = get_response()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            if self.request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, max_age=self.cache_max_age)
+            patch_vary_headers(response, ('Accept', 'Authorization', 'Cookie'))
+        return response
+
+
+class CachedResponseMixin(object):
+    """
+    Cache the data of list and single object responses, keyed on the request: its path,
+    normalized query string, language, media type, permission classes and user.
+
+    Cached responses are tagged with what they're made of, and writes purge the tags they
+    affect (see `cache`), so they're only served while they're up to date. Lists are tagged
+    with their model, single objects with themselves, and both with `cache_tag_models`,
+    the models of related objects they include.
+    """
+    response_cache_timeout = getattr(settings, 'MZN_API_RESPONSE_CACHE_TIMEOUT', 300)
+    cache_tag_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+    def get_cache_tags(self):
+        model = self.queryset.model
+        if self.action == 'retrieve':
+            tags = [get_tag(model, self.kwargs[self.lookup_url_kwarg or self.lookup_field])]
+        else:
+            tags = [get_tag(model)]
+        return tags + [get_tag(model) for model in self.cache_tag_models]
+
+    def get_response_cache_key(self):
+        params = self.request.query_params
+        user = self.request.user
+        parts = [
+            current_site_id(), self.request.scheme, self.request.get_host(),
+            self.action, self.request.path, urlencode(sorted(
+                (name, value) for name in params for value in params.getlist(name))),
+            get_language(), self.request.accepted_media_type,
+            [permission.__name__ for permission in self.permission_classes],
+            user.pk if user.is_authenticated else None,
+        ]
+        return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+    def get_cached_response(self, get_response):
+        if not self.response_cache_timeout:
+            return get_response()
+        key = self.get_response_cache_key()
+        data = get_response_data(key)
+        if data is not None:
+            return Response(data)
+        versions = get_versions(self.get_cache_tags())
+        response = get_response()
+        if response.status_code == 200:
+            set_response_data(key, response.data, versions, self.response_cache_timeout)
+        return response
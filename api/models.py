@@ -0,0 +1,26 @@
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class SearchEntry(models.Model):
+    """
+    The searchable text of a post or page in one language.
+    On PostgreSQL it's indexed through `search_vector`, built with the text search
+    configuration of the language. Other databases use a separate FTS5 table.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    language = models.CharField(max_length=10)
+    title = models.TextField(blank=True)
+    content = models.TextField(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        unique_together = ('content_type', 'object_id', 'language')
+        verbose_name_plural = 'search entries'
+
+    def __str__(self):
+        return '%s (%s)' % (self.title, self.language)
@@ -1,14 +1,114 @@
-from rest_framework.pagination import LimitOffsetPagination
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
 from mezzanine.conf import settings
+from mezzy.utils.paginator import get_table_estimate
+
+from .cache import get_queryset_key
+
+
+class MezzanineCursorPagination(CursorPagination):
+    """
+    Cursor pagination for the view's ordering, which keeps deep pages as fast as the
+    first one and skips the count query.
+    """
+    ordering = 'id'
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Order by the column of relations rather than the related object, and by ID
+        after that so pages are stable when the first field has duplicate values.
+        """
+        ordering = list(super(MezzanineCursorPagination, self).get_ordering(request, queryset, view))
+        prefix = '-' if ordering[0].startswith('-') else ''
+        try:
+            field = queryset.model._meta.get_field(ordering[0].lstrip('-'))
+        except FieldDoesNotExist:
+            pass
+        else:
+            ordering[0] = prefix + field.attname
+        if not {'id', '-id', 'pk', '-pk'}.intersection(ordering):
+            ordering.append(prefix + 'id')
+        return tuple(ordering)
 
 
 class MezzaninePagination(LimitOffsetPagination):
     """
     Default pagination class.
     Let large result sets be split into individual pages of data.
+    Requests with a `cursor` parameter, or `pagination=cursor` for the first page,
+    are paginated by cursor instead of by offset.
+
+    Counts are cached for `count_cache_timeout` seconds per query, and invalidated
+    whenever the model is written to. Unfiltered lists with at least
+    `estimate_count_min` rows use the planner estimate on PostgreSQL. The response's
+    `count_exact` tells clients which they got; `count=exact` always counts.
     """
     default_limit = 20
     max_limit = getattr(settings, 'MZN_API_LIMIT_MAX', 100)
+    count_cache_timeout = getattr(settings, 'MZN_API_COUNT_CACHE_TIMEOUT', 60)
+    estimate_count_min = getattr(settings, 'MZN_API_ESTIMATE_COUNT_MIN', 100000)
+    cursor_pagination_class = MezzanineCursorPagination
+    cursor_paginator = None
+    count_exact = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            self.cursor_paginator.page_size = self.default_limit
+            self.cursor_paginator.max_page_size = self.max_limit
+            if getattr(view, 'ordering', None):
+                self.cursor_paginator.ordering = view.ordering
+            page = self.cursor_paginator.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.cursor_paginator.display_page_controls
+            return page
+        return super(MezzaninePagination, self).paginate_queryset(queryset, request, view)
+
+    def use_cursor(self, request):
+        params = request.query_params
+        return (self.cursor_pagination_class.cursor_query_param in params or
+                params.get('pagination') == 'cursor')
+
+    def get_count(self, queryset):
+        self.count_exact = True
+        if not isinstance(queryset, QuerySet) or self.request.query_params.get('count') == 'exact':
+            return super(MezzaninePagination, self).get_count(queryset)
+
+        estimate = get_table_estimate(queryset)
+        if estimate is not None and estimate >= self.estimate_count_min:
+            self.count_exact = False
+            return estimate
+
+        key = get_queryset_key('count', queryset) if self.count_cache_timeout else None
+        count = cache.get(key) if key else None
+        if count is None:
+            count = super(MezzaninePagination, self).get_count(queryset)
+            if key:
+                cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_exact', self.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super(MezzaninePagination, self).to_html()
 
 
 class PostPagination(MezzaninePagination):
@@ -16,3 +116,12 @@ class PostPagination(MezzaninePagination):
     Pagination for Blog Posts
     """
     default_limit = 10
+
+
+class CommentPagination(MezzanineCursorPagination):
+    """
+    Pagination for comment threads, oldest first
+    """
+    ordering = 'submit_date'
+    page_size = 20
+    max_page_size = getattr(settings, 'MZN_API_LIMIT_MAX', 100)
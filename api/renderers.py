@@ -0,0 +1,89 @@
+"""
+Renderers and parsers for the API: JSON encoded with orjson, which is several times
+faster than the standard library on large lists, and MessagePack. Both libraries are
+optional; JSON falls back to the standard library when orjson isn't installed, and
+MessagePack is only registered in the settings when msgpack is.
+"""
+from __future__ import unicode_literals
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def encode_default(obj):
+    """
+    Encode what the fast encoders don't support natively, like DRF's JSON encoder does.
+    """
+    return encoders.JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer using orjson, with the same output as DRF's renderer in its default
+    compact mode. Indented output, and any output without orjson, is left to DRF.
+    """
+    # Datetimes are formatted by DRF's encoder, which differs from orjson's format
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        if (orjson is None or data is None or not self.compact or self.ensure_ascii or
+                self.get_indent(accepted_media_type, renderer_context)):
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=encode_default, option=self.options)
+        # Escaped like DRF does, as they aren't valid in JavaScript strings
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON parser using orjson, if it's installed.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super(FastJSONParser, self).parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % exc)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack renderer, chosen with an `Accept: application/msgpack` header or `?format=msgpack`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """
+    MessagePack parser for request bodies sent as `application/msgpack`.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as exc:
+            raise ParseError('MessagePack parse error - %s' % exc)
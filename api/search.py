@@ -0,0 +1,231 @@
+"""
+Full-text search for posts and pages, in each of the site's languages.
+
+Every post and page has a SearchEntry per language, kept up to date when they're
+saved. PostgreSQL matches entries against their `search_vector` (with a GIN index
+created by the migration), using the text search configuration of the language.
+SQLite falls back to an FTS5 table created by the migration, mainly so the tests
+can run. Other databases match the words of the entries without an index.
+"""
+from __future__ import unicode_literals
+
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections, transaction
+from django.db.models import F, FloatField, Func, OuterRef, Q, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.template.defaultfilters import strip_tags
+from django.utils.translation import get_language
+
+from mezzanine.conf import settings
+
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from .models import SearchEntry
+
+FTS_TABLE = 'api_searchentry_fts'
+
+# Text search configuration per language, others use 'simple'
+SEARCH_CONFIGS = getattr(settings, 'MZN_API_SEARCH_CONFIGS', {
+    'de': 'german',
+    'en': 'english',
+    'es': 'spanish',
+    'ru': 'russian',
+})
+
+
+def get_search_models():
+    """
+    Searchable models and the fields that are indexed, title first.
+    """
+    from mezzanine.blog.models import BlogPost
+    from mezzanine.pages.models import Page
+    return {BlogPost: ('title', 'content'), Page: ('title', 'content')}
+
+
+def get_search_model(model):
+    for search_model in get_search_models():
+        if issubclass(model, search_model):
+            return search_model
+    return None
+
+
+def get_languages():
+    if settings.USE_MODELTRANSLATION:
+        return [code for code, name in settings.LANGUAGES]
+    return [settings.LANGUAGE_CODE]
+
+
+def get_config(language):
+    return SEARCH_CONFIGS.get(language.split('-')[0], 'simple')
+
+
+def get_field_value(instance, name, language):
+    """
+    Value of a field in the given language, falling back to the default language
+    like modeltranslation does.
+    """
+    if settings.USE_MODELTRANSLATION:
+        from modeltranslation.utils import build_localized_fieldname
+        for code in [language, settings.LANGUAGE_CODE]:
+            value = getattr(instance, build_localized_fieldname(name, code), None)
+            if value:
+                return value
+    return getattr(instance, name, '') or ''
+
+
+def get_entries(instance):
+    """
+    Unsaved search entries for each language of a post or page.
+    """
+    title_field, content_field = get_search_models()[get_search_model(type(instance))]
+    if not hasattr(instance, content_field) and hasattr(instance, 'get_content_model'):
+        instance = instance.get_content_model()
+    content_type = ContentType.objects.get_for_model(get_search_model(type(instance)))
+    return [
+        SearchEntry(
+            content_type=content_type, object_id=instance.pk, language=language,
+            title=get_field_value(instance, title_field, language),
+            content=strip_tags(get_field_value(instance, content_field, language)))
+        for language in get_languages()
+    ]
+
+
+def delete_entries(model, ids):
+    entries = SearchEntry.objects.filter(
+        content_type=ContentType.objects.get_for_model(model), object_id__in=ids)
+    connection = connections[entries.db]
+    if connection.vendor == 'sqlite':
+        sql, params = entries.values('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s WHERE rowid IN (%s)' % (FTS_TABLE, sql), params)
+    entries.delete()
+
+
+def update_index(instances):
+    """
+    Replace the search entries of posts or pages of the same model.
+    """
+    if not instances:
+        return
+    model = get_search_model(type(instances[0]))
+    entries = [entry for instance in instances for entry in get_entries(instance)]
+    with transaction.atomic():
+        delete_entries(model, [instance.pk for instance in instances])
+        entries = SearchEntry.objects.bulk_create(entries)
+        ids = [entry.pk for entry in entries]
+        connection = connections[SearchEntry.objects.db]
+        if connection.vendor == 'postgresql':
+            for language in get_languages():
+                config = get_config(language)
+                SearchEntry.objects.filter(pk__in=ids, language=language).update(search_vector=(
+                    SearchVector('title', weight='A', config=config) +
+                    SearchVector('content', weight='B', config=config)))
+        elif connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'INSERT INTO %s (rowid, title, content) SELECT id, title, content FROM %s '
+                    'WHERE id IN (%s)' % (
+                        FTS_TABLE, SearchEntry._meta.db_table, ', '.join(['%s'] * len(ids))),
+                    ids)
+
+
+class FTS5Rank(Func):
+    """
+    BM25 rank of a search entry against an FTS5 query, with the title weighted
+    above the content. Higher is better.
+    """
+    template = '(SELECT -bm25(%s, 10.0, 1.0) FROM %s WHERE %s MATCH %%(expressions)s)' % (
+        (FTS_TABLE,) * 3)
+    arg_joiner = ' AND rowid = '
+    output_field = FloatField()
+
+    def __init__(self, query, entry_id, **extra):
+        super(FTS5Rank, self).__init__(Value(query), entry_id, **extra)
+
+
+def get_fts5_query(terms):
+    """
+    Match all the words of the search terms, ignoring FTS5 query syntax.
+    """
+    return ' '.join('"%s"' % word.replace('"', '""') for word in terms.split())
+
+
+def search(queryset, terms, language=None):
+    """
+    Posts or pages of the queryset matching the search terms in a language,
+    annotated with their `search_rank`.
+    """
+    language = language or get_language() or settings.LANGUAGE_CODE
+    if language not in get_languages():
+        language = settings.LANGUAGE_CODE
+    entries = SearchEntry.objects.filter(
+        content_type=ContentType.objects.get_for_model(get_search_model(queryset.model)),
+        language=language)
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = SearchQuery(terms, config=get_config(language), search_type='websearch')
+        matches = entries.filter(search_vector=query)
+        rank = SearchRank(F('search_vector'), query)
+    elif vendor == 'sqlite':
+        query = get_fts5_query(terms)
+        matches = entries.filter(id__in=RawSQL(
+            'SELECT rowid FROM %s WHERE %s MATCH %%s' % (FTS_TABLE, FTS_TABLE), [query]))
+        rank = FTS5Rank(query, F('id'))
+    else:
+        matches = entries
+        for word in terms.split():
+            matches = matches.filter(Q(title__icontains=word) | Q(content__icontains=word))
+        rank = Value(0.0)
+
+    ranks = matches.filter(object_id=OuterRef('pk')).annotate(rank=rank).values('rank')[:1]
+    return queryset.filter(pk__in=matches.values('object_id')).annotate(
+        search_rank=Subquery(ranks, output_field=FloatField()))
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Filter by the `search` parameter with the full-text index, ordering the results
+    by rank unless another ordering is requested.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+        queryset = search(queryset, terms)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            queryset = queryset.order_by('-search_rank', *ordering)
+        return queryset
+
+
+def instance_saved(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    # Saves of other fields, such as comment counts, don't change the entries
+    fields = get_search_models()[get_search_model(sender)]
+    if update_fields is not None and not any(
+            name == field or name.startswith(field + '_') for name in update_fields for field in fields):
+        return
+    update_index([instance])
+
+
+def instance_deleted(sender, instance, **kwargs):
+    delete_entries(get_search_model(sender), [instance.pk])
+
+
+def connect_signals():
+    """
+    Keep the search entries of posts and pages, including subclasses, up to date.
+    """
+    from django.apps import apps
+    search_models = tuple(get_search_models())
+    for model in apps.get_models():
+        if issubclass(model, search_models):
+            post_save.connect(instance_saved, sender=model, dispatch_uid='mezzanine_api_search')
+            post_delete.connect(instance_deleted, sender=model, dispatch_uid='mezzanine_api_search')
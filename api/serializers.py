@@ -1,16 +1,30 @@
+from collections import OrderedDict, defaultdict
+
+from django.db import models, transaction
+from django.db.models import Prefetch
+from django.db.models.expressions import RawSQL
 from django.urls import NoReverseMatch
 from django.template.defaultfilters import strip_tags
 from django.contrib.auth import get_user_model
 from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.utils.translation import get_language
 
 from mezzanine.blog.models import BlogPost as Post, BlogCategory
 from mezzanine.pages.models import Page
-from mezzanine.generic.models import Comment
+from mezzanine.generic.models import Comment, ThreadedComment
 from mezzanine.conf import settings
+from mezzanine.core.models import CONTENT_STATUS_PUBLISHED
 from mezzanine.utils.sites import current_request
 
 from rest_framework import serializers
 
+from . import search
+from .bulk import (
+    get_categories, get_category_names, get_update_fields, insert_slugged, prepare_for_insert,
+    prepare_for_update)
+from .cache import invalidate, invalidate_objects
+
 # Supports custom user models
 User = get_user_model()
 
@@ -28,6 +42,87 @@ class PrivateField(serializers.ReadOnlyField):
         return None
 
 
+class FieldParams(object):
+    """
+    Fields and expanded relations requested with the comma separated `fields` and `expand`
+    query parameters. Either is None when it isn't given, to include or expand everything
+    but the `optional` fields, which are only included when they're named in either.
+    """
+    fields_param = 'fields'
+    expand_param = 'expand'
+
+    def __init__(self, request=None, optional=()):
+        params = request.query_params if request is not None else {}
+        self.fields = self.parse(params.get(self.fields_param))
+        self.expand = self.parse(params.get(self.expand_param))
+        self.optional = optional
+
+    @staticmethod
+    def parse(value):
+        if value is None:
+            return None
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+    def includes(self, name):
+        if name in self.optional:
+            return name in (self.fields or ()) or name in (self.expand or ())
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.expand is None or name in self.expand
+
+
+class DynamicFieldsMixin(object):
+    """
+    Output only the requested fields, with the relations in `expandable_fields` nested in full
+    if they're expanded and as primary keys otherwise. The `optional_fields` are left out
+    unless they're requested. Nested serializers output all their fields.
+
+    `setup_eager_loading` loads the columns of the requested fields only, including those
+    read by the fields in `field_sources`, which aren't model fields themselves.
+    """
+    expandable_fields = ()
+    optional_fields = ()
+    field_sources = {}
+
+    @classmethod
+    def get_field_params(cls, request):
+        return FieldParams(request, cls.optional_fields)
+
+    @classmethod
+    def get_model_fields(cls, params):
+        """
+        Names of the model fields the requested fields are read from.
+        """
+        opts = cls.Meta.model._meta
+        concrete = {field.name for field in opts.concrete_fields}
+        names = {opts.pk.name}
+        for name in cls.Meta.fields:
+            if params.includes(name):
+                names.update(source for source in cls.field_sources.get(name, (name,)) if source in concrete)
+        return names
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None):
+        return queryset.only(*cls.get_model_fields(cls.get_field_params(request)))
+
+    def get_fields(self):
+        fields = super(DynamicFieldsMixin, self).get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+
+        params = self.get_field_params(self.context.get('request'))
+        fields = OrderedDict((name, field) for name, field in fields.items() if params.includes(name))
+        for name in self.expandable_fields:
+            if name in fields and not params.expands(name):
+                many = isinstance(fields[name], serializers.ListSerializer)
+                fields[name] = serializers.PrimaryKeyRelatedField(many=many, read_only=True)
+        return fields
+
+
 class SiteSerializer(serializers.ModelSerializer):
     """
     Serializing public site data
@@ -46,7 +141,7 @@ class SiteSerializer(serializers.ModelSerializer):
         fields = ['title', 'tagline', 'domain']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializing all the users
     """
@@ -78,68 +173,279 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'user_name', 'comment', 'submit_date', 'is_public', 'is_removed']
 
 
-class RecursiveField(serializers.Serializer):
+class CommentReplies(object):
     """
-    A serializer field to support parent-child page relationships
+    Replies to comments, at any depth, loaded with a single recursive query for any number of
+    comments and assembled into threads in memory.
     """
-    def to_representation(self, value):
-        serializer = self.parent.parent.__class__(value, context=self.context)
-        if serializer.cond is not None:
-            return serializer.cond(serializer.data)
-        else:
-            return serializer.data
+    sql = (
+        'WITH RECURSIVE replies (id) AS ('
+        'SELECT {pk} FROM {table} WHERE {parent} IN ({ids}) '
+        'UNION ALL SELECT c.{pk} FROM {table} c INNER JOIN replies r ON c.{parent} = r.id'
+        ') SELECT id FROM replies')
 
+    def __init__(self):
+        self.replies = defaultdict(list)
+        self.loaded = set()
 
-class ChildPageSerializer(serializers.ModelSerializer):
+    def load(self, comments):
+        """
+        Load the visible replies to any of the comments whose replies aren't loaded yet.
+        """
+        ids = [comment.pk for comment in comments if comment.pk not in self.loaded]
+        if not ids:
+            return
+        opts = ThreadedComment._meta
+        sql = self.sql.format(
+            pk=opts.pk.column, table=opts.db_table, parent=opts.get_field('replied_to').column,
+            ids=', '.join(['%s'] * len(ids)))
+        replies = ThreadedComment.objects.visible().filter(pk__in=RawSQL(sql, ids)).select_related(
+            'user').order_by('submit_date', 'pk')
+        self.loaded.update(ids)
+        for reply in replies:
+            self.replies[reply.replied_to_id].append(reply)
+            self.loaded.add(reply.pk)
+
+    def get_replies(self, comment):
+        # Replies to hidden comments are left out along with them
+        self.load([comment])
+        return self.replies[comment.pk]
+
+
+class ThreadListSerializer(serializers.ListSerializer):
     """
-    Serializing child pages
+    Serializing a list of comments, with the replies to all of them loaded up front
     """
 
-    def cond(self, child):
-        if child['status'] == 2:
-            return child
-        else:
-            return None
+    def to_representation(self, data):
+        comments = list(data.all() if isinstance(data, models.Manager) else data)
+        self.child.get_replies_loader().load(comments)
+        return super(ThreadListSerializer, self).to_representation(comments)
 
-    children = RecursiveField(many=True)
 
-    class Meta:
-        model = Page
-        fields = ('id', 'title', 'children', 'status', '_order',)
+class ThreadSerializer(CommentSerializer):
+    """
+    Serializing comments with their replies nested
+    """
+    replies = serializers.SerializerMethodField()
+
+    def get_replies_loader(self):
+        """
+        Replies to the comments being serialized, shared through the context.
+        """
+        if 'comment_replies' not in self.context:
+            self.context['comment_replies'] = CommentReplies()
+        return self.context['comment_replies']
+
+    def get_replies(self, obj):
+        replies = self.get_replies_loader().get_replies(obj)
+        return ThreadSerializer(replies, many=True, context=self.context).data
+
+    class Meta(CommentSerializer.Meta):
+        model = ThreadedComment
+        list_serializer_class = ThreadListSerializer
+        fields = CommentSerializer.Meta.fields + ['replied_to', 'replies']
+
+
+class PageTree(object):
+    """
+    The page tree loaded with a single query and assembled in memory, to serialize
+    the children of any number of pages without a query per page.
+    """
+    fields = ('id', 'title', 'status', '_order')
+
+    def __init__(self, queryset=None):
+        if queryset is None:
+            queryset = Page.objects.all()
+        self.children = defaultdict(list)
+        for page in queryset.values('parent_id', *self.fields):
+            self.children[page.pop('parent_id')].append(page)
+
+    def get_children(self, page_id, depth=None):
+        """
+        Published children of a page with their own children nested up to `depth` levels.
+        """
+        if depth is not None:
+            if depth < 1:
+                return []
+            depth -= 1
+        return [
+            dict(page, children=self.get_children(page['id'], depth))
+            for page in self.children[page_id] if page['status'] == CONTENT_STATUS_PUBLISHED
+        ]
+
+
+class PageContent(object):
+    """
+    Content and gallery images of pages, loaded in bulk with a query per content model
+    rather than one or two per page.
+    """
+    content_models = ('richtextpage', 'form')
+    gallery_model = 'gallery'
+
+    def __init__(self):
+        self.content = {}
+        self.gallery_items = {}
+        self.models = {model._meta.model_name: model for model in Page.get_content_models()}
+
+    def load(self, pages):
+        """
+        Load the content of any of the pages that isn't loaded yet.
+        """
+        ids = defaultdict(list)
+        for page in pages:
+            if page.id not in self.content:
+                ids[page.content_model].append(page.id)
+                self.content[page.id] = None
+                self.gallery_items[page.id] = []
+
+        # The pages are already restricted to the current site
+        for content_model in self.content_models:
+            if ids[content_model] and content_model in self.models:
+                queryset = self.models[content_model]._base_manager.filter(id__in=ids[content_model])
+                self.content.update(queryset.values_list('id', 'content'))
+
+        if ids[self.gallery_model] and self.gallery_model in self.models:
+            images = self.models[self.gallery_model]._meta.get_field('images').related_model
+            for item in images._base_manager.filter(gallery__in=ids[self.gallery_model]).values():
+                item['url'] = settings.MEDIA_URL + item['file']
+                self.gallery_items[item['gallery_id']].append(item)
+
+
+class PageListSerializer(serializers.ListSerializer):
+    """
+    Serializing a list of pages, with the content of all of them loaded up front
+    """
 
+    def to_representation(self, data):
+        pages = list(data.all() if isinstance(data, models.Manager) else data)
+        if 'content' in self.child.fields or 'gallery_items' in self.child.fields:
+            self.child.get_content_loader().load(pages)
+        return super(PageListSerializer, self).to_representation(pages)
 
-class PageSerializer(serializers.ModelSerializer):
+
+class PageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializing all the pages
     """
     content = serializers.SerializerMethodField('get_page_content')
     meta_description = serializers.CharField(source='description', read_only=True)
     tags = serializers.CharField(source='keywords_string', read_only=True)
-    children = ChildPageSerializer(many=True)
+    children = serializers.SerializerMethodField()
     gallery_items = serializers.SerializerMethodField('get_gallery_content')
 
+    field_sources = {
+        'content': ('content_model',),
+        'meta_description': ('description',),
+        'tags': ('keywords_string',),
+        'gallery_items': ('content_model',),
+    }
+
+    def get_children(self, obj):
+        """
+        Published child pages down to the optional `depth` in the context, read from the page
+        tree shared by all the pages being serialized.
+        """
+        depth = self.context.get('depth')
+        if depth == 0:
+            return []
+        if 'page_tree' not in self.context:
+            self.context['page_tree'] = PageTree()
+        return self.context['page_tree'].get_children(obj.id, depth)
+
+    def get_content_loader(self):
+        """
+        Content loaded for the pages being serialized, shared through the context.
+        """
+        if 'page_content' not in self.context:
+            self.context['page_content'] = PageContent()
+        return self.context['page_content']
+
     def get_page_content(self, obj):
-        if obj.content_model == 'richtextpage':
-            return obj.richtextpage.content
-        elif obj.content_model == 'form':
-            return obj.form.content
-        else:
-            return None
+        loader = self.get_content_loader()
+        loader.load([obj])
+        return loader.content[obj.id]
 
     def get_gallery_content(self, obj):
-        items = []
-        if hasattr(obj, 'gallery'):
-            for item in obj.gallery.images.values():
-                item['url'] = settings.MEDIA_URL + item['file']
-                items.append(item)
-        return items
+        loader = self.get_content_loader()
+        loader.load([obj])
+        return loader.gallery_items[obj.id]
 
     class Meta:
         model = Page
+        list_serializer_class = PageListSerializer
         fields = ('id', 'parent', 'title', 'content', 'content_model', 'slug', 'publish_date',
                   'login_required', 'meta_description', 'tags', 'gallery_items', 'children', 'in_menus',)
 
 
+def get_short_url(post):
+    """
+    Get short URL of blog post like '/blog/<slug>/' using ``get_absolute_url`` if available.
+    Removes dependency on reverse URLs of Mezzanine views when deploying Mezzanine only as an API backend.
+    """
+    try:
+        return post.get_absolute_url()
+    except NoReverseMatch:
+        return '/blog/' + post.slug
+
+
+class PostSummaries(object):
+    """
+    Excerpts and short URLs of blog posts, which are cached for each version of a post (its ID,
+    last update and the language) and loaded from the cache in bulk.
+    """
+    cache_key = 'mezzanine_api:post:%s:%s:%s:%s'
+    cache_timeout = getattr(settings, 'MZN_API_POST_CACHE_TIMEOUT', 60 * 60 * 24)
+    compute = {
+        'excerpt': lambda post: strip_tags(post.description_from_content()),
+        'short_url': get_short_url,
+    }
+
+    def __init__(self):
+        self.values = defaultdict(dict)
+
+    def get_key(self, name, post):
+        if post.updated is None:
+            return None
+        return self.cache_key % (name, post.pk, post.updated.timestamp(), get_language())
+
+    def load(self, posts, names):
+        """
+        Load the named values of any of the posts they aren't loaded for yet.
+        """
+        missing = [(name, post) for name in names for post in posts if name not in self.values[post.pk]]
+        keys = [self.get_key(name, post) for name, post in missing]
+        cached = cache.get_many([key for key in keys if key])
+        computed = {}
+        for key, (name, post) in zip(keys, missing):
+            if key in cached:
+                self.values[post.pk][name] = cached[key]
+            else:
+                self.values[post.pk][name] = self.compute[name](post)
+                if key:
+                    computed[key] = self.values[post.pk][name]
+        if computed:
+            cache.set_many(computed, self.cache_timeout)
+
+    def get(self, name, post):
+        self.load([post], [name])
+        return self.values[post.pk][name]
+
+
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Serializing a list of blog posts, with the excerpts and URLs of all of them loaded up front
+    """
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.Manager) else data)
+        names = [name for name in PostSummaries.compute if name in self.child.fields]
+        if 'url' in self.child.fields and 'short_url' not in names:
+            names.append('short_url')
+        self.child.get_summaries().load(posts, names)
+        return super(PostListSerializer, self).to_representation(posts)
+
+
 class PostCreateSerializer(serializers.ModelSerializer):
     """
     Serializing write access to CREATE a blog post
@@ -153,30 +459,17 @@ class PostCreateSerializer(serializers.ModelSerializer):
     # Create a blog post
     def create(self, validated_data):
         # Pop categories attribute to process later
-        try:
-            categories = validated_data.pop("categories")
-        except KeyError:
-            categories = None
-
-        # Create a new blog post with core attributes
-        initial = {
-            "title": validated_data.pop("title"),
-            "user": self.context['request'].user,
-        }
-        post = Post.objects.create(**initial)
-
-        # Update all other object attributes that were supplied in the request (except categories)
-        for k, v in validated_data.items():
-            setattr(post, k, v)
+        categories = validated_data.pop("categories", None)
+
+        # Create a new blog post with all the attributes that were supplied in the request (except categories)
+        post = Post(user=self.context['request'].user, **validated_data)
+        post.save()
 
         # Create categories as necessary from a comma delimited representation and associate them with the blog post
         if categories:
-            for name in categories.split(','):
-                name = name.strip()
-                cat, created = BlogCategory.objects.get_or_create(title=name)
-                post.categories.add(cat)
-
-        post.save()
+            names = get_category_names(categories)
+            titles = get_categories(names)
+            post.categories.set([titles[name] for name in names])
 
         # Note: response body returned by API on CREATE shows "categories": "blog.BlogCategory.None" rather than
         # the successfully processed comma delimited category list specified in the request.
@@ -201,33 +494,18 @@ class PostUpdateSerializer(serializers.ModelSerializer):
     # Update a blog post
     def update(self, instance, validated_data):
         # Pop categories attribute to process later
-        try:
-            categories = validated_data.pop("categories")
-        except KeyError:
-            categories = None
+        categories = validated_data.pop("categories", None)
 
         # Update all object attributes that were supplied in the request (except categories)
         for k, v in validated_data.items():
             setattr(instance, k, v)
 
-        # Handle updating the `categories` field of blog posts using flat representation (comma delimited)
+        # Handle updating the `categories` field of blog posts using flat representation (comma delimited).
+        # An empty string disassociates all categories from the blog post.
         if categories is not None:
-            if categories:
-                # Disassociate any blog post categories not included in the request
-                cat_titles = [name for name in categories.split(',')]
-                for category in instance.categories.all():
-                    if category.title not in cat_titles:
-                        instance.categories.remove(category)
-
-                # Add any new categories from the request that are not already associated with the blog post
-                for name in categories.split(','):
-                    name = name.strip()
-                    cat, created = BlogCategory.objects.get_or_create(title=name)
-                    instance.categories.add(cat)
-            else:
-                # Categories is an empty string, so disassociate all categories from the blog post
-                for category in instance.categories.all():
-                    instance.categories.remove(category)
+            names = get_category_names(categories)
+            titles = get_categories(names)
+            instance.categories.set([titles[name] for name in names])
 
         instance.save()
 
@@ -238,7 +516,85 @@ class PostUpdateSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'content', 'categories', 'status', 'publish_date', 'expiry_date', 'allow_comments')
 
 
-class PostOutputSerializer(serializers.ModelSerializer):
+class PostBulkListSerializer(serializers.ListSerializer):
+    """
+    Creating and updating blog posts in bulk, a batch at a time with a transaction per batch.
+    Each batch inserts and updates its posts with a query each, creates the missing categories
+    with one more, and replaces the category links of its posts with a delete and an insert.
+    """
+    batch_size = getattr(settings, 'MZN_API_BULK_BATCH_SIZE', 500)
+
+    def validate(self, attrs):
+        ids = [item['id'] for item in attrs if item.get('id') is not None]
+        if len(set(ids)) < len(ids):
+            raise serializers.ValidationError('Posts can only be updated once per request.')
+        missing = set(ids) - set(Post.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        if missing:
+            raise serializers.ValidationError(
+                'No blog posts with IDs %s.' % ', '.join(map(str, sorted(missing))))
+        return attrs
+
+    def create(self, validated_data):
+        posts = []
+        for offset in range(0, len(validated_data), self.batch_size):
+            with transaction.atomic():
+                posts.extend(self.save_batch(validated_data[offset:offset + self.batch_size]))
+        return posts
+
+    def save_batch(self, items):
+        items = [dict(item) for item in items]
+        categories = [item.pop('categories', None) for item in items]
+        instances = Post.objects.in_bulk([item['id'] for item in items if item.get('id') is not None])
+        posts, created, updated, fields = [], [], [], set()
+        for item in items:
+            post_id = item.pop('id', None)
+            if post_id is None:
+                post = Post(user=self.context['request'].user, **item)
+                created.append(post)
+            else:
+                post = instances[post_id]
+                for k, v in item.items():
+                    setattr(post, k, v)
+                fields.update(item)
+                updated.append(post)
+            posts.append(post)
+
+        if created:
+            prepare_for_insert(created)
+            insert_slugged(created)
+        if updated:
+            prepare_for_update(updated)
+            Post.objects.bulk_update(updated, get_update_fields(Post, fields | {'updated', 'description'}))
+
+        # Replace the categories of the posts that were given some, looking them all up at once
+        names = [get_category_names(value) if value is not None else None for value in categories]
+        linked = [post.pk for post, value in zip(posts, names) if value is not None]
+        if linked:
+            titles = get_categories([name for value in names if value for name in value])
+            through = Post.categories.through
+            through.objects.filter(blogpost__in=linked).delete()
+            through.objects.bulk_create([
+                through(blogpost_id=post.pk, blogcategory_id=titles[name].pk)
+                for post, value in zip(posts, names) if value for name in value])
+
+        # Bulk writes don't send the signals that keep the search index and cached data up to date
+        search.update_index(posts)
+        invalidate_objects(Post, [post.pk for post in posts])
+        invalidate(BlogCategory)
+        return posts
+
+
+class PostBulkSerializer(PostCreateSerializer):
+    """
+    Serializing write access to CREATE or UPDATE blog posts in bulk, posts with an `id` being updated
+    """
+    id = serializers.IntegerField(required=False)
+
+    class Meta(PostCreateSerializer.Meta):
+        list_serializer_class = PostBulkListSerializer
+
+
+class PostOutputSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializing read access to blog posts
     """
@@ -250,31 +606,73 @@ class PostOutputSerializer(serializers.ModelSerializer):
     comments = CommentSerializer(many=True, read_only=True)
     excerpt = serializers.SerializerMethodField()
 
+    expandable_fields = ('user', 'categories', 'comments')
+    # Comments are listed by the comments endpoint of each post
+    optional_fields = ('comments',)
+    field_sources = {
+        'excerpt': ('content', 'description', 'title', 'updated'),
+        'url': ('slug', 'publish_date', 'updated'),
+        'short_url': ('slug', 'publish_date', 'updated'),
+        'tags': ('keywords_string',),
+    }
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None):
+        """
+        Load everything the serializer outputs for a page of blog posts in a fixed number of queries:
+        authors are joined, categories and visible comments with their users are prefetched.
+        Relations that aren't requested are skipped, and only the IDs of those that aren't expanded
+        are loaded.
+        """
+        params = cls.get_field_params(request)
+        queryset = super(PostOutputSerializer, cls).setup_eager_loading(queryset, request)
+        if params.includes('user') and params.expands('user'):
+            queryset = queryset.select_related('user')
+        if params.includes('categories'):
+            fields = ('id', 'title', 'slug') if params.expands('categories') else ('id',)
+            queryset = queryset.prefetch_related(
+                Prefetch('categories', queryset=BlogCategory.objects.only(*fields)))
+        if params.includes('comments'):
+            comments = ThreadedComment.objects.visible()
+            if params.expands('comments'):
+                comments = comments.select_related('user')
+            else:
+                comments = comments.only('id', 'content_type', 'object_pk')
+            queryset = queryset.prefetch_related(Prefetch('comments', queryset=comments))
+        return queryset
+
+    def get_summaries(self):
+        """
+        Excerpts and short URLs of the blog posts being serialized, shared through the context.
+        """
+        if 'post_summaries' not in self.context:
+            self.context['post_summaries'] = PostSummaries()
+        return self.context['post_summaries']
+
     def get_short_url(self, obj):
         """
-        Get short URL of blog post like '/blog/<slug>/' using ``get_absolute_url`` if available.
-        Removes dependency on reverse URLs of Mezzanine views when deploying Mezzanine only as an API backend.
+        Get short URL of blog post, see ``get_short_url``.
         """
-        try:
-            url = obj.get_absolute_url()
-        except NoReverseMatch:
-            url = '/blog/' + obj.slug
-        return url
+        return self.get_summaries().get('short_url', obj)
 
     def get_url(self, obj):
         """
         Get full URL of blog post as host + ``get_short_url``, inspired by method ``get_absolute_url_with_host``.
-        Removes dependency on reverse URLs of Mezzanine views when deploying Mezzanine only as an API backend.
+        The host is looked up once for all the posts being serialized.
         """
-        return current_request().build_absolute_uri(self.get_short_url(obj))
+        if 'post_url_prefix' not in self.context:
+            self.context['post_url_prefix'] = current_request().build_absolute_uri('/')[:-1]
+        url = self.get_short_url(obj)
+        return self.context['post_url_prefix'] + url if url.startswith('/') else url
 
     def get_excerpt(self, obj):
         """
         Get plain text excerpt of blog post
         """
-        return strip_tags(obj.description_from_content())
+        return self.get_summaries().get('excerpt', obj)
 
     class Meta:
         model = Post
+        list_serializer_class = PostListSerializer
         fields = ('id', 'user', 'publish_date', 'updated', 'title', 'content', 'excerpt', 'slug', 'url', 'short_url',
                   'categories', 'allow_comments', 'comments_count', 'comments', 'tags', 'featured_image', 'description')
@@ -30,6 +30,24 @@ The <a href="http://gcushen.github.io/mezzanine-api/client/" target="_blank">API
 <a href="../oauth2/applications/">OAuth App Manager</a> are available for app development.
 """
 
+# JSON is encoded with orjson if it's installed, MessagePack is offered if msgpack is
+renderer_classes = [
+    'api.renderers.FastJSONRenderer',
+    'rest_framework.renderers.BrowsableAPIRenderer',
+]
+parser_classes = [
+    'api.renderers.FastJSONParser',
+    'rest_framework.parsers.FormParser',
+    'rest_framework.parsers.MultiPartParser',
+]
+try:
+    import msgpack  # noqa
+except ImportError:
+    pass
+else:
+    renderer_classes.insert(1, 'api.renderers.MessagePackRenderer')
+    parser_classes.insert(1, 'api.renderers.MessagePackParser')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
@@ -37,6 +55,8 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ('django_filters.rest_framework.DjangoFilterBackend',),
+    'DEFAULT_RENDERER_CLASSES': tuple(renderer_classes),
+    'DEFAULT_PARSER_CLASSES': tuple(parser_classes),
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 }
 
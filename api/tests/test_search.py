@@ -0,0 +1,98 @@
+from __future__ import absolute_import, unicode_literals
+
+import io
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from mezzanine.blog.models import BlogPost as Post
+from mezzanine.core.models import CONTENT_STATUS_PUBLISHED
+from mezzanine.pages.models import RichTextPage
+
+from api.models import SearchEntry
+from api.search import get_field_value, search
+
+from .test_views import APITestCase
+
+
+class SearchTestCase(APITestCase):
+
+    def add_post(self, title, content):
+        return Post.objects.create(
+            title=title, content=content, user=self.USER, status=CONTENT_STATUS_PUBLISHED)
+
+    def get_titles(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [result["title"] for result in response.data["results"]]
+
+    def test_search_posts(self):
+        self.add_post("Gardening", "<p>Planting <b>tomatoes</b> in spring</p>")
+        self.add_post("Tomatoes", "<p>Growing tomatoes</p>")
+        self.add_post("Cooking", "<p>Pasta recipes</p>")
+        url = reverse("blogpost-list")
+
+        # Matches in the title rank higher
+        self.assertEqual(self.get_titles(url, search="tomatoes"), ["Tomatoes", "Gardening"])
+        self.assertEqual(self.get_titles(url, search="planting tomatoes"), ["Gardening"])
+        self.assertEqual(self.get_titles(url, search="tomatoes", ordering="title"), [
+            "Gardening", "Tomatoes"])
+        # Query syntax and markup aren't matched
+        self.assertEqual(self.get_titles(url, search='pasta" OR "b'), [])
+        self.assertEqual(self.get_titles(url, search="p"), [])
+
+    def test_index_updates(self):
+        post = self.add_post("Gardening", "<p>Planting tomatoes</p>")
+        self.assertEqual(SearchEntry.objects.filter(object_id=post.pk).count(), 1)
+        post.content = "<p>Planting potatoes</p>"
+        post.save()
+        queryset = Post.objects.all()
+        self.assertFalse(search(queryset, "tomatoes").exists())
+        self.assertEqual(list(search(queryset, "potatoes")), [post])
+
+        post.delete()
+        self.assertFalse(SearchEntry.objects.exists())
+        self.assertFalse(search(queryset, "potatoes").exists())
+
+    @patch("api.search.get_languages", return_value=["en", "de"])
+    def test_languages(self, get_languages):
+        # Mezzanine turns modeltranslation off for tests, so translations are faked
+        post = self.add_post("Tomatoes", "<p>Growing tomatoes</p>")
+        self.assertEqual(
+            sorted(SearchEntry.objects.filter(object_id=post.pk).values_list("language", flat=True)),
+            ["de", "en"])
+        queryset = Post.objects.all()
+        self.assertEqual(list(search(queryset, "tomatoes", language="de")), [post])
+        self.assertEqual(list(search(queryset, "tomatoes", language="fr")), [post])
+
+        post.delete()
+        self.assertFalse(SearchEntry.objects.exists())
+
+    @override_settings(USE_MODELTRANSLATION=True, LANGUAGE_CODE="en")
+    def test_field_value(self):
+        post = Post()
+        post.title_en, post.title_de = "Tomatoes", "Tomaten"
+        post.content_en, post.content_de = "Growing", ""
+        self.assertEqual(get_field_value(post, "title", "de"), "Tomaten")
+        # Missing translations fall back to the default language
+        self.assertEqual(get_field_value(post, "content", "de"), "Growing")
+
+    def test_search_pages(self):
+        RichTextPage.objects.create(title="About", content="<p>Our tomatoes</p>")
+        RichTextPage.objects.create(title="Contact", content="<p>Write to us</p>")
+        self.assertEqual(self.get_titles(reverse("page-list"), search="tomatoes", depth=0), ["About"])
+
+    def test_command(self):
+        self.add_post("Gardening", "<p>Planting tomatoes</p>")
+        RichTextPage.objects.create(title="About", content="<p>Our tomatoes</p>")
+        SearchEntry.objects.all().delete()
+        output = io.StringIO()
+        call_command("update_search_index", stdout=output)
+        self.assertIn("indexed 1 blog posts", output.getvalue().lower())
+        self.assertEqual(self.get_titles(reverse("page-list"), search="tomatoes", depth=0), ["About"])
@@ -0,0 +1,618 @@
+from __future__ import absolute_import, unicode_literals
+
+import time
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from mezzanine.blog.models import BlogPost as Post, BlogCategory
+from mezzanine.core.models import CONTENT_STATUS_DRAFT, CONTENT_STATUS_PUBLISHED
+from mezzanine.conf import settings
+from mezzanine.forms.models import Form
+from mezzanine.galleries.models import Gallery, GalleryImage
+from mezzanine.generic.models import Keyword
+from mezzanine.pages.models import RichTextPage
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from ..mixins import CachedResponseMixin
+from ..renderers import msgpack
+from ..views import PostViewSet
+
+
+class APITestCase(TestCase):
+    """
+    Create an author and an API client as fixtures.
+    Responses aren't cached, so every request is served from the database.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super(APITestCase, cls).setUpTestData()
+        cls.USER = User.objects.create(username="author", email="author@example.com")
+
+    def setUp(self):
+        super(APITestCase, self).setUp()
+        self.client = APIClient()
+        cache.clear()
+        patcher = patch.object(CachedResponseMixin, "response_cache_timeout", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+
+class PostViewSetTestCase(APITestCase):
+
+    def add_posts(self, count):
+        categories = [BlogCategory.objects.get_or_create(title="Category %s" % i)[0] for i in range(2)]
+        start = Post.objects.count()
+        for i in range(start, start + count):
+            post = Post.objects.create(
+                title="Post %s" % i, user=self.USER, content="<p>Content %s</p>" % i,
+                status=CONTENT_STATUS_PUBLISHED)
+            post.categories.set(categories)
+            for j in range(2):
+                user = User.objects.create(username="commenter-%s-%s" % (i, j))
+                post.comments.create(comment="Comment %s" % j, user=user, user_name=user.username)
+
+    def test_list_queries(self):
+        url = reverse("blogpost-list")
+        expand = "user,categories,comments"
+        self.add_posts(1)
+        self.count_queries(url, expand=expand)
+        queries = self.count_queries(url, expand=expand)
+
+        # The number of queries doesn't depend on the number of posts
+        self.add_posts(9)
+        self.count_queries(url, expand=expand)
+        self.assertEqual(self.count_queries(url, expand=expand), queries)
+
+        response = self.client.get(url, {"expand": expand})
+        post = response.data["results"][0]
+        self.assertEqual(response.data["count"], 10)
+        self.assertEqual(post["user"]["username"], "author")
+        self.assertEqual(len(post["categories"]), 2)
+        self.assertEqual(len(post["comments"]), 2)
+        self.assertTrue(post["comments"][0]["user"]["username"].startswith("commenter-"))
+        self.assertEqual(post["excerpt"], "Content 9")
+
+        # Comments are only embedded on request
+        post = self.client.get(url).data["results"][0]
+        self.assertNotIn("comments", post)
+        self.assertEqual(post["comments_count"], 2)
+        self.assertEqual(post["user"]["username"], "author")
+
+    def test_cursor_pagination(self):
+        self.add_posts(5)
+        # Posts published at the same time are ordered by ID
+        Post.objects.filter(title__in=["Post 1", "Post 2", "Post 3"]).update(
+            publish_date=Post.objects.get(title="Post 1").publish_date)
+        url = reverse("blogpost-list")
+        expected = list(Post.objects.order_by("-publish_date", "-id").values_list("id", flat=True))
+
+        ids = []
+        response = self.client.get(url, {"pagination": "cursor", "limit": 2})
+        while True:
+            self.assertNotIn("count", response.data)
+            ids.extend(post["id"] for post in response.data["results"])
+            if not response.data["next"]:
+                break
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(response.data["next"])
+            self.assertFalse([q for q in context.captured_queries if "COUNT(" in q["sql"]])
+        self.assertEqual(ids, expected)
+
+        # Previous links lead back to the same pages
+        response = self.client.get(response.data["previous"])
+        self.assertEqual([post["id"] for post in response.data["results"]], expected[2:4])
+
+    def test_cached_count(self):
+        url = reverse("blogpost-list")
+        self.add_posts(2)
+
+        def count_queries(**params):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, params)
+            self.assertTrue(response.data["count_exact"])
+            counts = [q for q in context.captured_queries if "COUNT(" in q["sql"]]
+            return response.data["count"], len(counts)
+
+        self.assertEqual(count_queries(), (2, 1))
+        self.assertEqual(count_queries(), (2, 0))
+        self.assertEqual(count_queries(count="exact"), (2, 1))
+        # Filters are counted separately
+        self.assertEqual(count_queries(author_name="auth"), (2, 1))
+        self.assertEqual(count_queries(author_name="nobody"), (0, 1))
+
+        # Writes invalidate the cached counts
+        self.add_posts(1)
+        self.assertEqual(count_queries(), (3, 1))
+        Post.objects.get(title="Post 0").categories.clear()
+        self.assertEqual(count_queries(), (3, 1))
+
+    def test_tag_filter(self):
+        def add_post(title, tags):
+            post = Post.objects.create(title=title, user=self.USER, status=CONTENT_STATUS_PUBLISHED)
+            for tag in tags:
+                post.keywords.create(keyword=Keyword.objects.get_or_create(title=tag)[0])
+
+        add_post("Both", ["garden", "kitchen"])
+        add_post("Garden", ["garden", "flowers"])
+        add_post("Gardening", ["gardening"])
+        add_post("None", [])
+        url = reverse("blogpost-list")
+
+        def get_titles(**params):
+            return sorted(post["title"] for post in self.client.get(url, params).data["results"])
+
+        # Only whole tags match
+        self.assertEqual(get_titles(tag="garden"), ["Both", "Garden"])
+        self.assertEqual(get_titles(tag="garden,gardening"), ["Both", "Garden", "Gardening"])
+        self.assertEqual(get_titles(tag="garden,kitchen", tag_match="all"), ["Both"])
+        self.assertEqual(get_titles(tag="kitchen,flowers", tag_match="all"), [])
+
+    def test_category_filters(self):
+        self.add_posts(2)
+        other = BlogCategory.objects.create(title="Other")
+        Post.objects.get(title="Post 1").categories.set([other])
+        category = BlogCategory.objects.get(title="Category 0")
+        url = reverse("blogpost-list")
+
+        def get_titles(**params):
+            response = self.client.get(url, params)
+            self.assertEqual(response.data["count"], len(response.data["results"]))
+            return [post["title"] for post in response.data["results"]]
+
+        # Posts in several of the categories are only listed once
+        self.assertEqual(get_titles(category_name="Category 0,Category 1,Other"), ["Post 1", "Post 0"])
+        self.assertEqual(get_titles(category_id=category.pk), ["Post 0"])
+        self.assertEqual(get_titles(category_slug=other.slug), ["Post 1"])
+        self.assertEqual(get_titles(category_id=category.pk, category_name="Category 1"), ["Post 0"])
+        self.assertEqual(get_titles(category_id=category.pk, category_slug=other.slug), [])
+
+    def test_sparse_fields(self):
+        self.add_posts(2)
+        url = reverse("blogpost-list")
+        queries = self.count_queries(url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {"fields": "id,title,excerpt"})
+        self.assertEqual(list(response.data["results"][0]), ["id", "title", "excerpt"])
+        self.assertEqual(response.data["results"][0]["excerpt"], "Content 1")
+        # Unrequested columns and relations aren't loaded
+        self.assertLess(len(context.captured_queries), queries)
+        self.assertNotIn('"keywords_string"', context.captured_queries[-1]["sql"])
+
+    def test_expand(self):
+        self.add_posts(1)
+        post = Post.objects.get()
+        url = reverse("blogpost-list")
+        queries = self.count_queries(url)
+
+        # Relations that aren't expanded are output as IDs
+        response = self.client.get(url, {"fields": "user,categories,comments", "expand": "categories"})
+        result = response.data["results"][0]
+        self.assertEqual(result["user"], self.USER.pk)
+        self.assertEqual([category["title"] for category in result["categories"]], ["Category 0", "Category 1"])
+        self.assertEqual(sorted(result["comments"]), sorted(post.comments.values_list("id", flat=True)))
+        self.assertLessEqual(self.count_queries(url, expand=""), queries)
+
+    def test_cached_summaries(self):
+        self.add_posts(1)
+        post = Post.objects.get()
+        url = reverse("blogpost-list")
+        result = self.client.get(url).data["results"][0]
+        self.assertEqual(result["excerpt"], "Content 0")
+        self.assertEqual(result["url"], "http://testserver" + result["short_url"])
+
+        # Excerpts are cached until the post is saved again
+        Post.objects.filter(pk=post.pk).update(content="<p>Updated</p>")
+        self.assertEqual(self.client.get(url).data["results"][0]["excerpt"], "Content 0")
+        post.refresh_from_db()
+        post.save()
+        self.assertEqual(self.client.get(url).data["results"][0]["excerpt"], "Updated")
+
+    def test_bulk(self):
+        url = reverse("blogpost-bulk")
+        admin = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        self.client.force_authenticate(admin)
+        BlogCategory.objects.create(title="Existing")
+        Post.objects.create(title="Taken", user=self.USER)
+
+        def post_bulk(count, offset=0):
+            posts = [{
+                "title": "Taken", "content": "<p>Bulk %s</p>" % i,
+                "categories": "Existing, New %s, New %s" % (i % 2, i % 2),
+            } for i in range(offset, offset + count)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(url, posts, format="json")
+            self.assertEqual(response.status_code, 201)
+            return response.data["ids"], len(context.captured_queries)
+
+        # The number of queries doesn't depend on the number of posts, once the categories exist
+        post_bulk(2)
+        ids, queries = post_bulk(2, 2)
+        self.assertEqual(post_bulk(10, 4)[1], queries)
+        posts = Post.objects.filter(pk__in=ids).order_by("pk")
+        self.assertEqual([post.slug for post in posts], ["taken-3", "taken-4"])
+        self.assertEqual(posts[0].description, "Bulk 2")
+        self.assertEqual(posts[0].user, admin)
+        self.assertEqual(sorted(posts[1].categories.values_list("title", flat=True)), ["Existing", "New 1"])
+        self.assertEqual(BlogCategory.objects.count(), 3)
+
+        # Posts with an ID are updated, replacing their categories
+        response = self.client.post(url, [
+            {"id": ids[0], "title": "Updated", "content": "<p>Updated</p>", "categories": "Other"},
+            {"title": "Created", "content": "<p>Created</p>"},
+        ], format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["ids"][0], ids[0])
+        post = Post.objects.get(pk=ids[0])
+        self.assertEqual((post.title, post.slug, post.description), ("Updated", "taken-3", "Updated"))
+        self.assertEqual(list(post.categories.values_list("title", flat=True)), ["Other"])
+
+        response = self.client.post(url, [{"id": 0, "title": "Missing", "content": ""}], format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_without_returned_ids(self):
+        # Like MySQL, which doesn't return the IDs of the rows bulk_create() inserts
+        admin = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        self.client.force_authenticate(admin)
+        posts = [
+            {"title": "Post %s" % i, "content": "<p>Post</p>", "categories": "New %s" % i}
+            for i in range(2)]
+        bulk_create = QuerySet.bulk_create
+
+        def insert_meanwhile(queryset, objs, *args, **kwargs):
+            # Another request adds a post by the same user, and a category on the same site
+            result = bulk_create(queryset, objs, *args, **kwargs)
+            if queryset.model is Post:
+                Post.objects.create(title="Parallel post", content="<p>Post</p>", user=admin)
+            elif queryset.model is BlogCategory:
+                BlogCategory.objects.create(title="Parallel category")
+            return result
+
+        with patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False), \
+                patch.object(QuerySet, "bulk_create", autospec=True, side_effect=insert_meanwhile):
+            response = self.client.post(reverse("blogpost-bulk"), posts, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [Post.objects.get(pk=pk).categories.get().title for pk in response.data["ids"]],
+            ["New 0", "New 1"])
+        self.assertFalse(Post.objects.get(title="Parallel post").categories.exists())
+
+    def test_conditional_get(self):
+        self.add_posts(2)
+        url = reverse("blogpost-list")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        # Unchanged lists aren't serialized again
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(len([q for q in context.captured_queries if "blog_blogpost" in q["sql"]]), 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get(url, {"limit": 1}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Renaming a category or deleting a post doesn't change `updated`, but moves the time too
+        Post.objects.create(title="Deleted", user=self.USER, status=CONTENT_STATUS_PUBLISHED)
+        last_modified = self.client.get(url)["Last-Modified"]
+        writes = [
+            lambda: BlogCategory.objects.get(title="Category 1").save(),
+            lambda: Post.objects.get(title="Deleted").delete(),
+        ]
+        for i, write in enumerate(writes, 1):
+            # Versions are created a few seconds later, as Last-Modified is to the second
+            with patch("api.cache.new_version", return_value="%d:%s" % (time.time() + 5 * i, i)):
+                write()
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 200)
+            last_modified = response["Last-Modified"]
+
+        # Edits to the posts or their categories change the ETag
+        BlogCategory.objects.get(title="Category 0").save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = self.client.get(url)["ETag"]
+        Post.objects.get(title="Post 0").delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        post = Post.objects.get()
+        detail = reverse("blogpost-detail", args=[post.pk])
+        etag = self.client.get(detail)["ETag"]
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        post.save()
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Responses for users are only cached privately
+        self.client.force_authenticate(self.USER)
+        response = self.client.get(url)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotEqual(response["ETag"], etag)
+
+    @patch.object(CachedResponseMixin, "response_cache_timeout", 60)
+    def test_response_cache(self):
+        self.add_posts(2)
+        posts = list(Post.objects.order_by("pk"))
+        url = reverse("blogpost-list")
+        detail = reverse("blogpost-detail", args=[posts[0].pk])
+
+        def is_cached(url, **params):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            return not [q for q in context.captured_queries if "blog_blogcategory" in q["sql"]]
+
+        self.assertFalse(is_cached(url, offset=0, limit=5))
+        # The query string is normalized
+        self.assertTrue(is_cached(url, limit=5, offset=0))
+        self.assertFalse(is_cached(url, limit=5, offset=1))
+        self.assertFalse(is_cached(detail))
+        self.assertTrue(is_cached(detail))
+
+        # Writes only purge the responses they're part of
+        posts[1].save()
+        self.assertFalse(is_cached(url, limit=5, offset=0))
+        self.assertTrue(is_cached(detail))
+        posts[0].comments.create(comment="New", user_name="commenter")
+        self.assertFalse(is_cached(detail))
+        self.assertTrue(is_cached(detail))
+        BlogCategory.objects.get(title="Category 0").save()
+        self.assertFalse(is_cached(detail))
+        posts[0].categories.clear()
+        self.assertFalse(is_cached(detail))
+
+        # Responses that were out of date before they were cached are discarded
+        paginate_queryset = PostViewSet.paginate_queryset
+
+        def paginate_while_writing(viewset, *args, **kwargs):
+            page = paginate_queryset(viewset, *args, **kwargs)
+            posts[1].save()
+            return page
+        with patch.object(PostViewSet, "paginate_queryset", paginate_while_writing):
+            self.assertFalse(is_cached(url, limit=5, offset=0))
+        self.assertFalse(is_cached(url, limit=5, offset=0))
+
+        # Each host gets its own responses, as the site and the absolute URLs depend on it
+        self.assertTrue(is_cached(detail))
+        response = self.client.get(detail, HTTP_HOST="localhost")
+        self.assertTrue(response.data["url"].startswith("http://localhost/"))
+        response = self.client.get(url, {"limit": 5, "offset": 0}, HTTP_HOST="127.0.0.1")
+        self.assertTrue(all(post["url"].startswith("http://127.0.0.1/") for post in response.data["results"]))
+
+        # Users get their own responses
+        self.client.force_authenticate(self.USER)
+        self.assertFalse(is_cached(detail))
+
+    def test_renderers(self):
+        self.add_posts(2)
+        Post.objects.filter(title="Post 0").update(title="Post\u2028 0")
+        response = self.client.get(reverse("blogpost-list"), {"expand": "user,categories,comments"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+        # The fast renderer's output is the same as DRF's
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertNotIn("\u2028".encode("utf-8"), response.content)
+        self.assertEqual(response.json()["count"], 2)
+
+    @skipUnless(msgpack, "msgpack isn't installed")
+    def test_msgpack(self):
+        self.add_posts(2)
+        url = reverse("blogpost-list")
+        params = {"expand": "user,categories,comments", "format": "msgpack"}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        data = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(data, self.client.get(url, dict(params, format="json")).json())
+        self.assertEqual(data["count"], 2)
+
+        # Request bodies are parsed as well
+        admin = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        self.client.force_authenticate(admin)
+        body = msgpack.packb([{"title": "Packed", "content": "<p>Packed \u2603</p>"}], use_bin_type=True)
+        response = self.client.post(
+            reverse("blogpost-bulk") + "?format=msgpack", body, content_type="application/msgpack")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        ids = msgpack.unpackb(response.content, raw=False)["ids"]
+        self.assertEqual(Post.objects.get(pk=ids[0]).content, "<p>Packed \u2603</p>")
+        response = self.client.post(reverse("blogpost-bulk"), b"\xc1", content_type="application/msgpack")
+        self.assertEqual(response.status_code, 400)
+
+
+class PostCommentViewSetTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super(PostCommentViewSetTestCase, cls).setUpTestData()
+        cls.POST = Post.objects.create(title="Post", user=cls.USER, status=CONTENT_STATUS_PUBLISHED)
+
+    def add_comment(self, text, replied_to=None, **kwargs):
+        return self.POST.comments.create(
+            comment=text, user=self.USER, user_name="author", replied_to=replied_to, **kwargs)
+
+    def test_threads(self):
+        url = reverse("post-comment-list", args=[self.POST.pk])
+        first = self.add_comment("First")
+        reply = self.add_comment("Reply", first)
+        self.add_comment("Second")
+        self.count_queries(url)
+        queries = self.count_queries(url)
+
+        # Replies at any depth are loaded with one query
+        parent = reply
+        for i in range(3):
+            parent = self.add_comment("Reply %s" % i, parent)
+        self.assertEqual(self.count_queries(url), queries)
+
+        threads = self.client.get(url).data["results"]
+        self.assertEqual([thread["comment"] for thread in threads], ["First", "Second"])
+        replies = threads[0]["replies"]
+        self.assertEqual([comment["comment"] for comment in replies], ["Reply"])
+        self.assertEqual(replies[0]["replies"][0]["replied_to"], replies[0]["id"])
+        self.assertEqual(replies[0]["replies"][0]["replies"][0]["comment"], "Reply 1")
+        self.assertEqual(threads[1]["replies"], [])
+
+    def test_cursor_pagination(self):
+        url = reverse("post-comment-list", args=[self.POST.pk])
+        for i in range(5):
+            self.add_comment("Reply to %s" % i, self.add_comment("Comment %s" % i))
+        comments = []
+        response = self.client.get(url, {"limit": 2})
+        while True:
+            comments.extend(thread["comment"] for thread in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(comments, ["Comment %s" % i for i in range(5)])
+
+    def test_missing_post(self):
+        draft = Post.objects.create(title="Draft", user=self.USER, status=CONTENT_STATUS_DRAFT)
+        response = self.client.get(reverse("post-comment-list", args=[draft.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class PageViewSetTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super(PageViewSetTestCase, cls).setUpTestData()
+        cls.ROOT = RichTextPage.objects.create(title="Root", content="<p>Root</p>")
+        for i in range(3):
+            child = RichTextPage.objects.create(title="Child %s" % i, parent=cls.ROOT)
+            for j in range(2):
+                RichTextPage.objects.create(title="Grandchild %s.%s" % (i, j), parent=child)
+        RichTextPage.objects.create(title="Draft", parent=cls.ROOT, status=CONTENT_STATUS_DRAFT)
+
+    def get_root(self, **params):
+        response = self.client.get(reverse("page-detail", args=[self.ROOT.pk]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_tree(self):
+        url = reverse("page-detail", args=[self.ROOT.pk])
+        self.count_queries(url)
+        queries = self.count_queries(url)
+
+        # The whole tree is loaded at once, however deep it is
+        parent = self.ROOT.children.get(title="Child 2")
+        for i in range(3):
+            parent = RichTextPage.objects.create(title="Descendant %s" % i, parent=parent)
+        self.assertEqual(self.count_queries(url), queries)
+
+        root = self.get_root()
+
+        # Drafts are left out
+        self.assertEqual([child["title"] for child in root["children"]], [
+            "Child 0", "Child 1", "Child 2"])
+        self.assertEqual([grandchild["title"] for grandchild in root["children"][0]["children"]], [
+            "Grandchild 0.0", "Grandchild 0.1"])
+        self.assertEqual(root["children"][0]["children"][0]["children"], [])
+
+    def test_depth(self):
+        self.assertEqual(self.get_root(depth=0)["children"], [])
+        children = self.get_root(depth=1)["children"]
+        self.assertEqual(len(children), 3)
+        self.assertEqual(children[0]["children"], [])
+        response = self.client.get(reverse("page-list"), {"depth": "-1"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pagination(self):
+        url = reverse("page-list")
+        expected = list(RichTextPage.objects.filter(status=CONTENT_STATUS_PUBLISHED).order_by(
+            "title", "id").values_list("title", flat=True))
+        titles = []
+        response = self.client.get(url, {"depth": 0, "pagination": "cursor", "limit": 3})
+        while response.data["results"]:
+            titles.extend(page["title"] for page in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(titles, expected)
+
+    def test_cached_count(self):
+        url = reverse("page-list")
+        self.count_queries(url)
+        # Published pages are filtered against the current time, which doesn't change the key
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.data["count"], 10)
+        self.assertFalse([q for q in context.captured_queries if "COUNT(" in q["sql"]])
+
+    def test_content(self):
+        url = reverse("page-list")
+        self.count_queries(url, depth=0)
+        queries = self.count_queries(url, depth=0)
+
+        # Content is loaded with one query per content model, however many pages there are
+        form = Form.objects.create(title="Form", content="<p>Form</p>")
+        gallery = Gallery.objects.create(title="Gallery")
+        for i in range(2):
+            GalleryImage.objects.create(gallery=gallery, file="galleries/image-%s.jpg" % i)
+        Gallery.objects.create(title="Empty gallery")
+        self.assertEqual(self.count_queries(url, depth=0), queries + 2)
+        RichTextPage.objects.create(title="Another page", content="<p>Another</p>")
+        Form.objects.create(title="Another form")
+        self.assertEqual(self.count_queries(url, depth=0), queries + 2)
+
+        pages = {page["id"]: page for page in self.client.get(url, {"limit": 100}).data["results"]}
+        self.assertEqual(pages[self.ROOT.pk]["content"], "<p>Root</p>")
+        self.assertEqual(pages[form.pk]["content"], "<p>Form</p>")
+        self.assertIsNone(pages[gallery.pk]["content"])
+        self.assertEqual(
+            [item["url"] for item in pages[gallery.pk]["gallery_items"]],
+            [settings.MEDIA_URL + "galleries/image-%s.jpg" % i for i in range(2)])
+        self.assertEqual(pages[self.ROOT.pk]["gallery_items"], [])
+
+    def test_sparse_fields(self):
+        url = reverse("page-list")
+        queries = self.count_queries(url)
+        self.assertLess(self.count_queries(url, fields="id,title"), queries)
+        page = self.client.get(url, {"fields": "id,title,children", "depth": 1}).data["results"][0]
+        self.assertEqual(list(page), ["id", "title", "children"])
+
+    def test_conditional_get(self):
+        url = reverse("page-detail", args=[self.ROOT.pk])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Pages of the tree are part of the response
+        RichTextPage.objects.create(title="Child 3", parent=self.ROOT)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class UserViewSetTestCase(APITestCase):
+
+    def test_cursor_pagination(self):
+        admin = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        for i in range(4):
+            User.objects.create(username="user-%s" % i)
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse("user-list"), {"pagination": "cursor", "limit": 4})
+        self.assertEqual(
+            [user["id"] for user in response.data["results"]],
+            list(User.objects.order_by("id").values_list("id", flat=True)[:4]))
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["next"])
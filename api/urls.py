@@ -2,13 +2,14 @@ from __future__ import unicode_literals
 from django.urls import re_path, include
 from rest_framework import routers
 from rest_framework_swagger.views import get_swagger_view
-from .views import UserViewSet, PostViewSet, CategoryViewSet, PageViewSet, SiteViewSet
+from .views import UserViewSet, PostViewSet, PostCommentViewSet, CategoryViewSet, PageViewSet, SiteViewSet
 
 
 router = routers.DefaultRouter(trailing_slash=False)
 router.register(r'users', UserViewSet)
 router.register(r'pages', PageViewSet)
 router.register(r'posts', PostViewSet)
+router.register(r'posts/(?P<post_pk>\d+)/comments', PostCommentViewSet, basename='post-comment')
 router.register(r'categories', CategoryViewSet)
 router.register(r'site', SiteViewSet, SiteViewSet.as_view({'get': 'retrieve'}))
 
@@ -1,17 +1,28 @@
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from django.contrib.sites.models import Site
+from django.db.models import Exists, OuterRef
+from django.shortcuts import get_object_or_404
 from mezzanine.blog.models import BlogPost as Post, BlogCategory
+from mezzanine.core.models import CONTENT_STATUS_PUBLISHED
+from mezzanine.generic.models import AssignedKeyword
 from mezzanine.pages.models import Page
 
-from rest_framework import viewsets, filters, permissions, mixins
+from rest_framework import viewsets, filters, permissions, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 import django_filters
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .serializers import UserSerializer, CategorySerializer, PageSerializer, SiteSerializer
-from .serializers import PostCreateSerializer, PostUpdateSerializer, PostOutputSerializer
+from .serializers import PostCreateSerializer, PostUpdateSerializer, PostOutputSerializer, ThreadSerializer
+from .serializers import PostBulkSerializer
 from .permissions import IsAdminOrReadOnly  # , IsAppAuthenticated
-from .pagination import MezzaninePagination, PostPagination
-from .mixins import PutUpdateModelMixin
+from .pagination import CommentPagination, MezzaninePagination, PostPagination
+from .mixins import CachedResponseMixin, ConditionalGetMixin, EagerLoadingMixin, PutUpdateModelMixin
+from .cache import get_tag
+from .search import FullTextSearchFilter
 
 # Supports custom user models
 User = get_user_model()
@@ -45,7 +56,7 @@ class UserFilter(django_filters.FilterSet):
         fields = ['username']
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(CachedResponseMixin, EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """
     For listing or retrieving users.
     ---
@@ -55,6 +66,18 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
               type: string
               description: Filter usernames starting with query
               paramType: query
+            - name: fields
+              type: string
+              description: Comma separated fields to include, all of them by default
+              paramType: query
+            - name: pagination
+              type: string
+              description: Set to "cursor" to paginate by cursor instead of offset
+              paramType: query
+            - name: cursor
+              type: string
+              description: Cursor of the page to fetch, from the next or previous link
+              paramType: query
             - name: page
               type: integer
               description: Page number
@@ -79,12 +102,32 @@ class PageFilter(django_filters.FilterSet):
         fields = ['title']
 
 
-class PageViewSet(viewsets.ReadOnlyModelViewSet):
+class PageViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """
     For listing or retrieving pages.
     ---
     list:
         parameters:
+            - name: depth
+              type: integer
+              description: Levels of child pages to include
+              paramType: query
+            - name: search
+              type: string
+              description: Search for pages that match the query
+              paramType: query
+            - name: fields
+              type: string
+              description: Comma separated fields to include, all of them by default
+              paramType: query
+            - name: pagination
+              type: string
+              description: Set to "cursor" to paginate by cursor instead of offset
+              paramType: query
+            - name: cursor
+              type: string
+              description: Cursor of the page to fetch, from the next or previous link
+              paramType: query
             - name: page
               type: integer
               description: Page number
@@ -93,13 +136,16 @@ class PageViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Page.objects.published()
     serializer_class = PageSerializer
     pagination_class = MezzaninePagination
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter,)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter,)
     filterset_class = PageFilter
     ordering_fields = ('id', 'parent', 'title',)
     ordering = ('title',)
+    # Pages include their children
+    cache_tag_models = (Page,)
 
     def get_queryset(self):
-        queryset = self.queryset
+        # Evaluate the publish date filter per request rather than at import time
+        queryset = PageSerializer.setup_eager_loading(Page.objects.published(), self.request)
         user = self.request.user
 
         if user and not user.is_authenticated:
@@ -107,8 +153,18 @@ class PageViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset
 
+    def get_serializer_context(self):
+        context = super(PageViewSet, self).get_serializer_context()
+        depth = self.request.query_params.get('depth')
+        if depth is not None:
+            if not depth.isdigit():
+                raise ValidationError({'depth': 'A non-negative integer is required.'})
+            context['depth'] = int(depth)
+        return context
+
 
-class CategoryViewSet(mixins.CreateModelMixin,
+class CategoryViewSet(CachedResponseMixin,
+                      mixins.CreateModelMixin,
                       mixins.RetrieveModelMixin,
                       PutUpdateModelMixin,
                       mixins.ListModelMixin,
@@ -144,14 +200,21 @@ class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
     pass
 
 
+TAG_MATCH_CHOICES = (
+    ('any', 'Any of the tags'),
+    ('all', 'All of the tags'),
+)
+
+
 class PostFilter(django_filters.FilterSet):
     """
     A class for filtering blog posts.
     """
-    category_id = django_filters.NumberFilter(field_name="categories__id")
-    category_name = CharInFilter(field_name="categories__title", lookup_expr='in')
-    category_slug = django_filters.CharFilter(field_name="categories__slug", lookup_expr='exact')
-    tag = django_filters.CharFilter(field_name='keywords_string', lookup_expr='contains')
+    category_id = django_filters.NumberFilter(field_name="blogcategory_id", method='filter_category')
+    category_name = CharInFilter(field_name="blogcategory__title__in", method='filter_category')
+    category_slug = django_filters.CharFilter(field_name="blogcategory__slug", method='filter_category')
+    tag = CharInFilter(method='filter_tag')
+    tag_match = django_filters.ChoiceFilter(choices=TAG_MATCH_CHOICES, method='filter_tag_match')
     author_id = django_filters.NumberFilter(field_name="user__id")
     author_name = django_filters.CharFilter(field_name="user__username", lookup_expr='istartswith')
     date_min = django_filters.DateFilter(field_name='publish_date', lookup_expr='gte')
@@ -161,8 +224,41 @@ class PostFilter(django_filters.FilterSet):
         model = Post
         fields = ['category_id', 'category_name', 'tag', 'author_id', 'author_name', 'date_min', 'date_max']
 
+    def filter_category(self, queryset, name, value):
+        """
+        Posts with a category matching the lookup in `name`. The categories are checked
+        with EXISTS rather than joined, so posts in several of them aren't repeated and
+        the filters can be combined.
+        """
+        categories = Post.categories.through.objects.filter(blogpost=OuterRef('pk'), **{name: value})
+        return queryset.filter(Exists(categories))
+
+    def filter_tag(self, queryset, name, value):
+        """
+        Posts with any (or with `tag_match=all`, all) of the comma separated tags, looked up
+        through the assigned keywords rather than matching parts of `keywords_string`.
+        """
+        tags = [tag.strip() for tag in value if tag.strip()]
+        if not tags:
+            return queryset
+        # Semi-joins driven by the keywords, so only the matching posts are looked at
+        assigned = AssignedKeyword.objects.filter(
+            content_type=ContentType.objects.get_for_model(queryset.model)).values('object_pk')
+        if self.form.cleaned_data.get('tag_match') == 'all':
+            for tag in set(tags):
+                queryset = queryset.filter(pk__in=assigned.filter(keyword__title=tag))
+            return queryset
+        return queryset.filter(pk__in=assigned.filter(keyword__title__in=tags))
+
+    def filter_tag_match(self, queryset, name, value):
+        # Applied by filter_tag
+        return queryset
+
 
-class PostViewSet(mixins.CreateModelMixin,
+class PostViewSet(ConditionalGetMixin,
+                  CachedResponseMixin,
+                  EagerLoadingMixin,
+                  mixins.CreateModelMixin,
                   mixins.RetrieveModelMixin,
                   PutUpdateModelMixin,
                   mixins.ListModelMixin,
@@ -186,7 +282,11 @@ class PostViewSet(mixins.CreateModelMixin,
               paramType: query
             - name: tag
               type: string
-              description: Filter posts by tag name
+              description: Filter posts by tag names, comma separated
+              paramType: query
+            - name: tag_match
+              type: string
+              description: Whether posts need "any" (the default) or "all" of the tags
               paramType: query
             - name: author_id
               type: integer
@@ -208,24 +308,83 @@ class PostViewSet(mixins.CreateModelMixin,
               type: string
               description: Search for blog posts that match the query
               paramType: query
+            - name: fields
+              type: string
+              description: Comma separated fields to include, all of them by default
+              paramType: query
+            - name: expand
+              type: string
+              description: Comma separated relations to nest, others are IDs (default all but comments)
+              paramType: query
+            - name: pagination
+              type: string
+              description: Set to "cursor" to paginate by cursor instead of offset
+              paramType: query
+            - name: cursor
+              type: string
+              description: Cursor of the page to fetch, from the next or previous link
+              paramType: query
             - name: page
               type: integer
               description: Page number
               paramType: query
     """
-    queryset = Post.objects.filter(status=2)
+    queryset = Post.objects.filter(status=CONTENT_STATUS_PUBLISHED)
     pagination_class = PostPagination
     permission_classes = [IsAdminOrReadOnly]  # IsAppAuthenticated
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter,)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter,)
     filterset_class = PostFilter
     ordering_fields = ('id', 'title', 'publish_date', 'updated', 'user',)
     ordering = ('-publish_date',)
-    search_fields = ('title', 'content',)
+    cache_tag_models = (BlogCategory, User)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create or update blog posts from an array of them, in batches. Posts with an `id` are updated,
+        and their categories are replaced when `categories` is given.
+        """
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        posts = serializer.save()
+        return Response({'ids': [post.pk for post in posts]}, status=status.HTTP_201_CREATED)
 
     def get_serializer_class(self):
-        if self.request.method in ('PUT', 'PATCH'):
+        if self.action == 'bulk':
+            return PostBulkSerializer
+        elif self.request.method in ('PUT', 'PATCH'):
             return PostUpdateSerializer
         elif self.request.method == 'POST':
             return PostCreateSerializer
         else:
             return PostOutputSerializer
+
+
+class PostCommentViewSet(CachedResponseMixin, ListViewSet):
+    """
+    For listing the comment threads of a blog post, oldest first, with the replies nested.
+    ---
+    list:
+        parameters:
+            - name: cursor
+              type: string
+              description: Cursor of the page to fetch, from the next or previous link
+              paramType: query
+            - name: limit
+              type: integer
+              description: Threads per page
+              paramType: query
+    """
+    serializer_class = ThreadSerializer
+    pagination_class = CommentPagination
+    permission_classes = [IsAdminOrReadOnly]
+    cache_tag_models = (User,)
+
+    def get_queryset(self):
+        post = get_object_or_404(PostViewSet.queryset, pk=self.kwargs['post_pk'])
+        # Only the threads are paginated, their replies are loaded by the serializer
+        return post.comments.visible().filter(replied_to__isnull=True).select_related('user')
+
+    def get_cache_tags(self):
+        # Comments are tagged with the post they're on
+        return [get_tag(Post, self.kwargs['post_pk'])] + [get_tag(model) for model in self.cache_tag_models]
@@ -2,6 +2,7 @@ from __future__ import unicode_literals
 
 from django.contrib import admin, messages
 from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count
 from django.http import HttpResponseRedirect
 # from django.utils.encoding import force_text
 from django.utils.html import format_html
@@ -28,6 +29,13 @@ class LinkedAdminMixin(admin.ModelAdmin):
                 "You must define a 'parent_field' attribute to use LinkedAdminMixin."
             )
 
+    def get_queryset(self, request):
+        """
+        Fetch the parent along with each object to render the parent link.
+        """
+        qs = super(LinkedAdminMixin, self).get_queryset(request)
+        return qs.select_related(self.parent_field)
+
     def has_add_permission(self, request):
         """
         All additions should be done via the parent model.
@@ -90,6 +98,16 @@ class LinkedInlineMixin(TabularDynamicInlineAdmin):
 
     fields = ["title", "get_related_count", "get_edit_link", "_order"]
     readonly_fields = ["get_edit_link", "get_related_count"]
+    count_annotation = "linked_related_count"
+
+    def get_queryset(self, request):
+        """
+        Annotate the related count so rendering the inline rows takes a single query.
+        """
+        qs = super(LinkedInlineMixin, self).get_queryset(request)
+        if getattr(self, "count_field", False):
+            qs = qs.annotate(**{self.count_annotation: Count(self.count_field, distinct=True)})
+        return qs
 
     def get_edit_link(self, obj):
         """
@@ -109,9 +127,13 @@ class LinkedInlineMixin(TabularDynamicInlineAdmin):
         """
         if obj.id and getattr(self, "count_field", False):
             rel_field = getattr(obj, self.count_field)
-            rel_name = rel_field.model()._meta.verbose_name_plural.title()
+            rel_name = rel_field.model._meta.verbose_name_plural.title()
+            # Objects that didn't come from get_queryset() are counted one by one
+            count = getattr(obj, self.count_annotation, None)
+            if count is None:
+                count = rel_field.count()
             # Sample output: 5 foobars
-            return "%s %s" % (rel_field.count(), rel_name)
+            return "%s %s" % (count, rel_name)
         return ""
 
     get_related_count.short_description = ""
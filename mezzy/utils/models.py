@@ -35,3 +35,20 @@ class SluggedInline(Orderable, Slugged):
 
     class Meta:
         abstract = True
+
+
+def bulk_insert(model, objects, parent_attr, batch_size=None):
+    """
+    Insert `objects` with bulk_create and make sure their IDs are set afterwards.
+    Databases that don't return the inserted IDs (MySQL) get them read back in
+    insertion order, as the last rows of the parents given by `parent_attr`, so the
+    parents must have been created in the same transaction.
+    """
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    if objects and objects[0].pk is None:
+        parents = {getattr(obj, parent_attr) for obj in objects}
+        new_ids = model.objects.filter(**{"%s__in" % parent_attr: parents}).order_by("-pk")
+        new_ids = reversed(list(new_ids.values_list("pk", flat=True)[:len(objects)]))
+        for obj, pk in zip(objects, new_ids):
+            obj.pk = pk
+    return objects
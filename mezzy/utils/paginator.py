@@ -0,0 +1,60 @@
+from __future__ import unicode_literals
+
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def get_table_estimate(queryset):
+    """
+    Row estimate from the PostgreSQL planner statistics for an unfiltered queryset,
+    or None if there isn't one.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql" or queryset.query.where or queryset.query.distinct:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(queryset.model._meta.db_table)])
+        row = cursor.fetchone()
+    # Tables that were never analyzed report -1 (or 0 before PostgreSQL 14)
+    return int(row[0]) if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids COUNT(*) on large PostgreSQL tables.
+    Unfiltered querysets use the planner statistics of the table, filtered ones
+    the row estimate of the query plan. Exact counts are still used on other
+    databases and whenever the estimate is below `exact_count_limit`.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        estimate = self.get_estimated_count()
+        if estimate is None or estimate < self.exact_count_limit:
+            return super(EstimatedCountPaginator, self).count
+        return estimate
+
+    def get_estimated_count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        if not queryset.query.where and not queryset.query.distinct:
+            return get_table_estimate(queryset)
+
+        with connection.cursor() as cursor:
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
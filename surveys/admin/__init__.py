@@ -1,4 +1,4 @@
 # flake8: noqa
 
-from .surveys import SurveyPageAdmin, SurveyPurchaseAdmin
+from .surveys import SurveyPageAdmin, SurveyPurchaseAdmin, ReconciliationMismatchAdmin
 from .questions import CategoryAdmin, SubcategoryAdmin
@@ -2,9 +2,18 @@
 
 from __future__ import absolute_import, unicode_literals
 
+import csv
 from copy import deepcopy
-
-from django.contrib import admin
+from itertools import chain
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
@@ -13,19 +22,24 @@ from mezzanine.pages.admin import PageAdmin
 from mezzanine.utils.admin import admin_url
 
 from mezzy.utils.admin import LinkedInlineMixin
+from mezzy.utils.paginator import EstimatedCountPaginator
 
-from ..models import SurveyPage, SurveyPurchase, SurveyPurchaseCode, Category
+from ..forms.surveys import PurchaseCodeGenerateForm
+from ..models import (
+    SurveyPage, SurveyPurchase, SurveyPurchaseCode, SurveyResponse, ReconciliationMismatch,
+    Category)
 
 
 surveypage_fieldsets = [
     (None, {
         "fields": [
             "title", "status", ("publish_date", "expiry_date"), "content", "in_menus",
-            "login_required"],
+            "login_required", "get_clone_link"],
     }),
     (_("Purchasing"), {
         "classes": ["collapse-closed"],
-        "fields": ["get_purchases_link", "cost", "purchase_response"],
+        "fields": [
+            "get_purchases_link", "get_purchase_codes_link", "cost", "purchase_response"],
     }),
     (_("Instructions"), {
         "classes": ["collapse-closed"],
@@ -39,6 +53,15 @@ surveypage_fieldsets = [
 ]
 
 
+class Echo(object):
+    """
+    File-like object that returns what is written to it, used to stream CSV rows.
+    """
+
+    def write(self, value):
+        return value
+
+
 class SurveyPurchaseCodeInlineAdmin(TabularDynamicInlineAdmin):
     model = SurveyPurchaseCode
 
@@ -58,9 +81,91 @@ class SurveyPageAdmin(PageAdmin):
     Allows staff users to create and manage the available surveys.
     """
     fieldsets = surveypage_fieldsets
-    readonly_fields = ["get_purchases_link"]
+    readonly_fields = ["get_purchases_link", "get_purchase_codes_link", "get_clone_link"]
     inlines = [SurveyPurchaseCodeInlineAdmin, CategoryInlineAdmin]
 
+    def get_urls(self):
+        urls = [
+            path("<int:object_id>/purchase-codes/",
+                 self.admin_site.admin_view(self.generate_purchase_codes_view),
+                 name="surveys_surveypage_purchase_codes"),
+            path("<int:object_id>/clone/",
+                 self.admin_site.admin_view(self.clone_view),
+                 name="surveys_surveypage_clone"),
+        ]
+        return urls + super(SurveyPageAdmin, self).get_urls()
+
+    def clone_view(self, request, object_id):
+        """
+        Confirm and create a copy of the survey with all its questions.
+        """
+        survey = get_object_or_404(SurveyPage, pk=object_id)
+        if not (self.has_add_permission(request) and
+                self.has_change_permission(request, survey)):
+            raise PermissionDenied
+
+        if request.method == "POST":
+            clone = survey.clone()
+            self.message_user(
+                request, _("The survey was copied, the copy is saved as a draft."),
+                messages.SUCCESS)
+            return redirect(admin_url(SurveyPage, "change", clone.pk))
+
+        context = dict(
+            self.admin_site.each_context(request),
+            title=_("Copy survey"),
+            opts=self.model._meta,
+            original=survey,
+        )
+        return TemplateResponse(request, "admin/surveys/surveypage/clone.html", context)
+
+    def get_clone_link(self, obj):
+        if obj.pk is None:
+            return ""
+        return format_html(
+            "<a href='{}'>Copy this survey with all its questions</a>",
+            reverse("admin:surveys_surveypage_clone", args=[obj.pk]))
+    get_clone_link.short_description = _("Copy")
+
+    def generate_purchase_codes_view(self, request, object_id):
+        """
+        Generate purchase codes in bulk and stream them back as a CSV file.
+        """
+        survey = get_object_or_404(SurveyPage, pk=object_id)
+        if not self.has_change_permission(request, survey):
+            raise PermissionDenied
+
+        form = PurchaseCodeGenerateForm(request.POST or None)
+        if form.is_valid():
+            uses = form.cleaned_data["uses_remaining"]
+            codes = SurveyPurchaseCode.objects.generate(
+                survey, form.cleaned_data["count"], uses_remaining=uses)
+            writer = csv.writer(Echo())
+            rows = chain([["code", "uses_remaining"]], ([code, uses] for code in codes))
+            response = StreamingHttpResponse(
+                (writer.writerow(row) for row in rows), content_type="text/csv")
+            response["Content-Disposition"] = (
+                "attachment; filename=purchase-codes-%s.csv" % survey.slug.replace("/", "-"))
+            return response
+
+        context = dict(
+            self.admin_site.each_context(request),
+            title=_("Generate purchase codes"),
+            opts=self.model._meta,
+            original=survey,
+            form=form,
+        )
+        return TemplateResponse(
+            request, "admin/surveys/surveypage/generate_purchase_codes.html", context)
+
+    def get_purchase_codes_link(self, obj):
+        if obj.pk is None:
+            return ""
+        return format_html(
+            "<a href='{}'>Generate purchase codes in bulk</a>",
+            reverse("admin:surveys_surveypage_purchase_codes", args=[obj.pk]))
+    get_purchase_codes_link.short_description = _("Purchase codes")
+
     def get_purchases_link(self, obj):
         if obj.pk is None:
             return ""
@@ -79,29 +184,61 @@ class SurveyPurchaseAdmin(admin.ModelAdmin):
     Allows staff users to filter and edit completed purchases.
     """
     list_display = [
-        "purchaser", "survey", "amount", "payment_method", "transaction_id", "created"]
-    list_filter = ["survey"]
+        "purchaser", "survey", "amount", "payment_method", "transaction_id", "payment_status",
+        "get_response_count", "created"]
+    list_filter = ["survey", "payment_status"]
+    list_select_related = ["purchaser", "survey"]
+    # Searches are backed by trigram indexes on PostgreSQL, see migration 0004
     search_fields = ["purchaser__email", "purchaser__username", "payment_method", "transaction_id"]
     date_hierarchy = "created"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = [
         (None, {
             "fields": [
-                "purchaser", "survey", "amount", "payment_method", "transaction_id", "notes",
-                "created"]
+                "purchaser", "survey", "amount", "payment_method", "transaction_id",
+                "payment_status", "payment_error", "notes", "created"]
         }),
         ("Responses", {
-            "fields": ["get_public_link", "get_response_count", "report_generated"]
+            "fields": [
+                "get_public_link", "get_response_count", "report_generated", "responses_archived"]
         })
     ]
-    readonly_fields = ["created", "get_response_count", "get_public_link"]
+    readonly_fields = ["created", "get_response_count", "get_public_link", "responses_archived"]
+
+    def get_queryset(self, request):
+        """
+        Annotate response counts with a subquery, which only runs for the rows displayed.
+        """
+        responses = SurveyResponse.objects.filter(purchase=OuterRef("pk")).order_by()
+        responses = responses.values("purchase").annotate(count=Count("pk")).values("count")
+        qs = super(SurveyPurchaseAdmin, self).get_queryset(request)
+        return qs.annotate(response_count=Coalesce(Subquery(responses), 0))
 
     def get_response_count(self, obj):
-        return obj.responses.count()
+        return obj.response_count + obj.archived_response_count
     get_response_count.short_description = _("Responses")
+    get_response_count.admin_order_field = F("response_count") + F("archived_response_count")
 
     def get_public_link(self, obj):
         return format_html(
             "<a href='{}' target='_blank'>Open public page</a>",
             obj.get_response_create_url())
     get_public_link.short_description = _("Public link")
+
+
+@admin.register(ReconciliationMismatch)
+class ReconciliationMismatchAdmin(admin.ModelAdmin):
+    """
+    Lists the discrepancies found by the reconcile_payments command.
+    """
+    list_display = [
+        "transaction_id", "reason", "purchase", "expected_amount", "settled_amount", "source",
+        "created"]
+    list_filter = ["reason", "source"]
+    list_select_related = ["purchase__survey"]
+    search_fields = ["transaction_id"]
+    date_hierarchy = "created"
+    raw_id_fields = ["purchase"]
+    readonly_fields = ["created"]
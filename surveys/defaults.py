@@ -13,3 +13,10 @@ register_setting(
     default="surveys.views.SurveyPurchaseReport",
     editable=False,
 )
+
+register_setting(
+    name="SURVEYS_PAYMENT_PENDING_TIMEOUT",
+    description="Seconds after which a payment still being processed is considered failed",
+    default=15 * 60,
+    editable=False,
+)
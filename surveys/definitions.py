@@ -0,0 +1,204 @@
+from __future__ import absolute_import, unicode_literals
+
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from mezzanine.conf import settings
+from mezzanine.core.models import CONTENT_STATUS_DRAFT
+
+from mezzy.utils.models import bulk_insert
+
+from .models import SurveyPage, Category, Subcategory, Question
+
+# Record types in the order they must appear, with their model, parent field and fields
+RECORD_TYPES = [
+    ("survey", SurveyPage, None, [
+        "title", "content", "cost", "max_rating", "instructions", "purchase_response",
+        "completed_message", "report_explanation"]),
+    ("category", Category, "survey", ["_order", "title", "description"]),
+    ("subcategory", Subcategory, "category", ["_order", "title", "description"]),
+    ("question", Question, "subcategory", [
+        "_order", "prompt", "field_type", "required", "invert_rating"]),
+]
+
+
+def get_field_names(model, names):
+    """
+    Expand translated fields into one field per language in LANGUAGES.
+    """
+    translated = {}
+    if settings.USE_MODELTRANSLATION:
+        from modeltranslation.translator import NotRegistered, translator
+        from modeltranslation.utils import get_translation_fields
+        try:
+            options = translator.get_options_for_model(model)
+        except NotRegistered:
+            pass
+        else:
+            translated = {name: get_translation_fields(name) for name in options.all_fields}
+    field_names = []
+    for name in names:
+        field_names.extend(translated.get(name, [name]))
+    return field_names
+
+
+def get_columns():
+    """
+    All the columns a survey definition can have, used as the CSV header.
+    """
+    columns = ["type", "id", "parent"]
+    for record_type, model, parent_field, names in RECORD_TYPES:
+        columns.extend(name for name in get_field_names(model, names) if name not in columns)
+    return columns
+
+
+def export_survey(survey, chunk_size=2000):
+    """
+    Yield the survey definition as flat records: the survey itself followed by all
+    its categories, subcategories and questions. Each record has a `type`, an `id`
+    and the `id` of its `parent` record, plus a column per field and language.
+    """
+    querysets = {
+        "survey": SurveyPage.objects.filter(pk=survey.pk),
+        "category": Category.objects.filter(survey=survey),
+        "subcategory": Subcategory.objects.filter(category__survey=survey),
+        "question": Question.objects.filter(subcategory__category__survey=survey),
+    }
+    for record_type, model, parent_field, names in RECORD_TYPES:
+        fields = get_field_names(model, names)
+        parent = model._meta.get_field(parent_field).attname if parent_field else None
+        values = querysets[record_type].order_by("pk").values(
+            "pk", *([parent] if parent else []) + fields)
+        for row in values.iterator(chunk_size=chunk_size):
+            record = {"type": record_type, "id": row.pop("pk"), "parent": row.pop(parent, None)}
+            record.update(row)
+            yield record
+
+
+def write_json_lines(records, output):
+    for record in records:
+        output.write(json.dumps(record, cls=DjangoJSONEncoder))
+        output.write("\n")
+
+
+def write_csv(records, output):
+    writer = csv.DictWriter(output, get_columns(), lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(records)
+
+
+def read_json_lines(lines):
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(lines):
+    """
+    Empty cells are left out, so those fields get their default values.
+    """
+    for row in csv.DictReader(lines):
+        yield {key: value for key, value in row.items() if value not in ("", None)}
+
+
+class SurveyImporter(object):
+    """
+    Validates survey definition records and inserts them in batches.
+    Records must be ordered like export_survey() yields them, so each batch only
+    refers to parents that are already saved.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.types = {
+            record_type: (level, model, parent_field, names, get_field_names(model, names))
+            for level, (record_type, model, parent_field, names) in enumerate(RECORD_TYPES)}
+        self.level = -1
+        self.survey = None
+        self.parents = {record_type: {} for record_type in self.types}
+        self.pending = []
+        self.counts = {record_type: 0 for record_type in self.types}
+        self.errors = []
+
+    def add(self, number, record):
+        try:
+            self.add_record(record)
+        except ValidationError as error:
+            self.errors.extend("Line %s: %s" % (number, message) for message in error.messages)
+
+    def add_record(self, record):
+        record = dict(record)
+        record_type = record.pop("type", None)
+        if record_type not in self.types:
+            raise ValidationError("Unknown record type: %s" % record_type)
+        level, model, parent_field, names, fields = self.types[record_type]
+        if level < self.level or (level == 0 and self.survey is not None):
+            raise ValidationError("%s records are out of order" % record_type.title())
+        if level > self.level:
+            self.flush()
+            self.level = level
+
+        ref = str(record.pop("id", ""))
+        if not ref or ref in self.parents[record_type]:
+            raise ValidationError("Missing or duplicate id: %s" % ref)
+        parent_ref = record.pop("parent", None)
+
+        # Translated fields can also be given without a language, for the current one
+        allowed = set(names) | set(fields)
+        # Invalid records are still remembered so their children aren't reported too
+        obj = model(**{name: value for name, value in record.items() if name in allowed})
+        self.parents[record_type][ref] = obj if record_type != "question" else None
+        unknown = set(record) - allowed
+        if unknown:
+            raise ValidationError("Unknown fields: %s" % ", ".join(sorted(unknown)))
+        if parent_field:
+            parent_type = RECORD_TYPES[level - 1][0]
+            try:
+                setattr(obj, parent_field, self.parents[parent_type][str(parent_ref)])
+            except KeyError:
+                raise ValidationError("Unknown parent: %s" % parent_ref)
+        obj.clean_fields(exclude=[
+            field.name for field in model._meta.fields if field.name not in allowed])
+
+        self.counts[record_type] += 1
+        if level == 0:
+            self.survey = obj
+            if not self.errors:
+                obj.status = CONTENT_STATUS_DRAFT
+                obj.save()
+        else:
+            self.pending.append(obj)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        if self.pending and not self.errors:
+            model, parent_field = self.types[RECORD_TYPES[self.level][0]][1:3]
+            bulk_insert(model, self.pending, model._meta.get_field(parent_field).attname)
+        self.pending = []
+
+    def finish(self):
+        self.flush()
+        if self.survey is None and not self.errors:
+            self.errors.append("The definition doesn't include a survey")
+        if self.errors:
+            raise ValidationError(self.errors)
+        return self.survey
+
+
+def import_survey(records, batch_size=1000):
+    """
+    Create a draft survey from definition records in a single transaction.
+    All records are validated; if any are invalid nothing is saved and a
+    ValidationError with a message for each problem is raised.
+    """
+    with transaction.atomic():
+        importer = SurveyImporter(batch_size=batch_size)
+        for number, record in enumerate(records, 1):
+            importer.add(number, record)
+        importer.finish()
+    return importer
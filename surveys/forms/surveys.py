@@ -19,6 +19,14 @@ class SurveyPurchaseForm(UXFormMixin, forms.ModelForm):
         fields = []  # No model fields are user-editable
 
 
+class PurchaseCodeGenerateForm(forms.Form):
+    """
+    Allows staff users to generate purchase codes in bulk.
+    """
+    count = forms.IntegerField(label=_("Number of codes"), min_value=1, max_value=1000000)
+    uses_remaining = forms.IntegerField(label=_("Uses per code"), min_value=1, initial=1)
+
+
 class SurveyResponseForm(forms.ModelForm):
     """
     Allows users to answer survey questions.
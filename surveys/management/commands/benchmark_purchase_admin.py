@@ -0,0 +1,117 @@
+from __future__ import absolute_import, unicode_literals
+
+import time
+import uuid
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from ...admin import SurveyPurchaseAdmin
+from ...models import SurveyPage, SurveyPurchase, SurveyResponse
+
+
+class BaselinePurchaseAdmin(SurveyPurchaseAdmin):
+    """
+    The purchase changelist without its optimisations, for comparison.
+    """
+    list_select_related = False
+    paginator = Paginator
+    show_full_result_count = True
+
+    def get_queryset(self, request):
+        return admin.ModelAdmin.get_queryset(self, request)
+
+    def get_response_count(self, obj):
+        return obj.responses.count()
+
+
+class Command(BaseCommand):
+    """
+    Measure the purchase admin changelist on seeded data, with and without its
+    optimisations. The seeded survey, users and purchases are deleted afterwards.
+    """
+    help = "Benchmark the SurveyPurchase admin changelist against the configured database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--purchases", type=int, default=100000,
+            help="Purchases to seed (default: 100000)")
+        parser.add_argument(
+            "--users", type=int, default=1000, help="Purchasers to seed (default: 1000)")
+        parser.add_argument(
+            "--repeat", type=int, default=3,
+            help="Requests per scenario, the fastest is reported (default: 3)")
+
+    def handle(self, *args, **options):
+        if options["purchases"] < 1 or options["users"] < 1 or options["repeat"] < 1:
+            raise CommandError("All options must be positive integers")
+
+        suffix = uuid.uuid4().hex[:8]
+        User = get_user_model()
+        survey = SurveyPage.objects.create(title="Admin benchmark %s" % suffix)
+        superuser = User.objects.create(
+            username="benchmark-admin-%s" % suffix, is_staff=True, is_superuser=True)
+        try:
+            self.seed(survey, suffix, options["users"], options["purchases"])
+            factory = RequestFactory()
+            survey_lookup = "survey__%s__exact" % SurveyPage._meta.pk.name
+            scenarios = [
+                ("changelist", {}),
+                ("search by email", {"q": "user-%s-1@" % suffix}),
+                ("filter by survey", {survey_lookup: survey.pk}),
+            ]
+            self.stdout.write("%-20s %22s %22s" % ("", "baseline", "optimised"))
+            for label, params in scenarios:
+                request = factory.get("/admin/surveys/surveypurchase/", params)
+                request.user = superuser
+                results = [
+                    self.measure(admin_class(SurveyPurchase, admin.site), request,
+                                 options["repeat"])
+                    for admin_class in [BaselinePurchaseAdmin, SurveyPurchaseAdmin]]
+                self.stdout.write("%-20s %22s %22s" % (label, results[0], results[1]))
+        finally:
+            survey.delete()
+            User.objects.filter(username__startswith="benchmark-").filter(
+                username__endswith=suffix).delete()
+            User.objects.filter(username__startswith="user-%s-" % suffix).delete()
+
+    def seed(self, survey, suffix, users, purchases):
+        start = time.time()
+        User = get_user_model()
+        User.objects.bulk_create([
+            User(username="user-%s-%d" % (suffix, i), email="user-%s-%d@example.com" % (suffix, i))
+            for i in range(users)], batch_size=5000)
+        user_ids = list(User.objects.filter(
+            username__startswith="user-%s-" % suffix).values_list("pk", flat=True))
+
+        for offset in range(0, purchases, 5000):
+            batch = SurveyPurchase.objects.bulk_create([
+                SurveyPurchase(
+                    survey=survey, purchaser_id=user_ids[i % len(user_ids)], amount=10,
+                    transaction_id=str(i), payment_method="Authorize.Net")
+                for i in range(offset, min(offset + 5000, purchases))])
+            # Give every tenth purchase a response
+            SurveyResponse.objects.bulk_create([
+                SurveyResponse(purchase=purchase) for purchase in batch[::10]])
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        self.stdout.write(
+            "Seeded %d purchases for %d users in %.1fs" % (purchases, users, time.time() - start))
+
+    def measure(self, model_admin, request, repeat):
+        best = None
+        for i in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.time()
+                model_admin.changelist_view(request).render()
+                elapsed = time.time() - start
+            if best is None or elapsed < best[0]:
+                best = (elapsed, len(queries))
+        return "%8.1fms %4d queries" % (best[0] * 1000, best[1])
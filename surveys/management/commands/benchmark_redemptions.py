@@ -0,0 +1,89 @@
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from ...models import SurveyPage, SurveyPurchase, SurveyPurchaseCode
+
+
+class Command(BaseCommand):
+    """
+    Measure purchase code redemption throughput under concurrency.
+    A throwaway survey, user and code are created and deleted afterwards.
+    """
+    help = "Benchmark concurrent purchase code redemptions against the configured database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Concurrent redeemers (default: 8)")
+        parser.add_argument(
+            "--redemptions", type=int, default=2000,
+            help="Total redemptions to attempt (default: 2000)")
+        parser.add_argument(
+            "--uses", type=int, default=None,
+            help="Uses available on the code (default: same as --redemptions)")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            raise CommandError("SQLite serialises all writers, use a client/server database")
+
+        threads = options["threads"]
+        total = options["redemptions"]
+        uses = total if options["uses"] is None else options["uses"]
+        suffix = uuid.uuid4().hex[:8]
+
+        survey = SurveyPage.objects.create(title="Redemption benchmark %s" % suffix)
+        user = get_user_model().objects.create(username="benchmark-%s" % suffix)
+        code = SurveyPurchaseCode.objects.create(survey=survey, uses_remaining=uses)
+
+        results = {"redeemed": 0, "rejected": 0}
+        lock = threading.Lock()
+
+        def redeem(attempts):
+            redeemed = rejected = 0
+            try:
+                for i in range(attempts):
+                    with transaction.atomic():
+                        if survey.purchase_codes.redeem(code.code):
+                            SurveyPurchase.objects.create(
+                                survey=survey, purchaser=user, amount=0,
+                                transaction_id=code.code, payment_method="Purchase Code")
+                            redeemed += 1
+                        else:
+                            rejected += 1
+            finally:
+                connections.close_all()
+            with lock:
+                results["redeemed"] += redeemed
+                results["rejected"] += rejected
+
+        workers = [
+            threading.Thread(target=redeem, args=(total // threads + (i < total % threads),))
+            for i in range(threads)]
+        try:
+            start = time.time()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.time() - start
+
+            code.refresh_from_db()
+            purchases = survey.purchases.count()
+        finally:
+            survey.delete()
+            user.delete()
+
+        self.stdout.write(
+            "%d threads, %d attempts in %.2fs: %.0f redemptions/s" % (
+                threads, total, elapsed, results["redeemed"] / elapsed))
+        self.stdout.write(
+            "redeemed=%d rejected=%d purchases=%d uses_remaining=%d" % (
+                results["redeemed"], results["rejected"], purchases, code.uses_remaining))
+        if purchases != results["redeemed"] or code.uses_remaining != uses - purchases:
+            raise CommandError("Redemption counts are inconsistent")
@@ -0,0 +1,34 @@
+from __future__ import absolute_import, unicode_literals
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...definitions import export_survey, write_csv, write_json_lines
+from ...models import SurveyPage
+
+
+class Command(BaseCommand):
+    """
+    Stream a survey definition with all its questions and translations.
+    """
+    help = "Export a survey definition as JSON lines or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("survey_id", type=int, help="ID of the SurveyPage")
+        parser.add_argument(
+            "--format", choices=["json", "csv"], default="json",
+            help="Output format (default: json)")
+        parser.add_argument(
+            "--output", help="File to write the definition to (default: standard output)")
+
+    def handle(self, *args, **options):
+        try:
+            survey = SurveyPage.objects.get(pk=options["survey_id"])
+        except SurveyPage.DoesNotExist:
+            raise CommandError("Survey %s does not exist" % options["survey_id"])
+
+        write = write_csv if options["format"] == "csv" else write_json_lines
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                write(export_survey(survey), output)
+        else:
+            write(export_survey(survey), self.stdout)
@@ -0,0 +1,48 @@
+from __future__ import absolute_import, unicode_literals
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import SurveyPage, SurveyPurchaseCode
+
+
+class Command(BaseCommand):
+    """
+    Generate purchase codes for a survey in bulk and write them out as CSV.
+    """
+    help = "Generate purchase codes for a survey and write them as CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("survey_id", type=int, help="ID of the SurveyPage")
+        parser.add_argument("count", type=int, help="Number of codes to generate")
+        parser.add_argument(
+            "--uses", type=int, default=1, help="Remaining uses for each code (default: 1)")
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="Rows per insert (default: 5000)")
+        parser.add_argument(
+            "--output", help="File to write the codes to (default: standard output)")
+
+    def handle(self, *args, **options):
+        try:
+            survey = SurveyPage.objects.get(pk=options["survey_id"])
+        except SurveyPage.DoesNotExist:
+            raise CommandError("Survey %s does not exist" % options["survey_id"])
+        if options["count"] < 1:
+            raise CommandError("The number of codes must be a positive integer")
+
+        codes = SurveyPurchaseCode.objects.generate(
+            survey, options["count"], uses_remaining=options["uses"],
+            batch_size=options["batch_size"])
+
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                self.write_codes(output, codes, options["uses"])
+        else:
+            self.write_codes(self.stdout, codes, options["uses"])
+
+    def write_codes(self, output, codes, uses):
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(["code", "uses_remaining"])
+        for code in codes:
+            writer.writerow([code, uses])
@@ -0,0 +1,40 @@
+from __future__ import absolute_import, unicode_literals
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from ...definitions import import_survey, read_csv, read_json_lines
+
+
+class Command(BaseCommand):
+    """
+    Create a draft survey from a definition written by export_survey.
+    """
+    help = "Import a survey definition from JSON lines or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Survey definition to import")
+        parser.add_argument(
+            "--format", choices=["json", "csv"],
+            help="Format of the file (default: guessed from its extension)")
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Rows per insert (default: 1000)")
+
+    def handle(self, *args, **options):
+        file_format = options["format"]
+        if file_format is None:
+            file_format = "csv" if options["file"].lower().endswith(".csv") else "json"
+        read = read_csv if file_format == "csv" else read_json_lines
+
+        try:
+            with open(options["file"], newline="") as lines:
+                importer = import_survey(read(lines), batch_size=options["batch_size"])
+        except ValueError as error:
+            raise CommandError("Invalid survey definition: %s" % error)
+        except ValidationError as error:
+            raise CommandError("Invalid survey definition:\n%s" % "\n".join(error.messages))
+
+        self.stdout.write("Imported survey %s (%s) as a draft: %s" % (
+            importer.survey.pk, importer.survey,
+            ", ".join("%s %s" % (count, record_type)
+                      for record_type, count in importer.counts.items())))
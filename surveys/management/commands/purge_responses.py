@@ -0,0 +1,55 @@
+from __future__ import absolute_import, unicode_literals
+
+import os
+import time
+
+from datetime import datetime, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from django.utils.timezone import make_aware
+
+from ...retention import ResponsePurger
+
+
+class Command(BaseCommand):
+    """
+    Archive and delete the responses of purchases that were closed before a cutoff.
+    """
+    help = (
+        "Archive the responses of purchases whose report and responses predate --before "
+        "to gzipped JSON lines files, then delete them in batches. Safe to resume.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before", required=True, help="Cutoff date for archiving (YYYY-MM-DD)")
+        parser.add_argument(
+            "--archive-dir", required=True, help="Directory the archive files are written to")
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Responses archived and deleted per batch (default: 1000)")
+        parser.add_argument(
+            "--sleep", type=float, default=0.5,
+            help="Seconds to pause between batches (default: 0.5)")
+
+    def handle(self, *args, **options):
+        try:
+            day = parse_date(options["before"])
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError("Invalid date: %s" % options["before"])
+        if options["batch_size"] < 1 or options["sleep"] < 0:
+            raise CommandError("The batch size must be positive and the pause can't be negative")
+        if not os.path.isdir(options["archive_dir"]):
+            raise CommandError("Archive directory doesn't exist: %s" % options["archive_dir"])
+
+        purger = ResponsePurger(
+            make_aware(datetime.combine(day, dt_time.min)), options["archive_dir"],
+            batch_size=options["batch_size"], sleep=options["sleep"])
+        began = time.monotonic()
+        counts = purger.purge()
+        self.stdout.write(
+            "Archived %s purchases and %s responses to %s files in %.1fs" % (
+                counts["purchases"], counts["responses"], counts["files"],
+                time.monotonic() - began))
@@ -0,0 +1,96 @@
+from __future__ import absolute_import, unicode_literals
+
+import time
+
+from datetime import datetime, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from django.utils.timezone import make_aware
+
+from ...models import ReconciliationMismatch
+from ...payments.reconciliation import (
+    Reconciler, parse_amount, read_settlement_csv, read_settlement_json)
+
+
+class Command(BaseCommand):
+    """
+    Reconcile purchases against gateway settlement data and record the mismatches.
+    """
+    help = (
+        "Reconcile purchases against a settlement file (CSV or JSON lines) or the "
+        "Authorize.net settled batches between --start and --end")
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", nargs="?", help="Settlement file to reconcile against")
+        parser.add_argument(
+            "--format", choices=["csv", "json"],
+            help="Format of the settlement file (default: guessed from its extension)")
+        parser.add_argument(
+            "--id-column", default="transaction_id",
+            help="Column holding the transaction ID (default: transaction_id)")
+        parser.add_argument(
+            "--amount-column", default="amount",
+            help="Column holding the settled amount (default: amount)")
+        parser.add_argument(
+            "--start", help="First day of the settlement period (YYYY-MM-DD)")
+        parser.add_argument(
+            "--end", help="Last day of the settlement period (YYYY-MM-DD)")
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000,
+            help="Transactions matched per query (default: 5000)")
+
+    def handle(self, *args, **options):
+        start = self.parse_day(options["start"], dt_time.min)
+        end = self.parse_day(options["end"], dt_time.max)
+        if not options["file"] and not (start and end):
+            raise CommandError("Provide a settlement file or both --start and --end")
+        if options["chunk_size"] < 1:
+            raise CommandError("The chunk size must be a positive integer")
+
+        reconciler = Reconciler(
+            source=options["file"] or "Authorize.Net", chunk_size=options["chunk_size"])
+
+        began = time.monotonic()
+        try:
+            if options["file"]:
+                with open(options["file"], newline="") as lines:
+                    reconciler.reconcile(self.read_file(lines, options))
+            else:
+                from ...payments.gateway import iter_settled_transactions
+                reconciler.reconcile(
+                    (transaction_id, parse_amount(amount))
+                    for transaction_id, amount in iter_settled_transactions(start.date(), end.date()))
+        except (KeyError, ValueError) as error:
+            raise CommandError("Invalid settlement data: %s" % error)
+
+        # Purchases missing from the settlement can only be found for a known period
+        if start and end:
+            reconciler.find_unsettled(
+                reconciler.get_purchases().filter(created__range=(start, end)))
+
+        counts = reconciler.counts
+        self.stdout.write(
+            "Reconciled %s transactions in %.1fs: %s matched" % (
+                counts["transactions"], time.monotonic() - began, counts["matched"]))
+        for reason, label in ReconciliationMismatch.REASONS:
+            self.stdout.write("%s: %s" % (label, counts[reason]))
+
+    def read_file(self, lines, options):
+        file_format = options["format"]
+        if file_format is None:
+            file_format = "csv" if options["file"].lower().endswith(".csv") else "json"
+        reader = read_settlement_csv if file_format == "csv" else read_settlement_json
+        return reader(
+            lines, id_column=options["id_column"], amount_column=options["amount_column"])
+
+    def parse_day(self, value, at):
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError("Invalid date: %s" % value)
+        return make_aware(datetime.combine(day, at))
@@ -1,6 +1,10 @@
 from __future__ import absolute_import, unicode_literals
 
-from django.db.models import QuerySet, Avg, Count
+import csv
+import io
+
+from django.db import connections, transaction
+from django.db.models import Exists, F, OuterRef, Q, QuerySet, Avg, Count
 
 
 class SurveyPurchaseQuerySet(QuerySet):
@@ -17,6 +21,97 @@ class SurveyPurchaseQuerySet(QuerySet):
         """
         return self.filter(report_generated__isnull=False)
 
+    def paid(self):
+        return self.filter(payment_status=self.model.PAYMENT_PAID)
+
+    def archivable(self, cutoff):
+        """
+        Purchases whose report and responses all predate `cutoff`, including those
+        that got responses but never had a report generated.
+        """
+        responses = self.model._meta.get_field("responses").related_model.objects.filter(
+            purchase=OuterRef("pk"))
+        return self.filter(
+            Q(report_generated__lt=cutoff) |
+            Q(report_generated__isnull=True, created__lt=cutoff) & Exists(responses),
+            responses_archived__isnull=True,
+        ).exclude(responses__created__gte=cutoff)
+
+    def pending(self):
+        """
+        Purchases waiting for their payment to be captured in the background.
+        """
+        return self.filter(payment_status=self.model.PAYMENT_PENDING)
+
+    def expire_pending(self, cutoff):
+        """
+        Mark purchases pending since before `cutoff` as failed, so they can be tried again.
+        Their charge was lost along with the worker running it, e.g. on a restart.
+        """
+        return self.pending().filter(updated__lt=cutoff).update(
+            payment_status=self.model.PAYMENT_FAILED,
+            payment_error="The payment could not be confirmed in time")
+
+
+class SurveyPurchaseCodeQuerySet(QuerySet):
+    """
+    Provides redemption and bulk generation of purchase codes.
+    """
+
+    def redeem(self, code):
+        """
+        Use up one of the remaining uses of `code` with a single conditional UPDATE.
+        Returns True if the code was redeemed, False if it doesn't exist or is depleted.
+        """
+        updated = self.filter(code=code, uses_remaining__gt=0).update(
+            uses_remaining=F("uses_remaining") - 1)
+        return updated > 0
+
+    def generate(self, survey, count, uses_remaining=1, batch_size=5000):
+        """
+        Create `count` new codes for `survey` and return them as a list of strings.
+        Codes are deduplicated in memory against the survey's existing codes, so
+        they can be inserted in large batches without hitting the unique constraint.
+        """
+        existing = set(self.filter(survey=survey).values_list("code", flat=True).iterator())
+        codes = set()
+        while len(codes) < count:
+            code = self.model.generate_code()
+            if code not in existing:
+                codes.add(code)
+        codes = list(codes)
+
+        with transaction.atomic(using=self.db):
+            for start in range(0, len(codes), batch_size):
+                self._insert_codes(survey, codes[start:start + batch_size], uses_remaining)
+        return codes
+
+    def _insert_codes(self, survey, codes, uses_remaining):
+        """
+        Insert a chunk of codes with COPY when the database driver supports it
+        (psycopg2), and with a parameterised executemany() otherwise.
+        Model instances are never built, which keeps millions of rows cheap.
+        """
+        connection = connections[self.db]
+        opts = self.model._meta
+        qn = connection.ops.quote_name
+        table = qn(opts.db_table)
+        columns = ", ".join(
+            qn(opts.get_field(name).column) for name in ("survey", "code", "uses_remaining"))
+        rows = [(survey.pk, code, uses_remaining) for code in codes]
+
+        with connection.cursor() as cursor:
+            copy_expert = getattr(cursor.cursor, "copy_expert", None)
+            if copy_expert is not None:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                buffer.seek(0)
+                copy_expert(
+                    "COPY %s (%s) FROM STDIN WITH (FORMAT csv)" % (table, columns), buffer)
+            else:
+                cursor.executemany(
+                    "INSERT INTO %s (%s) VALUES (%%s, %%s, %%s)" % (table, columns), rows)
+
 
 class RatingDataQuerySet(QuerySet):
     """
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveypurchase',
+            name='payment_status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Pending'), (2, 'Paid'), (3, 'Failed')], default=2, verbose_name='Payment status'),
+        ),
+        migrations.AddField(
+            model_name='surveypurchase',
+            name='payment_error',
+            field=models.TextField(blank=True, verbose_name='Payment error'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0002_surveypurchase_payment_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='surveypurchase',
+            name='transaction_id',
+            field=models.CharField(blank=True, db_index=True, max_length=200, verbose_name='Transaction ID'),
+        ),
+        migrations.CreateModel(
+            name='ReconciliationMismatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(editable=False, null=True)),
+                ('updated', models.DateTimeField(editable=False, null=True)),
+                ('transaction_id', models.CharField(db_index=True, max_length=200, verbose_name='Transaction ID')),
+                ('reason', models.PositiveSmallIntegerField(choices=[(1, 'Settled without a purchase'), (2, 'Amount mismatch'), (3, 'Purchase not settled')], verbose_name='Reason')),
+                ('expected_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, verbose_name='Expected amount')),
+                ('settled_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, verbose_name='Settled amount')),
+                ('source', models.CharField(blank=True, max_length=255, verbose_name='Source')),
+                ('purchase', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reconciliation_mismatches', to='surveys.surveypurchase')),
+            ],
+            options={
+                'verbose_name': 'reconciliation mismatch',
+                'verbose_name_plural': 'reconciliation mismatches',
+            },
+        ),
+    ]
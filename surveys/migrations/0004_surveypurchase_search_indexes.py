@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations, models
+
+# Admin searches run UPPER(column::text) LIKE UPPER('%term%') on PostgreSQL,
+# which trigram indexes on the same expression can answer without a full scan.
+TRIGRAM_INDEXES = [
+    ("surveys_user_email_trgm", settings.AUTH_USER_MODEL, "email"),
+    ("surveys_user_username_trgm", settings.AUTH_USER_MODEL, "username"),
+    ("surveys_purchase_transaction_trgm", "surveys.SurveyPurchase", "transaction_id"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    quote = schema_editor.quote_name
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, model, field in TRIGRAM_INDEXES:
+        model = apps.get_model(model)
+        column = model._meta.get_field(field).column
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS %s ON %s USING gin ((UPPER(%s::text)) gin_trgm_ops)" % (
+                quote(name), quote(model._meta.db_table), quote(column)))
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, model, field in TRIGRAM_INDEXES:
+        schema_editor.execute("DROP INDEX IF EXISTS %s" % schema_editor.quote_name(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('surveys', '0003_reconciliationmismatch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='surveypurchase',
+            index=models.Index(fields=['created'], name='surveys_purchase_created_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0004_surveypurchase_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveypurchase',
+            name='responses_archived',
+            field=models.DateTimeField(blank=True, help_text="Once responses are archived the cached report can't be regenerated", null=True, verbose_name='Responses archived'),
+        ),
+        migrations.AddField(
+            model_name='surveypurchase',
+            name='archived_response_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Archived responses'),
+        ),
+    ]
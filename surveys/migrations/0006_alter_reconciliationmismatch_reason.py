@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0005_surveypurchase_responses_archived'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reconciliationmismatch',
+            name='reason',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Settled without a purchase'), (2, 'Amount mismatch'), (3, 'Purchase not settled'), (4, 'Settled more than once')], verbose_name='Reason'),
+        ),
+    ]
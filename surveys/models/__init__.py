@@ -1,4 +1,4 @@
 # flake8: noqa
 
-from .surveys import SurveyPage, SurveyPurchase, SurveyPurchaseCode
+from .surveys import SurveyPage, SurveyPurchase, SurveyPurchaseCode, ReconciliationMismatch
 from .questions import Category, Question, SurveyResponse, QuestionResponse, Subcategory
@@ -7,7 +7,7 @@ import uuid
 
 from builtins import range
 
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.core.validators import MinValueValidator, MaxValueValidator
 # from django.utils.encoding import python_2_unicode_compatible
@@ -16,10 +16,12 @@ from django.utils.translation import gettext_lazy as _
 
 from mezzanine.conf import settings
 from mezzanine.core.fields import RichTextField
-from mezzanine.core.models import RichText, TimeStamped
+from mezzanine.core.models import CONTENT_STATUS_DRAFT, RichText, TimeStamped
 from mezzanine.pages.models import Page
 
-from ..managers import SurveyPurchaseQuerySet
+from mezzy.utils.models import bulk_insert
+
+from ..managers import SurveyPurchaseCodeQuerySet, SurveyPurchaseQuerySet
 
 
 class SurveyPage(Page, RichText):
@@ -51,6 +53,34 @@ class SurveyPage(Page, RichText):
     def get_rating_choices(self):
         return range(1, self.max_rating + 1)
 
+    def clone(self, **attrs):
+        """
+        Copy the survey and its full Category / Subcategory / Question tree, with all
+        translations and the original ordering. The copy is saved as a draft with a
+        new slug, any `attrs` given are set on it before saving.
+        Each level of the tree is copied with a single bulk insert.
+        """
+        from .questions import Category, Subcategory, Question
+
+        with transaction.atomic():
+            survey = SurveyPage.objects.get(pk=self.pk)
+            survey.pk = survey.id = None
+            survey._state.adding = True
+            survey.slug = ""
+            survey._order = None
+            survey.status = CONTENT_STATUS_DRAFT
+            for name, value in attrs.items():
+                setattr(survey, name, value)
+            survey.save()
+
+            categories = copy_rows(
+                Category.objects.filter(survey=self), "survey", {self.pk: survey.pk})
+            subcategories = copy_rows(
+                Subcategory.objects.filter(category__survey=self), "category", categories)
+            copy_rows(Question.objects.filter(subcategory__category__survey=self),
+                      "subcategory", subcategories)
+        return survey
+
     def get_requires_payment(self):
         return self.cost > 0
 
@@ -59,6 +89,21 @@ class SurveyPage(Page, RichText):
         verbose_name_plural = _("survey pages")
 
 
+def copy_rows(queryset, parent_field, parents):
+    """
+    Insert a copy of every object in `queryset` under the new parents given by the
+    `parents` mapping of old to new parent IDs. Returns the same mapping for the copies.
+    """
+    parent_attr = queryset.model._meta.get_field(parent_field).attname
+    objects = list(queryset.order_by("pk"))
+    old_ids = [obj.pk for obj in objects]
+    for obj in objects:
+        obj.pk = None
+        setattr(obj, parent_attr, parents[getattr(obj, parent_attr)])
+    bulk_insert(queryset.model, objects, parent_attr)
+    return {old_id: obj.pk for old_id, obj in zip(old_ids, objects)}
+
+
 # @python_2_unicode_compatible
 class SurveyPurchaseCode(models.Model):
     """
@@ -70,6 +115,8 @@ class SurveyPurchaseCode(models.Model):
         help_text=_("If left blank it will be automatically generated"))
     uses_remaining = models.PositiveIntegerField(_("Remaining uses"), default=0)
 
+    objects = SurveyPurchaseCodeQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("purchase code")
         verbose_name_plural = _("purchase codes")
@@ -78,12 +125,19 @@ class SurveyPurchaseCode(models.Model):
     def __str__(self):
         return self.code
 
+    @staticmethod
+    def generate_code():
+        """
+        Build a random code from a UUID.
+        """
+        return str(uuid.uuid4()).strip("-")[4:23]
+
     def save(self, *args, **kwargs):
         """
         Generate a UUID if the code hasn't been defined
         """
         if not self.code:
-            self.code = str(uuid.uuid4()).strip("-")[4:23]
+            self.code = self.generate_code()
         super(SurveyPurchaseCode, self).save(*args, **kwargs)
 
 
@@ -92,25 +146,43 @@ class SurveyPurchase(TimeStamped):
     """
     A record of a user purchasing a Survey.
     """
+    PAYMENT_PENDING = 1
+    PAYMENT_PAID = 2
+    PAYMENT_FAILED = 3
+    PAYMENT_STATUSES = (
+        (PAYMENT_PENDING, _("Pending")),
+        (PAYMENT_PAID, _("Paid")),
+        (PAYMENT_FAILED, _("Failed")),
+    )
+
     survey = models.ForeignKey(SurveyPage, on_delete=models.CASCADE, related_name="purchases")
     purchaser = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="survey_purchases")
     public_id = models.UUIDField(db_index=True, default=uuid.uuid4, editable=False)
 
-    transaction_id = models.CharField(_("Transaction ID"), max_length=200, blank=True)
+    transaction_id = models.CharField(
+        _("Transaction ID"), max_length=200, blank=True, db_index=True)
     payment_method = models.CharField(_("Payment method"), max_length=100, blank=True)
     amount = models.DecimalField(
         _("Amount"), max_digits=8, decimal_places=2, blank=True, null=True)
     notes = models.TextField(_("Notes"), blank=True)
+    payment_status = models.PositiveSmallIntegerField(
+        _("Payment status"), choices=PAYMENT_STATUSES, default=PAYMENT_PAID)
+    payment_error = models.TextField(_("Payment error"), blank=True)
 
     report_generated = models.DateTimeField(_("Report generated"), blank=True, null=True)
     report_cache = models.TextField(_("Report (cached)"), default="[]")
+    responses_archived = models.DateTimeField(
+        _("Responses archived"), blank=True, null=True,
+        help_text=_("Once responses are archived the cached report can't be regenerated"))
+    archived_response_count = models.PositiveIntegerField(_("Archived responses"), default=0)
 
     objects = SurveyPurchaseQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("purchase")
         verbose_name_plural = _("purchases")
+        indexes = [models.Index(fields=["created"], name="surveys_purchase_created_idx")]
 
     def __str__(self):
         return str(self.survey)
@@ -118,6 +190,9 @@ class SurveyPurchase(TimeStamped):
     def get_absolute_url(self):
         return reverse("surveys:purchase_detail", args=[self.public_id])
 
+    def get_status_url(self):
+        return reverse("surveys:purchase_status", args=[self.public_id])
+
     def get_response_create_url(self):
         return reverse("surveys:response_create", args=[self.public_id])
 
@@ -127,12 +202,19 @@ class SurveyPurchase(TimeStamped):
     def get_report_url(self):
         return reverse("surveys:purchase_report", args=[self.public_id])
 
+    def get_response_count(self):
+        return self.responses.count() + self.archived_response_count
+
     def generate_report(self):
         """
         Generate a report of all responses related to this purchase.
         A cached copy will be stored in self.report_cache.
         The report includes nested data in the shape of Category / Subcategory / Question.
+        Purchases with archived responses keep the cached report they were archived with.
         """
+        if self.responses_archived is not None:
+            return self.get_report_as_json()
+
         from .questions import Question, QuestionResponse
         rating_responses = QuestionResponse.objects.filter(
             response__purchase=self, question__field_type=Question.RATING_FIELD)
@@ -165,3 +247,37 @@ class SurveyPurchase(TimeStamped):
         Load the cached report as JSON.
         """
         return json.loads(self.report_cache)
+
+
+class ReconciliationMismatch(TimeStamped):
+    """
+    A discrepancy found when reconciling purchases against gateway settlement data.
+    """
+    MISSING_PURCHASE = 1
+    AMOUNT_MISMATCH = 2
+    MISSING_SETTLEMENT = 3
+    DUPLICATE_SETTLEMENT = 4
+    REASONS = (
+        (MISSING_PURCHASE, _("Settled without a purchase")),
+        (AMOUNT_MISMATCH, _("Amount mismatch")),
+        (MISSING_SETTLEMENT, _("Purchase not settled")),
+        (DUPLICATE_SETTLEMENT, _("Settled more than once")),
+    )
+
+    purchase = models.ForeignKey(
+        SurveyPurchase, on_delete=models.SET_NULL, blank=True, null=True,
+        related_name="reconciliation_mismatches")
+    transaction_id = models.CharField(_("Transaction ID"), max_length=200, db_index=True)
+    reason = models.PositiveSmallIntegerField(_("Reason"), choices=REASONS)
+    expected_amount = models.DecimalField(
+        _("Expected amount"), max_digits=8, decimal_places=2, blank=True, null=True)
+    settled_amount = models.DecimalField(
+        _("Settled amount"), max_digits=8, decimal_places=2, blank=True, null=True)
+    source = models.CharField(_("Source"), max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = _("reconciliation mismatch")
+        verbose_name_plural = _("reconciliation mismatches")
+
+    def __str__(self):
+        return "%s: %s" % (self.transaction_id, self.get_reason_display())
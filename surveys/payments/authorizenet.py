@@ -13,7 +13,9 @@ except ImportError:
 from mezzanine.conf import settings
 
 from ..forms.surveys import SurveyPurchaseForm
+from ..models import SurveyPurchase
 from ..views import SurveyPurchaseCreate
+from . import deferred, gateway
 
 
 class AuthorizenetSurveyPurchaseForm(SurveyPurchaseForm):
@@ -42,6 +44,7 @@ class AuthorizenetSurveyPurchaseCreate(SurveyPurchaseCreate):
     """
     Creates new SurveyPurchases by processing payments with Authorize.net.
     """
+    deferred_charge = None
 
     def get_form_class(self):
         """
@@ -53,48 +56,63 @@ class AuthorizenetSurveyPurchaseCreate(SurveyPurchaseCreate):
 
     def dispatch(self, *args, **kwargs):
         """
-        Authenticate with Authorize.net early on the view lifecycle.
+        Configure the Authorize.net client early on the view lifecycle.
         Credential errors will surface on GET, before they are critical.
+        The client is only built once per process, see gateway.configure().
         """
-        try:
-            LOGIN = settings.AUTHORIZE_NET_LOGIN
-            KEY = settings.AUTHORIZE_NET_TRANS_KEY
-        except AttributeError:
-            raise ImproperlyConfigured(
-                "You need to define AUTHORIZE_NET_LOGIN and AUTHORIZE_NET_TRANS_KEY in "
-                "your settings module to use the Authorize.net payment processor")
-
-        ENV = authorize.Environment.TEST
-        if not getattr(settings, "AUTHORIZE_NET_TEST_MODE", True):
-            ENV = authorize.Environment.PRODUCTION
-        authorize.Configuration.configure(ENV, LOGIN, KEY)
-
+        gateway.configure()
         return super(AuthorizenetSurveyPurchaseCreate, self).dispatch(*args, **kwargs)
 
+    def form_valid(self, form):
+        """
+        Queue the charge of a deferred payment once the pending purchase is saved.
+        """
+        response = super(AuthorizenetSurveyPurchaseCreate, self).form_valid(form)
+        if self.deferred_charge is not None and form.instance.pk is not None:
+            deferred.submit_capture(form.instance, self.deferred_charge)
+        return response
+
+    def get_charge_params(self, form):
+        user = self.request.user
+        return {
+            "amount": self.survey.cost,
+            "email": user.email,
+            "credit_card": {
+                "card_number": str(form.cleaned_data["card_number"]),
+                "card_code": str(form.cleaned_data["card_ccv"]),
+                "expiration_date": str(form.cleaned_data["card_expiry"]),
+            },
+            "billing": {
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+            },
+            "order": {
+                "invoice_number": deferred.get_idempotency_key(form.instance),
+            },
+        }
+
     def process_payment(self, form):
         """
         Call the Authorize.net API to process the payment.
         ValidationErrors will be shown to the user and cancel the purchase.
+        With AUTHORIZE_NET_DEFERRED_CAPTURE enabled, the purchase is saved as pending
+        and the card is charged by a background worker instead.
         """
         # Let the default processor handle surveys that don't require payment
         if not self.survey.get_requires_payment():
             return super(AuthorizenetSurveyPurchaseCreate, self).process_payment(form)
 
-        user = self.request.user
+        params = self.get_charge_params(form)
         try:
-            charge = authorize.Transaction.sale({
-                "amount": self.survey.cost,
-                "email": user.email,
-                "credit_card": {
-                    "card_number": str(form.cleaned_data["card_number"]),
-                    "card_code": str(form.cleaned_data["card_ccv"]),
-                    "expiration_date": str(form.cleaned_data["card_expiry"]),
-                },
-                "billing": {
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                }
-            })
+            if getattr(settings, "AUTHORIZE_NET_DEFERRED_CAPTURE", False):
+                # Validate the card details now, the worker only reports gateway errors
+                gateway.validate_sale(params)
+                form.instance.payment_status = SurveyPurchase.PAYMENT_PENDING
+                form.instance.amount = self.survey.cost
+                form.instance.payment_method = "Authorize.Net"
+                self.deferred_charge = params
+                return
+            charge = authorize.Transaction.sale(params)
 
         # Show any Authorize.net errors to the user
         except authorize.exceptions.AuthorizeError as exception:
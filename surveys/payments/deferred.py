@@ -0,0 +1,115 @@
+from __future__ import absolute_import, unicode_literals
+
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+
+try:
+    import authorize
+except ImportError:
+    raise ImproperlyConfigured(
+        "Install the py-authorize package to use Authorize.net payment gateway")
+
+from mezzanine.conf import settings
+
+from ..models import SurveyPurchase
+
+logger = logging.getLogger(__name__)
+
+# Authorize.net response reason code for a duplicate transaction
+DUPLICATE_TRANSACTION = "11"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Background workers shared by the whole process.
+    Card details are only ever held in memory, never stored in the database.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "AUTHORIZE_NET_CAPTURE_WORKERS", 4),
+                    thread_name_prefix="survey-payments")
+    return _executor
+
+
+def get_idempotency_key(purchase):
+    """
+    Sent as the invoice number of every attempt to charge `purchase`, so
+    Authorize.net rejects a retry as a duplicate if an earlier attempt went through.
+    """
+    return purchase.public_id.hex[:20]
+
+
+def submit_capture(purchase, params):
+    """
+    Charge a pending purchase in the background once the current transaction commits.
+    """
+    transaction.on_commit(lambda: get_executor().submit(capture, purchase.pk, params))
+
+
+def capture(purchase_id, params):
+    """
+    Run the charge for a pending purchase, retrying connection errors with backoff.
+    The outcome is recorded with a conditional update, so it's only stored once.
+    """
+    retries = getattr(settings, "AUTHORIZE_NET_CAPTURE_RETRIES", 3)
+    backoff = getattr(settings, "AUTHORIZE_NET_CAPTURE_BACKOFF", 2)
+    close_old_connections()
+    try:
+        for attempt in range(retries + 1):
+            try:
+                charge = authorize.Transaction.sale(params)
+            except authorize.exceptions.AuthorizeConnectionError as error:
+                if attempt < retries:
+                    time.sleep(backoff * 2 ** attempt)
+                    continue
+                return record_payment(purchase_id, SurveyPurchase.PAYMENT_FAILED, error=error)
+            except authorize.exceptions.AuthorizeResponseError as error:
+                if error.code == DUPLICATE_TRANSACTION and attempt > 0:
+                    # An earlier attempt was charged but its response got lost
+                    return record_payment(
+                        purchase_id, SurveyPurchase.PAYMENT_PAID,
+                        transaction_id=get_transaction_id(error.full_response))
+                return record_payment(purchase_id, SurveyPurchase.PAYMENT_FAILED, error=error)
+            except authorize.exceptions.AuthorizeError as error:
+                return record_payment(purchase_id, SurveyPurchase.PAYMENT_FAILED, error=error)
+            return record_payment(
+                purchase_id, SurveyPurchase.PAYMENT_PAID,
+                transaction_id=get_transaction_id(charge))
+    except Exception:
+        logger.exception("Capturing the payment of purchase %s failed", purchase_id)
+        record_payment(
+            purchase_id, SurveyPurchase.PAYMENT_FAILED, error="Unexpected error")
+    finally:
+        close_old_connections()
+
+
+def get_transaction_id(response):
+    try:
+        return response["transaction_response"]["trans_id"]
+    except (KeyError, TypeError):
+        return "Unknown"
+
+
+def record_payment(purchase_id, status, transaction_id="", error=""):
+    """
+    Store the outcome of the charge if the purchase is still pending.
+    A charge that went through is also stored on a purchase that timed out meanwhile,
+    see SurveyPurchaseQuerySet.expire_pending().
+    """
+    statuses = [SurveyPurchase.PAYMENT_PENDING]
+    if status == SurveyPurchase.PAYMENT_PAID:
+        statuses.append(SurveyPurchase.PAYMENT_FAILED)
+    return SurveyPurchase.objects.filter(pk=purchase_id, payment_status__in=statuses).update(
+        payment_status=status, transaction_id=transaction_id, payment_error=str(error))
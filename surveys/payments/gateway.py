@@ -0,0 +1,251 @@
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+import xml.etree.ElementTree as E
+
+from datetime import timedelta
+from http.client import HTTPConnection, HTTPException, HTTPSConnection, RemoteDisconnected
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import authorize
+    import colander
+    from authorize.apis.authorize_api import AuthorizeAPI
+    from authorize.exceptions import (
+        AuthorizeConnectionError, AuthorizeInvalidError, AuthorizeResponseError)
+    from authorize.response_parser import parse_response
+    from authorize.schemas import AIMTransactionSchema
+except ImportError:
+    raise ImproperlyConfigured(
+        "Install the py-authorize package to use Authorize.net payment gateway")
+
+from mezzanine.conf import settings
+
+
+class CircuitOpenError(AuthorizeConnectionError):
+    """
+    Raised instead of calling the gateway while the circuit breaker is open.
+    """
+
+
+class CircuitBreaker(object):
+    """
+    Stops calling a failing service after `threshold` consecutive connection errors.
+    Calls fail fast for `reset_timeout` seconds, then a single trial call is let
+    through: if the service answers the circuit closes again, otherwise it stays open.
+    Declined transactions are answers too, so they close the circuit like successes.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        with self.lock:
+            if self.opened_at is not None:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError(
+                        "The payment gateway is temporarily unavailable, please try again later")
+                # Let this call through as a trial, others keep failing fast meanwhile
+                self.opened_at = time.monotonic()
+
+        try:
+            result = func(*args, **kwargs)
+        except AuthorizeConnectionError:
+            with self.lock:
+                self.failures += 1
+                if self.failures >= self.threshold:
+                    self.opened_at = time.monotonic()
+            raise
+        except AuthorizeResponseError:
+            self.reset()
+            raise
+
+        self.reset()
+        return result
+
+    def reset(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+
+class PooledAuthorizeAPI(AuthorizeAPI):
+    """
+    py-authorize API client that keeps one HTTP connection alive per thread,
+    bounds every request with a timeout and routes calls through a circuit breaker.
+    """
+
+    def __init__(self, config, timeout=10, breaker=None):
+        super(PooledAuthorizeAPI, self).__init__(config)
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.url = urlsplit(config.environment)
+        self.local = threading.local()
+
+    def get_connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection_class = HTTPSConnection if self.url.scheme == "https" else HTTPConnection
+            connection = connection_class(self.url.hostname, self.url.port, timeout=self.timeout)
+            self.local.connection = connection
+        return connection
+
+    def close(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    def _make_call(self, call):
+        return self.breaker.call(self._send, call)
+
+    def _send(self, call):
+        """
+        POST the XML call and parse the response like AuthorizeAPI._make_call().
+        Network errors, timeouts and 5xx responses raise AuthorizeConnectionError.
+        """
+        body = E.tostring(call)
+        try:
+            status, content = self._post(body)
+        except (OSError, HTTPException) as error:
+            raise AuthorizeConnectionError("Error communicating with Authorize.net: %s" % error)
+        if status >= 500:
+            raise AuthorizeConnectionError("Authorize.net returned HTTP %s" % status)
+
+        try:
+            response_json = parse_response(E.fromstring(content))
+        except E.ParseError:
+            raise AuthorizeConnectionError("Error processing XML request.")
+
+        # Exception handling for transaction response errors.
+        try:
+            error = response_json.transaction_response.errors[0]
+            raise AuthorizeResponseError(error.error_code, error.error_text, response_json)
+        except KeyError:
+            pass
+
+        if response_json.messages[0].result_code != "Ok":
+            error = response_json.messages[0].message
+            raise AuthorizeResponseError(error.code, error.text, response_json)
+
+        return response_json
+
+    def _post(self, body):
+        """
+        Send the request over the kept-alive connection.
+        A connection the server already closed is reopened once; any other error
+        drops the connection so the next call starts from a clean one.
+        """
+        reused = getattr(self.local, "connection", None) is not None
+        try:
+            return self._request(body)
+        except (RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            self.close()
+            if not reused:
+                raise
+            return self._request(body)
+        except Exception:
+            self.close()
+            raise
+
+    def _request(self, body):
+        connection = self.get_connection()
+        connection.request("POST", self.url.path or "/", body, {"Content-Type": "text/xml"})
+        response = connection.getresponse()
+        content = response.read()
+        if response.will_close:
+            self.close()
+        return response.status, content
+
+
+_configure_lock = threading.Lock()
+_configured_with = None
+
+
+def configure():
+    """
+    Configure py-authorize with a PooledAuthorizeAPI, once per process.
+    Later calls are no-ops unless the relevant settings have changed.
+    """
+    global _configured_with
+
+    try:
+        login = settings.AUTHORIZE_NET_LOGIN
+        key = settings.AUTHORIZE_NET_TRANS_KEY
+    except AttributeError:
+        raise ImproperlyConfigured(
+            "You need to define AUTHORIZE_NET_LOGIN and AUTHORIZE_NET_TRANS_KEY in "
+            "your settings module to use the Authorize.net payment processor")
+
+    environment = getattr(settings, "AUTHORIZE_NET_ENVIRONMENT", None)
+    if not environment:
+        environment = authorize.Environment.TEST
+        if not getattr(settings, "AUTHORIZE_NET_TEST_MODE", True):
+            environment = authorize.Environment.PRODUCTION
+    options = (
+        environment, login, key,
+        getattr(settings, "AUTHORIZE_NET_TIMEOUT", 10),
+        getattr(settings, "AUTHORIZE_NET_BREAKER_THRESHOLD", 5),
+        getattr(settings, "AUTHORIZE_NET_BREAKER_RESET_TIMEOUT", 30),
+    )
+
+    if _configured_with == options:
+        return
+    with _configure_lock:
+        if _configured_with != options:
+            authorize.Configuration.configure(environment, login, key)
+            authorize.Configuration.api = PooledAuthorizeAPI(
+                authorize.Configuration.instantiate(), timeout=options[3],
+                breaker=CircuitBreaker(threshold=options[4], reset_timeout=options[5]))
+            _configured_with = options
+
+
+def validate_sale(params):
+    """
+    Check the parameters of a sale with py-authorize's schema without sending it,
+    raising AuthorizeInvalidError for invalid card details like Transaction.sale() would.
+    """
+    try:
+        return AIMTransactionSchema().deserialize(params)
+    except colander.Invalid as error:
+        raise AuthorizeInvalidError(error)
+
+
+def iter_settled_transactions(start, end, page_size=1000):
+    """
+    Yield (transaction_id, amount) pairs for every transaction settled successfully
+    from the `start` to the `end` date inclusive, paging through each settlement batch.
+    Authorize.net limits the date range to 31 days and pages to 1000 transactions.
+    """
+    configure()
+    api = authorize.Configuration.api
+    batches = authorize.Batch.list({
+        "start": start.isoformat(),
+        "end": (end + timedelta(days=1)).isoformat(),
+    }).get("batch_list", [])
+    for batch in batches:
+        page = 1
+        while True:
+            request = api._base_request("getTransactionListRequest")
+            E.SubElement(request, "batchId").text = batch["batch_id"]
+            sorting = E.SubElement(request, "sorting")
+            E.SubElement(sorting, "orderBy").text = "submitTimeUTC"
+            E.SubElement(sorting, "orderDescending").text = "false"
+            paging = E.SubElement(request, "paging")
+            E.SubElement(paging, "limit").text = str(page_size)
+            E.SubElement(paging, "offset").text = str(page)
+            transactions = api._make_call(request).get("transactions", [])
+
+            for transaction in transactions:
+                if transaction["transaction_status"] == "settledSuccessfully":
+                    yield transaction["trans_id"], transaction["settle_amount"]
+            if len(transactions) < page_size:
+                break
+            page += 1
@@ -0,0 +1,129 @@
+from __future__ import absolute_import, unicode_literals
+
+import csv
+import json
+
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from ..models import ReconciliationMismatch, SurveyPurchase
+
+
+def read_settlement_csv(lines, id_column="transaction_id", amount_column="amount"):
+    """
+    Stream (transaction_id, amount) pairs from a settlement report in CSV format.
+    """
+    for row in csv.DictReader(lines):
+        yield row[id_column], parse_amount(row[amount_column])
+
+
+def read_settlement_json(lines, id_column="transaction_id", amount_column="amount"):
+    """
+    Stream (transaction_id, amount) pairs from a settlement report in JSON lines
+    format, one transaction object per line.
+    """
+    for line in lines:
+        if line.strip():
+            row = json.loads(line)
+            yield str(row[id_column]), parse_amount(row[amount_column])
+
+
+def parse_amount(value):
+    try:
+        return Decimal(str(value).strip()).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError("Invalid amount: %r" % value)
+
+
+class Reconciler(object):
+    """
+    Matches settled transactions against purchases a chunk at a time.
+    Each chunk is held in a dict keyed by transaction ID and matched with a single
+    query, and the mismatches found are written with a single bulk insert. The IDs
+    seen in earlier chunks are kept in a set, to find duplicates across chunks and
+    purchases that never settled.
+    """
+    # Only charges go through the gateway, unlike complimentary and purchase code purchases
+    payment_method = "Authorize.Net"
+
+    def __init__(self, source="", chunk_size=5000):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.counts = Counter()
+        self.settled_ids = set()
+
+    def get_purchases(self):
+        return SurveyPurchase.objects.paid().filter(
+            payment_method=self.payment_method).exclude(transaction_id="")
+
+    def reconcile(self, transactions):
+        """
+        Match an iterable of (transaction_id, amount) pairs.
+        """
+        transactions = iter(transactions)
+        while True:
+            chunk = list(islice(transactions, self.chunk_size))
+            if not chunk:
+                break
+            self.match(chunk)
+        return self.counts
+
+    def match(self, chunk):
+        settled, mismatches = {}, []
+        for transaction_id, amount in chunk:
+            if transaction_id in settled or transaction_id in self.settled_ids:
+                # Only the first settlement of a transaction is matched
+                mismatches.append(self.make_mismatch(
+                    ReconciliationMismatch.DUPLICATE_SETTLEMENT, transaction_id,
+                    settled_amount=amount))
+            else:
+                settled[transaction_id] = amount
+        self.settled_ids.update(settled)
+        self.counts["transactions"] += len(chunk)
+
+        purchases = self.get_purchases().filter(transaction_id__in=list(settled))
+        for pk, transaction_id, amount in purchases.values_list("pk", "transaction_id", "amount"):
+            settled_amount = settled.pop(transaction_id, None)
+            if settled_amount is None:
+                continue  # Several purchases share this transaction, the first one matched
+            self.counts["matched"] += 1
+            if settled_amount != amount:
+                mismatches.append(self.make_mismatch(
+                    ReconciliationMismatch.AMOUNT_MISMATCH, transaction_id, purchase_id=pk,
+                    expected_amount=amount, settled_amount=settled_amount))
+
+        # Whatever is left in the chunk wasn't claimed by any purchase
+        for transaction_id, settled_amount in settled.items():
+            mismatches.append(self.make_mismatch(
+                ReconciliationMismatch.MISSING_PURCHASE, transaction_id,
+                settled_amount=settled_amount))
+        self.save(mismatches)
+
+    def find_unsettled(self, purchases=None):
+        """
+        Record paid purchases that never showed up in the settlement data.
+        """
+        if purchases is None:
+            purchases = self.get_purchases()
+        values = purchases.values_list("pk", "transaction_id", "amount")
+        mismatches = []
+        for pk, transaction_id, amount in values.iterator(chunk_size=self.chunk_size):
+            if transaction_id not in self.settled_ids:
+                mismatches.append(self.make_mismatch(
+                    ReconciliationMismatch.MISSING_SETTLEMENT, transaction_id, purchase_id=pk,
+                    expected_amount=amount))
+                if len(mismatches) >= self.chunk_size:
+                    self.save(mismatches)
+                    mismatches = []
+        self.save(mismatches)
+        return self.counts
+
+    def make_mismatch(self, reason, transaction_id, **kwargs):
+        self.counts[reason] += 1
+        return ReconciliationMismatch(
+            reason=reason, transaction_id=transaction_id, source=self.source, **kwargs)
+
+    def save(self, mismatches):
+        if mismatches:
+            ReconciliationMismatch.objects.bulk_create(mismatches, batch_size=self.chunk_size)
@@ -0,0 +1,117 @@
+from __future__ import absolute_import, unicode_literals
+
+import gzip
+import json
+import os
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from .models import SurveyPurchase, SurveyResponse, QuestionResponse
+
+
+def get_column_names(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+class ResponsePurger(object):
+    """
+    Archives and deletes the responses of purchases whose report and responses all
+    predate `cutoff`, in keyset-paginated batches.
+
+    Purchases are frozen first: their report is generated or brought up to date and
+    marked as archived, so it's never regenerated from the partial set of responses that
+    remain while they're deleted. Each batch of responses is then written to a
+    gzipped JSON lines file in `archive_dir` before it's deleted.
+    Both steps only pick up work that's left to do, so an interrupted purge can be
+    resumed by running it again.
+    """
+
+    def __init__(self, cutoff, archive_dir, batch_size=1000, sleep=0):
+        self.cutoff = cutoff
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self.sleep = sleep
+        self.counts = {"purchases": 0, "responses": 0, "files": 0}
+
+    def purge(self):
+        self.freeze_purchases()
+        self.archive_responses()
+        return self.counts
+
+    def freeze_purchases(self):
+        """
+        Mark eligible purchases as archived, generating missing or stale reports first.
+        """
+        last_pk = 0
+        while True:
+            purchases = list(SurveyPurchase.objects.archivable(self.cutoff).filter(
+                pk__gt=last_pk).order_by("pk").annotate(
+                last_response=Max("responses__created"))[:self.batch_size])
+            if not purchases:
+                break
+            last_pk = purchases[-1].pk
+            for purchase in purchases:
+                if purchase.report_generated is None or (
+                        purchase.last_response and purchase.last_response > purchase.report_generated):
+                    purchase.generate_report()
+            # Purchases that got responses after their report are left for the next run
+            self.counts["purchases"] += SurveyPurchase.objects.filter(
+                pk__in=[purchase.pk for purchase in purchases], responses_archived__isnull=True,
+            ).exclude(responses__created__gt=F("report_generated")).update(
+                responses_archived=timezone.now())
+            self.pause()
+
+    def archive_responses(self):
+        last_pk = 0
+        queryset = SurveyResponse.objects.filter(
+            purchase__responses_archived__isnull=False).order_by("pk")
+        while True:
+            responses = list(queryset.filter(pk__gt=last_pk).values(
+                *get_column_names(SurveyResponse))[:self.batch_size])
+            if not responses:
+                break
+            last_pk = responses[-1]["id"]
+            self.write_batch(responses)
+            self.delete_batch(responses)
+            self.pause()
+
+    def write_batch(self, responses):
+        """
+        Write the responses with their answers to a file named after their first and
+        last IDs. The file is only moved into place once it's complete.
+        """
+        answers = {response["id"]: [] for response in responses}
+        values = QuestionResponse.objects.filter(response__in=list(answers)).order_by(
+            "pk").values(*get_column_names(QuestionResponse))
+        for answer in values.iterator():
+            answers[answer["response_id"]].append(answer)
+
+        filename = os.path.join(self.archive_dir, "survey-responses-%d-%d.jsonl.gz" % (
+            responses[0]["id"], responses[-1]["id"]))
+        with gzip.open(filename + ".tmp", "wt", encoding="utf-8") as output:
+            for response in responses:
+                response["answers"] = answers[response["id"]]
+                output.write(json.dumps(response, cls=DjangoJSONEncoder))
+                output.write("\n")
+        os.replace(filename + ".tmp", filename)
+        self.counts["files"] += 1
+
+    def delete_batch(self, responses):
+        ids = [response["id"] for response in responses]
+        with transaction.atomic():
+            counts = SurveyResponse.objects.filter(pk__in=ids).values(
+                "purchase").annotate(count=Count("pk")).order_by()
+            for row in counts:
+                SurveyPurchase.objects.filter(pk=row["purchase"]).update(
+                    archived_response_count=F("archived_response_count") + row["count"])
+                self.counts["responses"] += row["count"]
+            # Answers are removed by the same cascade, in one query per batch
+            SurveyResponse.objects.filter(pk__in=ids).delete()
+
+    def pause(self):
+        if self.sleep:
+            time.sleep(self.sleep)
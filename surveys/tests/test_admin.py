@@ -0,0 +1,103 @@
+from __future__ import absolute_import, unicode_literals
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from django_dynamic_fixture import get
+
+from mezzanine.utils.urls import admin_url
+
+from surveys.models import (
+    SurveyPage, SurveyPurchase, SurveyPurchaseCode, SurveyResponse, Category, Subcategory,
+    Question)
+
+
+class LinkedAdminTestCase(TestCase):
+    """
+    Test the linked admin pages run the same queries regardless of the number of rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super(LinkedAdminTestCase, cls).setUpTestData()
+        cls.USER = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        cls.SURVEY = SurveyPage.objects.create(cost=10, max_rating=4)
+        cls.CATEGORY = Category.objects.create(survey=cls.SURVEY, title="Category")
+
+    def setUp(self):
+        self.client.force_login(self.USER)
+
+    def add_subcategories(self, count):
+        for i in range(count):
+            subcategory = Subcategory.objects.create(category=self.CATEGORY, title="Sub %s" % i)
+            get(Question, subcategory=subcategory, prompt="Question %s" % i)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_category_admin(self):
+        url = admin_url(Category, "change", self.CATEGORY.pk)
+        self.add_subcategories(2)
+        self.assertContains(self.client.get(url), "1 Questions", count=2)
+        queries = self.count_queries(url)
+
+        self.add_subcategories(5)
+        self.assertEqual(self.count_queries(url), queries)
+        self.assertContains(self.client.get(url), "1 Questions", count=7)
+
+    def test_purchase_changelist(self):
+        url = admin_url(SurveyPurchase, "changelist")
+        purchases = [
+            get(SurveyPurchase, survey=self.SURVEY, purchaser=self.USER, report_generated=None)
+            for i in range(2)]
+        get(SurveyResponse, purchase=purchases[0])
+        queries = self.count_queries(url)
+
+        for i in range(5):
+            get(SurveyPurchase, survey=self.SURVEY, purchaser=get(User), report_generated=None)
+        self.assertEqual(self.count_queries(url), queries)
+        response = self.client.get(url)
+        self.assertEqual(response.context_data["cl"].result_count, 7)
+        self.assertEqual(
+            sorted(purchase.response_count for purchase in response.context_data["cl"].result_list),
+            [0, 0, 0, 0, 0, 0, 1])
+
+        # Archived responses count towards the ordering
+        SurveyPurchase.objects.filter(pk=purchases[1].pk).update(archived_response_count=5)
+        response = self.client.get(url, {"o": "-7"})
+        self.assertEqual(
+            [purchase.pk for purchase in response.context_data["cl"].result_list[:2]],
+            [purchases[1].pk, purchases[0].pk])
+
+    def test_clone_survey(self):
+        self.add_subcategories(2)
+        url = reverse("admin:surveys_surveypage_clone", args=[self.SURVEY.pk])
+        self.assertContains(self.client.get(url), self.SURVEY.title)
+
+        response = self.client.post(url)
+        clone = SurveyPage.objects.exclude(pk=self.SURVEY.pk).get()
+        self.assertRedirects(
+            response, admin_url(SurveyPage, "change", clone.pk), fetch_redirect_response=False)
+        self.assertEqual(clone.get_questions().count(), 2)
+
+    def test_generate_purchase_codes(self):
+        url = reverse("admin:surveys_surveypage_purchase_codes", args=[self.SURVEY.pk])
+        self.assertContains(self.client.get(url), self.SURVEY.title)
+        response = self.client.post(url, {"count": 0, "uses_remaining": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context_data["form"].errors)
+
+        # The codes are streamed back as CSV
+        response = self.client.post(url, {"count": 3, "uses_remaining": 2})
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual(rows[0], "code,uses_remaining")
+        codes = SurveyPurchaseCode.objects.filter(survey=self.SURVEY, uses_remaining=2)
+        self.assertEqual(
+            sorted(rows[1:]), sorted("%s,2" % code for code in codes.values_list("code", flat=True)))
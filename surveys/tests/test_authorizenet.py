@@ -1,13 +1,15 @@
 from __future__ import absolute_import, unicode_literals
 
+from datetime import timedelta
+
 from django.test import override_settings
 
 from unittest import skipUnless
 
 try:
-    from unittest.mock import patch
+    from unittest.mock import Mock, patch
 except ImportError:
-    from mock import patch
+    from mock import Mock, patch
 
 try:
     import authorize  # noqa
@@ -17,6 +19,7 @@ except ImportError:
 
 from . import test_views
 from surveys.models import SurveyPage, SurveyPurchase
+from surveys.views import SurveyPurchaseStatus
 
 
 @skipUnless(AUTHORIZENET_INSTALLED, "py-authorize not installed")
@@ -76,3 +79,107 @@ class AuthorizenetTestCase(test_views.SurveyPurchaseCreateTestCase):
         self.assertEqual(purchase.payment_method, "Complimentary")
         self.assertEqual(purchase.transaction_id, "Complimentary")
         self.assertEqual(purchase.amount, 0)
+
+    @override_settings(AUTHORIZE_NET_DEFERRED_CAPTURE=True)
+    @patch("surveys.payments.authorizenet.deferred.get_executor")
+    @patch("surveys.payments.authorizenet.authorize")
+    def test_deferred_payment(self, authorize_mock, executor_mock):
+        """
+        Test deferred payments save a pending purchase and queue the charge on commit.
+        """
+        data = {"card_number": "4111111111111111", "card_expiry": "12/35", "card_ccv": "123"}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(self.view, slug=self.SURVEY.slug, user=self.USER, data=data)
+        purchase = SurveyPurchase.objects.get()
+        self.assertEqual(response["location"], purchase.get_status_url())
+        self.assertEqual(purchase.payment_status, SurveyPurchase.PAYMENT_PENDING)
+        self.assertEqual(purchase.amount, self.SURVEY.cost)
+
+        # The card is charged by the worker, not during the request
+        authorize_mock.Transaction.sale.assert_not_called()
+        submit = executor_mock.return_value.submit
+        submit.assert_called_once()
+        params = submit.call_args[0][2]
+        self.assertEqual(params["order"]["invoice_number"], purchase.public_id.hex[:20])
+
+    @override_settings(AUTHORIZE_NET_DEFERRED_CAPTURE=True)
+    @patch("surveys.payments.authorizenet.deferred.get_executor")
+    def test_deferred_payment_invalid_card(self, executor_mock):
+        """
+        Test invalid card details are rejected before a deferred payment is queued.
+        """
+        data = {"card_number": "4111111111111112", "card_expiry": "12/35", "card_ccv": "123"}
+        response = self.post(self.view, slug=self.SURVEY.slug, user=self.USER, data=data)
+        self.assertTrue(response.context_data["form"].errors)
+        self.assertEqual(SurveyPurchase.objects.count(), 0)
+        executor_mock.return_value.submit.assert_not_called()
+
+
+@skipUnless(AUTHORIZENET_INSTALLED, "py-authorize not installed")
+@override_settings(AUTHORIZE_NET_CAPTURE_BACKOFF=0)
+class DeferredCaptureTestCase(test_views.SurveyPageTestCase):
+    """
+    Test pending purchases are charged and updated by the background worker.
+    """
+
+    def setUp(self):
+        super(DeferredCaptureTestCase, self).setUp()
+        from surveys.payments import deferred
+        self.deferred = deferred
+        self.purchase = SurveyPurchase.objects.create(
+            survey=self.SURVEY, purchaser=self.USER, amount=10,
+            payment_status=SurveyPurchase.PAYMENT_PENDING)
+
+    def capture(self, sale_mock):
+        with patch.object(self.deferred.authorize.Transaction, "sale", sale_mock):
+            self.deferred.capture(self.purchase.pk, {})
+        self.purchase.refresh_from_db()
+
+    def test_capture(self):
+        """
+        Test a successful charge marks the purchase as paid.
+        """
+        sale_mock = Mock(return_value={"transaction_response": {"trans_id": "1234"}})
+        self.capture(sale_mock)
+        self.assertEqual(self.purchase.payment_status, SurveyPurchase.PAYMENT_PAID)
+        self.assertEqual(self.purchase.transaction_id, "1234")
+
+    def test_capture_retries(self):
+        """
+        Test connection errors are retried and a duplicate response counts as paid.
+        """
+        exceptions = self.deferred.authorize.exceptions
+        sale_mock = Mock(side_effect=[
+            exceptions.AuthorizeConnectionError("Timed out"),
+            exceptions.AuthorizeResponseError(
+                "11", "Duplicate", {"transaction_response": {"trans_id": "1234"}}),
+        ])
+        self.capture(sale_mock)
+        self.assertEqual(sale_mock.call_count, 2)
+        self.assertEqual(self.purchase.payment_status, SurveyPurchase.PAYMENT_PAID)
+        self.assertEqual(self.purchase.transaction_id, "1234")
+
+    def test_capture_after_timeout(self):
+        """
+        Test purchases left pending by a lost charge fail, unless the charge comes through.
+        """
+        SurveyPurchase.objects.filter(pk=self.purchase.pk).update(
+            updated=self.purchase.updated - timedelta(hours=1))
+        response = self.assert200(
+            SurveyPurchaseStatus, public_id=str(self.purchase.public_id), user=self.USER)
+        self.assertEqual(
+            response.context_data["purchase"].payment_status, SurveyPurchase.PAYMENT_FAILED)
+
+        self.capture(Mock(return_value={"transaction_response": {"trans_id": "1234"}}))
+        self.assertEqual(self.purchase.payment_status, SurveyPurchase.PAYMENT_PAID)
+
+    def test_capture_failed(self):
+        """
+        Test declined charges mark the purchase as failed and keep the error.
+        """
+        exceptions = self.deferred.authorize.exceptions
+        sale_mock = Mock(side_effect=exceptions.AuthorizeResponseError("2", "Declined", {}))
+        self.capture(sale_mock)
+        self.assertEqual(sale_mock.call_count, 1)
+        self.assertEqual(self.purchase.payment_status, SurveyPurchase.PAYMENT_FAILED)
+        self.assertEqual(self.purchase.payment_error, "2: Declined")
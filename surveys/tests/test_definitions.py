@@ -0,0 +1,91 @@
+from __future__ import absolute_import, unicode_literals
+
+import io
+
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from mezzanine.core.models import CONTENT_STATUS_DRAFT
+
+from surveys.definitions import (
+    export_survey, import_survey, read_csv, read_json_lines, write_csv, write_json_lines)
+from surveys.models import SurveyPage, Category, Subcategory, Question
+
+
+class SurveyDefinitionTestCase(TestCase):
+    """
+    Test survey definitions survive an export and import round trip.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super(SurveyDefinitionTestCase, cls).setUpTestData()
+        cls.SURVEY = SurveyPage.objects.create(
+            title="Wave 1", cost=Decimal("12.50"), max_rating=4, instructions="Be honest")
+        for i in range(2):
+            category = Category.objects.create(
+                survey=cls.SURVEY, title="Category %s" % i, description="Text %s" % i,
+                _order=1 - i)
+            for j in range(3):
+                subcategory = Subcategory.objects.create(
+                    category=category, title="Subcategory %s.%s" % (i, j), description="Text",
+                    _order=j)
+                for k in range(4):
+                    Question.objects.create(
+                        subcategory=subcategory, prompt="Question %s.%s.%s" % (i, j, k),
+                        field_type=Question.TEXT_FIELD if k else Question.RATING_FIELD,
+                        required=bool(k % 2), _order=k)
+
+    def get_tree(self, survey):
+        return (survey.title, survey.cost, survey.max_rating, survey.instructions, [
+            (category.title, category._order, category.description, [
+                (subcategory.title, subcategory._order, list(subcategory.questions.values_list(
+                    "prompt", "field_type", "required", "invert_rating", "_order")))
+                for subcategory in category.subcategories.all()])
+            for category in survey.categories.all()])
+
+    def round_trip(self, write, read):
+        output = io.StringIO()
+        write(export_survey(self.SURVEY), output)
+        output.seek(0)
+        with CaptureQueriesContext(connection) as context:
+            importer = import_survey(read(output), batch_size=10)
+        survey = SurveyPage.objects.get(pk=importer.survey.pk)
+        self.assertNotEqual(survey.pk, self.SURVEY.pk)
+        self.assertEqual(survey.status, CONTENT_STATUS_DRAFT)
+        self.assertEqual(self.get_tree(survey), self.get_tree(self.SURVEY))
+        self.assertEqual(importer.counts["question"], 24)
+        # Search index entries of the new page aren't part of the survey
+        return [q for q in context.captured_queries
+                if q["sql"].startswith("INSERT") and "api_searchentry" not in q["sql"]]
+
+    def test_json(self):
+        inserts = self.round_trip(write_json_lines, read_json_lines)
+        # The page, then one insert per batch of 10 rows for each level
+        self.assertLessEqual(len(inserts), 3 + 1 + 1 + 3)
+
+    def test_csv(self):
+        self.round_trip(write_csv, read_csv)
+
+    def test_invalid(self):
+        records = list(export_survey(self.SURVEY))
+        records[1]["parent"] = 999
+        records[-1]["field_type"] = 5
+        records[-2]["colour"] = "red"
+        records.append({"type": "category", "id": 1, "parent": self.SURVEY.pk})
+        with self.assertRaises(ValidationError) as context:
+            import_survey(records)
+
+        messages = context.exception.messages
+        self.assertEqual(len(messages), 4)
+        self.assertTrue(messages[0].startswith("Line 2: Unknown parent"))
+        self.assertIn("Unknown fields: colour", messages[1])
+        self.assertIn("Line %s:" % len(records[:-1]), messages[2])
+        self.assertIn("out of order", messages[3])
+        # Nothing was saved
+        self.assertEqual(SurveyPage.objects.count(), 1)
+        self.assertEqual(Question.objects.count(), 24)
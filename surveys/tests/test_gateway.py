@@ -0,0 +1,184 @@
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase, override_settings
+
+from unittest import skipUnless
+
+try:
+    import authorize  # noqa
+    AUTHORIZENET_INSTALLED = True
+except ImportError:
+    AUTHORIZENET_INSTALLED = False
+
+SUCCESS_RESPONSE = b"""<?xml version="1.0" encoding="utf-8"?>
+<createTransactionResponse xmlns="AnetApi/xml/v1/schema/AnetApiSchema.xsd">
+  <messages>
+    <resultCode>Ok</resultCode>
+    <message><code>I00001</code><text>Successful.</text></message>
+  </messages>
+  <transactionResponse><responseCode>1</responseCode><transId>1234</transId></transactionResponse>
+</createTransactionResponse>"""
+
+SALE = {
+    "amount": 10,
+    "credit_card": {
+        "card_number": "4111111111111111",
+        "card_code": "123",
+        "expiration_date": "12/35",
+    },
+}
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    """
+    Answers every POST like Authorize.net would, after the configured latency.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        request = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append(self.client_address)
+        time.sleep(self.server.latency)
+
+        body = self.get_body(request) if self.server.status == 200 else b"Service unavailable"
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def get_body(self, request):
+        return SUCCESS_RESPONSE
+
+    def log_message(self, *args):
+        pass
+
+
+class StubGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients hang up on purpose when testing timeouts
+
+
+@skipUnless(AUTHORIZENET_INSTALLED, "py-authorize not installed")
+class GatewayTestCase(SimpleTestCase):
+    """
+    Test the pooled Authorize.net client against a local stub gateway.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(GatewayTestCase, cls).setUpClass()
+        cls.server = StubGatewayServer(("127.0.0.1", 0), StubGatewayHandler)
+        cls.url = "http://127.0.0.1:%s/xml/v1/request.api" % cls.server.server_port
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super(GatewayTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.latency = 0
+        self.server.status = 200
+
+    def get_api(self, **kwargs):
+        from authorize.configuration import Configuration
+        from surveys.payments.gateway import PooledAuthorizeAPI
+        return PooledAuthorizeAPI(Configuration(self.url, "login", "key"), **kwargs)
+
+    def test_keep_alive(self):
+        api = self.get_api()
+        for i in range(3):
+            response = api.transaction.sale(SALE)
+            self.assertEqual(response.transaction_response.trans_id, "1234")
+
+        # All calls went through the same connection
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(set(self.server.requests)), 1)
+
+    def test_timeout(self):
+        from surveys.payments.gateway import AuthorizeConnectionError
+
+        self.server.latency = 1
+        api = self.get_api(timeout=0.2)
+        start = time.monotonic()
+        with self.assertRaises(AuthorizeConnectionError):
+            api.transaction.sale(SALE)
+        self.assertLess(time.monotonic() - start, 1)
+
+        # The client recovers with a fresh connection once the gateway is fast again
+        self.server.latency = 0
+        time.sleep(1)
+        api.transaction.sale(SALE)
+
+    def test_circuit_breaker(self):
+        from surveys.payments.gateway import (
+            AuthorizeConnectionError, CircuitBreaker, CircuitOpenError)
+
+        self.server.status = 503
+        api = self.get_api(breaker=CircuitBreaker(threshold=2, reset_timeout=0.5))
+        for i in range(2):
+            with self.assertRaises(AuthorizeConnectionError):
+                api.transaction.sale(SALE)
+
+        # The circuit is open: calls fail fast without reaching the gateway
+        with self.assertRaises(CircuitOpenError):
+            api.transaction.sale(SALE)
+        self.assertEqual(len(self.server.requests), 2)
+
+        # After the reset timeout a trial call goes through and closes the circuit
+        self.server.status = 200
+        time.sleep(0.5)
+        api.transaction.sale(SALE)
+        api.transaction.sale(SALE)
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_circuit_breaker_declines(self):
+        from surveys.payments.gateway import (
+            AuthorizeConnectionError, AuthorizeResponseError, CircuitBreaker)
+
+        breaker = CircuitBreaker(threshold=1, reset_timeout=0)
+
+        def fail(error):
+            raise error
+
+        with self.assertRaises(AuthorizeConnectionError):
+            breaker.call(fail, AuthorizeConnectionError("Timed out"))
+        self.assertIsNotNone(breaker.opened_at)
+
+        # A declined trial call means the gateway answered, so the circuit closes
+        with self.assertRaises(AuthorizeResponseError):
+            breaker.call(fail, AuthorizeResponseError("2", "Declined", {}))
+        self.assertIsNone(breaker.opened_at)
+        self.assertEqual(breaker.failures, 0)
+
+    def test_validate_sale(self):
+        from surveys.payments.gateway import AuthorizeInvalidError, validate_sale
+
+        validate_sale(SALE)
+        with self.assertRaises(AuthorizeInvalidError):
+            validate_sale(dict(SALE, credit_card=dict(SALE["credit_card"], card_number="1")))
+        with self.assertRaises(AuthorizeInvalidError):
+            validate_sale(dict(SALE, credit_card=dict(SALE["credit_card"], card_code="1")))
+
+    @override_settings(AUTHORIZE_NET_LOGIN="login", AUTHORIZE_NET_TRANS_KEY="key")
+    def test_configure_once(self):
+        from surveys.payments import gateway
+
+        with override_settings(AUTHORIZE_NET_ENVIRONMENT=self.url):
+            gateway.configure()
+            api = authorize.Configuration.api
+            gateway.configure()
+            self.assertIs(authorize.Configuration.api, api)
+            self.assertIsInstance(api, gateway.PooledAuthorizeAPI)
+            authorize.Transaction.sale(SALE)
+            self.assertEqual(len(self.server.requests), 1)
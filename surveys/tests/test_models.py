@@ -1,11 +1,21 @@
 from __future__ import absolute_import, unicode_literals
 
+import csv
+import io
+
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from django_dynamic_fixture import get
 
-from surveys.models import SurveyPage, SurveyPurchase
+from mezzanine.core.models import CONTENT_STATUS_DRAFT
+
+from surveys.models import (
+    SurveyPage, SurveyPurchase, SurveyPurchaseCode, Category, Subcategory, Question)
 
 
 class BaseSurveyPageTest(TestCase):
@@ -20,6 +30,46 @@ class BaseSurveyPageTest(TestCase):
         cls.SURVEY = SurveyPage.objects.create(cost=10, max_rating=4)
 
 
+class SurveyPageTestCase(BaseSurveyPageTest):
+
+    def test_clone(self):
+        for i in range(2):
+            category = Category.objects.create(
+                survey=self.SURVEY, title="Category %s" % i, _order=1 - i,
+                description="Description %s" % i)
+            for j in range(3):
+                subcategory = Subcategory.objects.create(
+                    category=category, title="Subcategory %s.%s" % (i, j), _order=j)
+                for k in range(4):
+                    Question.objects.create(
+                        subcategory=subcategory, prompt="Question %s.%s.%s" % (i, j, k),
+                        field_type=Question.RATING_FIELD, _order=k)
+
+        # One insert for the page and one per level of the tree
+        with CaptureQueriesContext(connection) as context:
+            clone = self.SURVEY.clone()
+        inserts = [q for q in context.captured_queries
+                   if q["sql"].startswith("INSERT") and "api_searchentry" not in q["sql"]]
+        self.assertLessEqual(len(inserts), 5)
+
+        self.assertNotEqual(clone.pk, self.SURVEY.pk)
+        self.assertNotEqual(clone.slug, self.SURVEY.slug)
+        self.assertEqual(clone.status, CONTENT_STATUS_DRAFT)
+        self.assertEqual(clone.cost, self.SURVEY.cost)
+        self.assertEqual(clone.get_questions().count(), 24)
+        self.assertEqual(self.SURVEY.get_questions().count(), 24)
+
+        def get_tree(survey):
+            return [
+                (category.title, category._order, category.description, [
+                    (subcategory.title, subcategory._order,
+                     list(subcategory.questions.values_list("prompt", "_order")))
+                    for subcategory in category.subcategories.all()])
+                for category in survey.categories.all()]
+        self.assertEqual(get_tree(clone), get_tree(self.SURVEY))
+        self.assertEqual(get_tree(clone)[0][2], "Description 1")
+
+
 class SurveyPurchaseTestCase(BaseSurveyPageTest):
 
     def test_manager(self):
@@ -48,3 +98,53 @@ class SurveyPurchaseTestCase(BaseSurveyPageTest):
         self.assertEqual(SurveyPurchase.objects.closed().count(), 1)
         self.assertEqual(self.USER.survey_purchases.open().count(), 2)
         self.assertEqual(self.USER.survey_purchases.closed()[0], purchases[0])
+
+
+class SurveyPurchaseCodeTestCase(BaseSurveyPageTest):
+
+    def test_redeem(self):
+        code = get(SurveyPurchaseCode, survey=self.SURVEY, uses_remaining=2)
+        codes = self.SURVEY.purchase_codes
+
+        # Each redemption uses up one use until the code is depleted
+        self.assertTrue(codes.redeem(code.code))
+        self.assertTrue(codes.redeem(code.code))
+        self.assertFalse(codes.redeem(code.code))
+        code.refresh_from_db()
+        self.assertEqual(code.uses_remaining, 0)
+
+        # Unknown codes and codes for other surveys are rejected
+        self.assertFalse(codes.redeem("invalid"))
+        other_survey = SurveyPage.objects.create()
+        self.assertFalse(other_survey.purchase_codes.redeem(code.code))
+
+    def test_generate(self):
+        existing = get(SurveyPurchaseCode, survey=self.SURVEY, uses_remaining=1)
+
+        codes = SurveyPurchaseCode.objects.generate(self.SURVEY, 250, uses_remaining=3,
+                                                    batch_size=100)
+
+        # All codes are unique, stored, and don't clash with the existing one
+        self.assertEqual(len(set(codes)), 250)
+        self.assertNotIn(existing.code, codes)
+        generated = SurveyPurchaseCode.objects.exclude(pk=existing.pk)
+        self.assertEqual(generated.count(), 250)
+        self.assertEqual(set(generated.values_list("code", flat=True)), set(codes))
+        self.assertFalse(generated.exclude(uses_remaining=3).exists())
+
+    def test_generate_command(self):
+        output = io.StringIO()
+        call_command("generate_purchase_codes", self.SURVEY.pk, 3, uses=2, stdout=output)
+
+        # The generated codes are written out as CSV with their uses
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(rows[0], ["code", "uses_remaining"])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(
+            set(row[0] for row in rows[1:]),
+            set(self.SURVEY.purchase_codes.filter(uses_remaining=2).values_list("code", flat=True)))
+
+        with self.assertRaises(CommandError):
+            call_command("generate_purchase_codes", self.SURVEY.pk, 0, stdout=output)
+        with self.assertRaises(CommandError):
+            call_command("generate_purchase_codes", 0, 3, stdout=output)
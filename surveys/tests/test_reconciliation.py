@@ -0,0 +1,198 @@
+from __future__ import absolute_import, unicode_literals
+
+import io
+import os
+import re
+import tempfile
+import threading
+
+from datetime import date
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils.timezone import localdate
+
+from unittest import skipUnless
+
+from . import test_gateway, test_views
+from surveys.models import ReconciliationMismatch, SurveyPurchase
+from surveys.payments.reconciliation import (
+    Reconciler, read_settlement_csv, read_settlement_json)
+
+SETTLEMENT_CSV = """transaction_id,amount
+1001,10.00
+1002,12.50
+1003,10.00
+1001,10.00
+"""
+
+
+class ReconciliationTestCase(test_views.SurveyPageTestCase):
+    """
+    Test purchases are matched against settlement data in bulk.
+    """
+
+    def setUp(self):
+        super(ReconciliationTestCase, self).setUp()
+        for transaction_id in ["1001", "1002", "1004"]:
+            SurveyPurchase.objects.create(
+                survey=self.SURVEY, purchaser=self.USER, amount=10,
+                transaction_id=transaction_id, payment_method="Authorize.Net")
+
+    def get_mismatches(self):
+        return dict(ReconciliationMismatch.objects.values_list("transaction_id", "reason"))
+
+    def test_reconcile(self):
+        reconciler = Reconciler(chunk_size=2)
+
+        # One query to match and one to insert mismatches per chunk
+        with self.assertNumQueries(4):
+            reconciler.reconcile(read_settlement_csv(io.StringIO(SETTLEMENT_CSV)))
+        reconciler.find_unsettled()
+
+        self.assertEqual(reconciler.counts["transactions"], 4)
+        self.assertEqual(reconciler.counts["matched"], 2)
+        self.assertEqual(self.get_mismatches(), {
+            "1001": ReconciliationMismatch.DUPLICATE_SETTLEMENT,
+            "1002": ReconciliationMismatch.AMOUNT_MISMATCH,
+            "1003": ReconciliationMismatch.MISSING_PURCHASE,
+            "1004": ReconciliationMismatch.MISSING_SETTLEMENT,
+        })
+        mismatch = ReconciliationMismatch.objects.get(transaction_id="1002")
+        self.assertEqual(mismatch.purchase.transaction_id, "1002")
+        self.assertEqual(mismatch.expected_amount, 10)
+        self.assertEqual(mismatch.settled_amount, Decimal("12.50"))
+
+    def test_duplicates(self):
+        reconciler = Reconciler(chunk_size=2)
+        reconciler.reconcile([
+            ("1001", Decimal("10.00")), ("1002", Decimal("10.00")),
+            ("1004", Decimal("10.00")), ("1004", Decimal("12.50")),
+            ("1001", Decimal("10.00")),
+        ])
+        reconciler.find_unsettled()
+
+        # Only the first settlement of a transaction is matched, in the same chunk or a later one
+        self.assertEqual(reconciler.counts["transactions"], 5)
+        self.assertEqual(reconciler.counts["matched"], 3)
+        self.assertEqual(reconciler.counts[ReconciliationMismatch.DUPLICATE_SETTLEMENT], 2)
+        self.assertEqual(self.get_mismatches(), {
+            "1001": ReconciliationMismatch.DUPLICATE_SETTLEMENT,
+            "1004": ReconciliationMismatch.DUPLICATE_SETTLEMENT,
+        })
+        self.assertEqual(
+            ReconciliationMismatch.objects.get(transaction_id="1004").settled_amount, Decimal("12.50"))
+
+    def test_read_json(self):
+        lines = io.StringIO('{"id": 1001, "total": "10"}\n\n{"id": 1002, "total": 12.5}\n')
+        self.assertEqual(
+            list(read_settlement_json(lines, id_column="id", amount_column="total")),
+            [("1001", Decimal("10.00")), ("1002", Decimal("12.50"))])
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as settlement:
+            settlement.write(SETTLEMENT_CSV)
+        self.addCleanup(os.remove, settlement.name)
+
+        output = io.StringIO()
+        call_command("reconcile_payments", settlement.name, stdout=output)
+        self.assertIn("Reconciled 4 transactions", output.getvalue())
+        self.assertIn("Settled more than once: 1", output.getvalue())
+        # Without a settlement period, unsettled purchases can't be detected
+        self.assertEqual(self.get_mismatches(), {
+            "1001": ReconciliationMismatch.DUPLICATE_SETTLEMENT,
+            "1002": ReconciliationMismatch.AMOUNT_MISMATCH,
+            "1003": ReconciliationMismatch.MISSING_PURCHASE,
+        })
+        self.assertEqual(
+            set(ReconciliationMismatch.objects.values_list("source", flat=True)),
+            {settlement.name})
+
+    def test_command_period(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as settlement:
+            settlement.write(SETTLEMENT_CSV)
+        self.addCleanup(os.remove, settlement.name)
+        # Purchases that weren't charged through the gateway are never settled
+        SurveyPurchase.objects.create(
+            survey=self.SURVEY, purchaser=self.USER, amount=0,
+            transaction_id="Complimentary", payment_method="Complimentary")
+        SurveyPurchase.objects.create(
+            survey=self.SURVEY, purchaser=self.USER, amount=0,
+            transaction_id="CODE1234", payment_method="Purchase Code")
+
+        today = localdate().isoformat()
+        call_command(
+            "reconcile_payments", settlement.name, start=today, end=today, stdout=io.StringIO())
+        self.assertEqual(self.get_mismatches(), {
+            "1001": ReconciliationMismatch.DUPLICATE_SETTLEMENT,
+            "1002": ReconciliationMismatch.AMOUNT_MISMATCH,
+            "1003": ReconciliationMismatch.MISSING_PURCHASE,
+            "1004": ReconciliationMismatch.MISSING_SETTLEMENT,
+        })
+
+
+class SettlementHandler(test_gateway.StubGatewayHandler):
+    """
+    Serves one settled batch of transactions, a page at a time.
+    """
+
+    def get_body(self, request):
+        if b"getSettledBatchListRequest" in request:
+            return SETTLED_BATCHES
+        limit, offset = [
+            int(re.search(tag + rb">(\d+)<", request).group(1)) for tag in [b"limit", b"offset"]]
+        page = self.server.transactions[(offset - 1) * limit:offset * limit]
+        transactions = b"".join(
+            b"<transaction><transId>%s</transId>"
+            b"<transactionStatus>settledSuccessfully</transactionStatus>"
+            b"<settleAmount>%s</settleAmount></transaction>" % row for row in page)
+        return TRANSACTION_LIST % transactions
+
+
+SETTLED_BATCHES = b"""<?xml version="1.0" encoding="utf-8"?>
+<getSettledBatchListResponse xmlns="AnetApi/xml/v1/schema/AnetApiSchema.xsd">
+  <messages><resultCode>Ok</resultCode></messages>
+  <batchList><batch><batchId>1</batchId></batch></batchList>
+</getSettledBatchListResponse>"""
+
+TRANSACTION_LIST = b"""<?xml version="1.0" encoding="utf-8"?>
+<getTransactionListResponse xmlns="AnetApi/xml/v1/schema/AnetApiSchema.xsd">
+  <messages><resultCode>Ok</resultCode></messages>
+  <transactions>%s</transactions>
+</getTransactionListResponse>"""
+
+
+@skipUnless(test_gateway.AUTHORIZENET_INSTALLED, "py-authorize not installed")
+@override_settings(AUTHORIZE_NET_LOGIN="login", AUTHORIZE_NET_TRANS_KEY="key")
+class GatewaySettlementTestCase(SimpleTestCase):
+    """
+    Test settled transactions are paged through from the gateway.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(GatewaySettlementTestCase, cls).setUpClass()
+        cls.server = test_gateway.StubGatewayServer(("127.0.0.1", 0), SettlementHandler)
+        cls.server.requests = []
+        cls.server.latency = 0
+        cls.server.status = 200
+        cls.server.transactions = [(b"%d" % i, b"10.00") for i in range(5)]
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super(GatewaySettlementTestCase, cls).tearDownClass()
+
+    def test_iter_settled_transactions(self):
+        from surveys.payments.gateway import iter_settled_transactions
+
+        url = "http://127.0.0.1:%s/xml/v1/request.api" % self.server.server_port
+        with override_settings(AUTHORIZE_NET_ENVIRONMENT=url):
+            transactions = list(iter_settled_transactions(
+                date(2020, 1, 1), date(2020, 1, 31), page_size=2))
+        self.assertEqual(transactions, [(str(i), "10.00") for i in range(5)])
+        # One batch list request and three pages of transactions
+        self.assertEqual(len(self.server.requests), 4)
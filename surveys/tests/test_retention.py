@@ -0,0 +1,126 @@
+from __future__ import absolute_import, unicode_literals
+
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils.timezone import now
+
+from . import test_views
+from surveys.models import (
+    Category, Question, QuestionResponse, Subcategory, SurveyPurchase, SurveyResponse)
+from surveys.retention import ResponsePurger
+from surveys.views import SurveyResponseCreate
+
+
+class ResponsePurgerTestCase(test_views.SurveyPageTestCase):
+    """
+    Test old responses are archived and deleted while their reports are kept.
+    """
+
+    def setUp(self):
+        super(ResponsePurgerTestCase, self).setUp()
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        category = Category.objects.create(survey=self.SURVEY, title="Category")
+        subcategory = Subcategory.objects.create(category=category, title="Subcategory")
+        self.question = Question.objects.create(
+            subcategory=subcategory, prompt="Question", field_type=Question.RATING_FIELD)
+        self.cutoff = now() - timedelta(days=30)
+        self.old = self.create_purchase(ratings=[1, 2, 3], age=60)
+        self.recent = self.create_purchase(ratings=[4], age=1)
+
+    def create_purchase(self, ratings, age):
+        purchase = SurveyPurchase.objects.create(
+            survey=self.SURVEY, purchaser=self.USER, amount=10, transaction_id="1",
+            payment_method="Authorize.Net")
+        for rating in ratings:
+            response = SurveyResponse.objects.create(purchase=purchase)
+            QuestionResponse.objects.create(
+                response=response, question=self.question, rating=rating)
+        purchase.generate_report()
+        created = now() - timedelta(days=age)
+        SurveyResponse.objects.filter(purchase=purchase).update(created=created)
+        SurveyPurchase.objects.filter(pk=purchase.pk).update(report_generated=created)
+        purchase.refresh_from_db()
+        return purchase
+
+    def read_archive(self):
+        records = []
+        for filename in sorted(os.listdir(self.archive_dir)):
+            with gzip.open(os.path.join(self.archive_dir, filename), "rt") as lines:
+                records.extend(json.loads(line) for line in lines)
+        return records
+
+    def test_purge(self):
+        report = self.old.get_report_as_json()
+        counts = ResponsePurger(self.cutoff, self.archive_dir, batch_size=2).purge()
+        self.assertEqual(counts, {"purchases": 1, "responses": 3, "files": 2})
+
+        records = self.read_archive()
+        self.assertEqual(len(records), 3)
+        self.assertEqual({record["purchase_id"] for record in records}, {self.old.pk})
+        self.assertEqual(
+            sorted(record["answers"][0]["rating"] for record in records), [1, 2, 3])
+
+        self.assertFalse(SurveyResponse.objects.filter(purchase=self.old).exists())
+        self.assertFalse(QuestionResponse.objects.filter(response__purchase=self.old).exists())
+        self.assertEqual(SurveyResponse.objects.filter(purchase=self.recent).count(), 1)
+
+        # The report can't be regenerated from deleted responses, so the cache is kept
+        self.old.refresh_from_db()
+        self.assertIsNotNone(self.old.responses_archived)
+        self.assertEqual(self.old.get_response_count(), 3)
+        self.assertEqual(self.old.generate_report(), report)
+        self.assertEqual(report["rating"]["count"], 3)
+
+        # Running it again has nothing left to do
+        counts = ResponsePurger(self.cutoff, self.archive_dir).purge()
+        self.assertEqual(counts, {"purchases": 0, "responses": 0, "files": 0})
+
+    def test_stale_report(self):
+        # A response added after the report was generated is included before archiving
+        response = SurveyResponse.objects.create(purchase=self.old)
+        QuestionResponse.objects.create(response=response, question=self.question, rating=4)
+        SurveyResponse.objects.filter(pk=response.pk).update(
+            created=self.cutoff - timedelta(days=1))
+
+        ResponsePurger(self.cutoff, self.archive_dir).purge()
+        self.old.refresh_from_db()
+        self.assertEqual(self.old.get_report_as_json()["rating"]["count"], 4)
+        self.assertEqual(self.old.archived_response_count, 4)
+
+    def test_purchase_without_report(self):
+        # Old responses are archived even if their report was never generated
+        SurveyPurchase.objects.filter(pk=self.old.pk).update(
+            report_generated=None, report_cache="[]", created=self.cutoff - timedelta(days=60))
+        unused = SurveyPurchase.objects.create(
+            survey=self.SURVEY, purchaser=self.USER, amount=10, transaction_id="2",
+            payment_method="Authorize.Net")
+        SurveyPurchase.objects.filter(pk=unused.pk).update(created=self.cutoff - timedelta(days=60))
+
+        counts = ResponsePurger(self.cutoff, self.archive_dir).purge()
+        self.assertEqual(counts["responses"], 3)
+        self.old.refresh_from_db()
+        self.assertIsNotNone(self.old.report_generated)
+        self.assertEqual(self.old.get_report_as_json()["rating"]["count"], 3)
+        # Purchases without responses are left open
+        unused.refresh_from_db()
+        self.assertIsNone(unused.responses_archived)
+
+    def test_archived_survey_closed(self):
+        ResponsePurger(self.cutoff, self.archive_dir).purge()
+        self.assert404(SurveyResponseCreate, public_id=self.old.public_id)
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command(
+            "purge_responses", before=self.cutoff.date().isoformat(),
+            archive_dir=self.archive_dir, sleep=0, stdout=output)
+        self.assertIn("Archived 1 purchases and 3 responses to 1 files", output.getvalue())
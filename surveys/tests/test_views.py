@@ -15,8 +15,8 @@ from surveys.models import (
     SurveyPage, SurveyPurchase, SurveyPurchaseCode, SurveyResponse, Category, Subcategory,
     Question, QuestionResponse)
 from surveys.views import (
-    SurveyPurchaseCreate, SurveyPurchaseDetail, SurveyResponseCreate, SurveyResponseComplete,
-    SurveyPurchaseReport)
+    SurveyPurchaseCreate, SurveyPurchaseDetail, SurveyPurchaseStatus, SurveyResponseCreate,
+    SurveyResponseComplete, SurveyPurchaseReport)
 
 
 class SurveyPageTestCase(ViewTestMixin, TestCase):
@@ -106,8 +106,7 @@ class SurveyPurchaseDetailTestCase(SurveyPageTestCase):
     def setUpTestData(cls):
         super(SurveyPurchaseDetailTestCase, cls).setUpTestData()
         cls.PURCHASE = get(
-            SurveyPurchase, survey=cls.SURVEY, purchaser=cls.USER, purchased_with_code=None,
-            report_generated=None)
+            SurveyPurchase, survey=cls.SURVEY, purchaser=cls.USER, report_generated=None)
         cls.PURCHASE_ID = str(cls.PURCHASE.public_id)
 
     def test_access(self):
@@ -123,6 +122,18 @@ class SurveyPurchaseDetailTestCase(SurveyPageTestCase):
         response = self.assert200(SurveyPurchaseDetail, public_id=self.PURCHASE_ID, user=self.USER)
         self.assertEqual(response.context_data["purchase"], self.PURCHASE)
 
+    def test_pending_payment(self):
+        SurveyPurchase.objects.filter(pk=self.PURCHASE.pk).update(
+            payment_status=SurveyPurchase.PAYMENT_PENDING)
+
+        # Owner is sent to the payment status page until the purchase is paid
+        response = self.get(SurveyPurchaseDetail, public_id=self.PURCHASE_ID, user=self.USER)
+        self.assertEqual(response["location"], self.PURCHASE.get_status_url())
+        self.assert200(SurveyPurchaseStatus, public_id=self.PURCHASE_ID, user=self.USER)
+
+        # Nobody can take the survey yet
+        self.assert404(SurveyResponseCreate, public_id=self.PURCHASE_ID)
+
 
 class SurveyResponseCreateTestCase(SurveyPageTestCase):
 
@@ -130,8 +141,7 @@ class SurveyResponseCreateTestCase(SurveyPageTestCase):
     def setUpTestData(cls):
         super(SurveyResponseCreateTestCase, cls).setUpTestData()
         cls.PURCHASE = get(
-            SurveyPurchase, survey=cls.SURVEY, purchaser=cls.USER, purchased_with_code=None,
-            report_generated=None)
+            SurveyPurchase, survey=cls.SURVEY, purchaser=cls.USER, report_generated=None)
         cls.PURCHASE_ID = str(cls.PURCHASE.public_id)
 
     def assertFieldError(self, response, field_key):
@@ -249,8 +259,7 @@ class SurveyPurchaseReportTestCase(SurveyPageTestCase):
         """
         super(SurveyPurchaseReportTestCase, self).setUp()
         self.purchase = get(
-            SurveyPurchase, survey=self.SURVEY, purchaser=self.USER, purchased_with_code=None,
-            report_generated=None)
+            SurveyPurchase, survey=self.SURVEY, purchaser=self.USER, report_generated=None)
         self.purchase_id = str(self.purchase.public_id)
 
         # Create 6 rating questions and 2 text questions
@@ -8,8 +8,8 @@ from mezzanine.core.translation import (
 )
 
 from .models import (
-    SurveyPage, SurveyPurchase, SurveyPurchaseCode, Category, Question, SurveyResponse,
-    QuestionResponse, Subcategory,
+    SurveyPage, SurveyPurchase, SurveyPurchaseCode, ReconciliationMismatch, Category, Question,
+    SurveyResponse, QuestionResponse, Subcategory,
 )
 
 
@@ -28,6 +28,11 @@ class SurveyPurchaseCodeTranslationOptions(TranslationOptions):
     fields = ()
 
 
+@register(ReconciliationMismatch)
+class ReconciliationMismatchTranslationOptions(TranslationOptions):
+    fields = ()
+
+
 @register(Category)
 class CategoryTranslationOptions(TranslationOptions):
     fields = ("description",)
@@ -29,6 +29,8 @@ urlpatterns = [
             purchase_create_view, name="purchase_create"),
     re_path("^manage/(?P<public_id>%s)/$" % UUID_RE,
             views.SurveyPurchaseDetail.as_view(), name="purchase_detail"),
+    re_path("^status/(?P<public_id>%s)/$" % UUID_RE,
+            views.SurveyPurchaseStatus.as_view(), name="purchase_status"),
     re_path("^take/(?P<public_id>%s)/$" % UUID_RE,
             views.SurveyResponseCreate.as_view(), name="response_create"),
     re_path("^take/(?P<public_id>%s)/complete/$" % UUID_RE,
@@ -1,5 +1,5 @@
 # flake8: noqa
 
 from .surveys import (
-    SurveyPurchaseCreate, SurveyPurchaseDetail, SurveyResponseCreate, SurveyResponseComplete,
-    SurveyPurchaseReport)
+    SurveyPurchaseCreate, SurveyPurchaseDetail, SurveyPurchaseStatus, SurveyResponseCreate,
+    SurveyResponseComplete, SurveyPurchaseReport)
@@ -1,18 +1,23 @@
 from __future__ import absolute_import, unicode_literals
 
+from datetime import timedelta
+
 from django.contrib import messages
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
-from django.db.models import F
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.utils.functional import cached_property
+from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.views import generic
 
+from mezzanine.conf import settings
+
 from mezzy.utils.views import FormMessagesMixin, LoginRequiredMixin, UserPassesTestMixin
 
 from ..forms.surveys import SurveyPurchaseForm, SurveyResponseForm
-from ..models import SurveyPage, SurveyPurchase, SurveyPurchaseCode
+from ..models import SurveyPage, SurveyPurchase
 
 
 class SurveyPurchaseMixin(object):
@@ -41,6 +46,7 @@ class SurveyPurchaseCreate(LoginRequiredMixin, FormMessagesMixin, generic.Create
     form_class = SurveyPurchaseForm
     template_name = "surveys/survey_purchase_create.html"
     success_message = _("You have successfully purchased this survey")
+    pending_message = _("Your payment is being processed")
     error_message = _("There was a problem with the purchase process")
 
     @cached_property
@@ -55,6 +61,19 @@ class SurveyPurchaseCreate(LoginRequiredMixin, FormMessagesMixin, generic.Create
         })
         return super(SurveyPurchaseCreate, self).get_context_data(**kwargs)
 
+    def get_success_message(self, form=None, inlines=None):
+        if form.instance.payment_status == SurveyPurchase.PAYMENT_PENDING:
+            return self.pending_message
+        return super(SurveyPurchaseCreate, self).get_success_message(form, inlines)
+
+    def get_success_url(self):
+        """
+        Purchases waiting for their payment go to the status page instead.
+        """
+        if self.object.payment_status == SurveyPurchase.PAYMENT_PENDING:
+            return self.object.get_status_url()
+        return super(SurveyPurchaseCreate, self).get_success_url()
+
     def form_valid(self, form):
         """
         The form is valid, let's process the payment and save the purchase.
@@ -66,31 +85,27 @@ class SurveyPurchaseCreate(LoginRequiredMixin, FormMessagesMixin, generic.Create
         purchase_code = form.cleaned_data.get("purchase_code")
         try:
             if purchase_code:
-                self.process_purchase_code(purchase_code, form)
-            else:
-                self.process_payment(form)
+                # Redeeming the code and saving the purchase succeed or fail together
+                with transaction.atomic():
+                    self.process_purchase_code(purchase_code, form)
+                    return super(SurveyPurchaseCreate, self).form_valid(form)
+            self.process_payment(form)
         except ValidationError as error:
             form.add_error(None, error)
             return self.form_invalid(form)
 
-        # Code or payment processed successfully, save and continue
+        # Payment processed successfully, save and continue
         return super(SurveyPurchaseCreate, self).form_valid(form)
 
     def process_purchase_code(self, purchase_code, form):
         """
         Process a purchase based on code entered by the user.
         """
-        try:
-            code = self.survey.purchase_codes.get(code=purchase_code, uses_remaining__gt=0)
-        except SurveyPurchaseCode.DoesNotExist:
+        if not self.survey.purchase_codes.redeem(purchase_code):
+            if self.survey.purchase_codes.filter(code=purchase_code).exists():
+                raise ValidationError(_("The code you entered is no longer available"))
             raise ValidationError(_("The code you entered is not valid"))
 
-        code.uses_remaining = F("uses_remaining") - 1
-        try:
-            code.save()
-        except IntegrityError:  # Raised when uses_remaining becomes negative
-            raise ValidationError(_("The code you entered is no longer available"))
-
         form.instance.amount = 0
         form.instance.transaction_id = purchase_code
         form.instance.payment_method = "Purchase Code"
@@ -110,6 +125,7 @@ class SurveyPurchaseDetail(UserPassesTestMixin, SurveyPurchaseMixin, generic.Tem
     Allows users to manage a survey they've purchased.
     """
     template_name = "surveys/survey_purchase_detail.html"
+    paid_only = True
 
     def test_func(self):
         """
@@ -120,6 +136,32 @@ class SurveyPurchaseDetail(UserPassesTestMixin, SurveyPurchaseMixin, generic.Tem
             return False
         return self.purchase.purchaser == user
 
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Send the owner to the payment status page until the purchase is paid for.
+        """
+        if (self.paid_only and self.test_func() and
+                self.purchase.payment_status != SurveyPurchase.PAYMENT_PAID):
+            return redirect(self.purchase.get_status_url())
+        return super(SurveyPurchaseDetail, self).dispatch(request, *args, **kwargs)
+
+
+class SurveyPurchaseStatus(SurveyPurchaseDetail):
+    """
+    Shows the progress of a payment captured in the background.
+    """
+    template_name = "surveys/survey_purchase_status.html"
+    paid_only = False
+
+    def get(self, request, *args, **kwargs):
+        if self.purchase.payment_status == SurveyPurchase.PAYMENT_PENDING:
+            cutoff = now() - timedelta(seconds=settings.SURVEYS_PAYMENT_PENDING_TIMEOUT)
+            if SurveyPurchase.objects.filter(pk=self.purchase.pk).expire_pending(cutoff):
+                self.purchase.refresh_from_db()
+        if self.purchase.payment_status == SurveyPurchase.PAYMENT_PAID:
+            return redirect(self.purchase.get_absolute_url())
+        return super(SurveyPurchaseStatus, self).get(request, *args, **kwargs)
+
 
 class SurveyResponseCreate(FormMessagesMixin, SurveyPurchaseMixin, generic.CreateView):
     """
@@ -129,6 +171,16 @@ class SurveyResponseCreate(FormMessagesMixin, SurveyPurchaseMixin, generic.Creat
     template_name = "surveys/survey_response_create.html"
     success_message = "Thank you! Your responses have been saved successfully"
 
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Surveys can't be taken until the purchase has been paid for, or once its
+        responses have been archived.
+        """
+        if (self.purchase.payment_status != SurveyPurchase.PAYMENT_PAID
+                or self.purchase.responses_archived is not None):
+            raise Http404
+        return super(SurveyResponseCreate, self).dispatch(request, *args, **kwargs)
+
     def get_form_kwargs(self):
         kwargs = super(SurveyResponseCreate, self).get_form_kwargs()
         kwargs.update({